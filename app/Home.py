@@ -2,20 +2,24 @@ import streamlit as st
 import pandas as pd
 import os
 from utils.db import (
-    init_db, 
-    conectar, 
-    buscar_envios_startups, 
-    verificar_etapa_concluida, 
+    inicializar_aplicacao, 
     buscar_ultimo_feedback_ia
 )
+from utils.contexto_usuario import contexto_atual
 from utils.cadastro_usuario import exibir_usuarios_admin
-from login import login, logout
+from login import login, logout, retomar_sessao
 from utils.criar_templates import cria_templates_page
 from utils.ia_chat import mentoria_ia_sidebar
 from utils.ui import aplicar_estilo_fcj
 from utils.menu import renderizar_menu
 from utils.ia_manager import ia_manager_page
 from utils.consulta_resposta import aba_consulta_respostas
+from utils.instrumentacao import iniciar_render
+from utils.perfilador import finalizar_perfil
+from utils.monitoramento import (
+    aba_visao_geral_envios, aba_analise_coortes, aba_desempenho_banco, aba_perfis_render,
+    aba_telemetria_ia
+)
 
 # --- 1. CONFIGURAÇÃO DA PÁGINA ---
 # Pega o caminho absoluto da pasta onde este arquivo (Home.py) está
@@ -40,14 +44,22 @@ except Exception:
     )
 
 # --- 2. INICIALIZAÇÃO E CONTROLE DE ACESSO ---
+iniciar_render("home")
+
 
-if "db_initialized" not in st.session_state:
-    init_db()
-    st.session_state["db_initialized"] = True
+# Esquema e usuário master: uma vez por processo (st.cache_resource), não a cada nova sessão
+try:
+    inicializar_aplicacao()
+except Exception as e:
+    st.error(f"❌ Erro ao inicializar o sistema: {e}")
     
 if "authenticated" not in st.session_state: 
     st.session_state["authenticated"] = False
 
+# Refresh ou queda do websocket: retoma pelo token da URL antes de pedir login
+if not st.session_state["authenticated"]:
+    retomar_sessao()
+
 # SE NÃO ESTIVER AUTENTICADO: Login
 if not st.session_state["authenticated"]:
     # Mantemos o CSS para esconder o menu lateral
@@ -89,26 +101,6 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- FUNÇÕES DE APOIO ---
-@st.cache_data(ttl=60, show_spinner=False)
-def calcular_progresso_trimestre(user_id, trimestre):
-    conn = conectar()
-    if not conn:
-        return 0
-    try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT nome_formulario FROM arquivos_templates WHERE template = %s AND status = 'ativo'", (trimestre,))
-        etapas = cursor.fetchall()
-        
-        if not etapas: 
-            return 0
-        
-        concluidas = sum([1 for e in etapas if verificar_etapa_concluida(user_id, e['nome_formulario'])])
-        return (concluidas / len(etapas))
-    except:
-        return 0
-    finally:
-        conn.close()
-
 def render_card_trimestre(titulo, progresso, pagina, status_bloqueado=False):
     partes = titulo.split(" - ")
     header_html = f"""
@@ -131,7 +123,9 @@ def render_card_trimestre(titulo, progresso, pagina, status_bloqueado=False):
                 st.switch_page(pagina)
 
 # --- 4. NAVEGAÇÃO POR ABAS ---
-if st.session_state["role"] == "admin":
+contexto = contexto_atual()
+
+if contexto.is_admin:
     titulos_abas = ["🏠 Home", "📁 Inserir Templates", "🧠 Inserir Conhecimento", "📝 Consulta de Respostas", "👥 Usuários"]
 else:
     titulos_abas = ["🏠 Home"]
@@ -140,15 +134,15 @@ abas = st.tabs(titulos_abas)
 
 # --- ABA: HOME ---
 with abas[0]:
-    if st.session_state["role"] == "aluno":      
-        st.title(f"🚀 Olá, {st.session_state['user']}!")
+    if contexto.role == "aluno":      
+        st.title(f"🚀 Olá, {contexto.username}!")
         
-        # Dados de Progresso
-        uid = st.session_state["usuario_id"]
-        p1 = calcular_progresso_trimestre(uid, "Q1")
-        p2 = calcular_progresso_trimestre(uid, "Q2")
-        p3 = calcular_progresso_trimestre(uid, "Q3")
-        p4 = calcular_progresso_trimestre(uid, "Q4")
+        # Dados de Progresso (resumo materializado, em cache no contexto da sessão)
+        uid = contexto.usuario_id
+        p1 = contexto.fracao_trimestre("Q1")
+        p2 = contexto.fracao_trimestre("Q2")
+        p3 = contexto.fracao_trimestre("Q3")
+        p4 = contexto.fracao_trimestre("Q4")
         media_global = (p1 + p2 + p3 + p4) / 4
         
         # Lógica de Foco
@@ -167,9 +161,9 @@ with abas[0]:
         st.subheader("📌 Sua Jornada de Evolução")
         c1, c2, c3, c4 = st.columns(4)
         with c1: render_card_trimestre("Q1 - Fundação", p1, "pages/Trimestre Q1.py")
-        with c2: render_card_trimestre("Q2 - Tração", p2, "pages/Trimestre Q2.py", (p1 < 1.0))
-        with c3: render_card_trimestre("Q3 - Escala", p3, "pages/Trimestre Q3.py", (p2 < 1.0))
-        with c4: render_card_trimestre("Q4 - Estratégia", p4, "pages/Trimestre Q4.py", (p3 < 1.0))
+        with c2: render_card_trimestre("Q2 - Tração", p2, "pages/Trimestre Q2.py", not contexto.trimestre_liberado("Q2"))
+        with c3: render_card_trimestre("Q3 - Escala", p3, "pages/Trimestre Q3.py", not contexto.trimestre_liberado("Q3"))
+        with c4: render_card_trimestre("Q4 - Estratégia", p4, "pages/Trimestre Q4.py", not contexto.trimestre_liberado("Q4"))
 
         st.divider()
         st.subheader("🤖 Último Parecer da Mentoria IA")
@@ -189,22 +183,14 @@ with abas[0]:
     else:
         # Visão Admin
         st.title("📊 Painel de Controle FCJ")
-        conn = conectar()
-        if conn:
-            cur = conn.cursor()
-            cur.execute("SELECT COUNT(*) FROM usuarios WHERE role = 'aluno'")
-            total_alunos = cur.fetchone()[0]
-            cur.execute("SELECT COUNT(*) FROM arquivos_templates")
-            total_templates = cur.fetchone()[0]
-            conn.close()
-            
-            a1, a2, a3 = st.columns(3)
-            a1.metric("Startups Ativas", total_alunos)
-            a2.metric("Templates no Sistema", total_templates)
-            a3.metric("Ciclos Disponíveis", "Q1 - Q4")
+        contadores = contexto.contadores()
+        a1, a2, a3 = st.columns(3)
+        a1.metric("Startups Ativas", contadores["alunos"] if contadores["alunos"] is not None else "-")
+        a2.metric("Templates no Sistema", contadores["templates"])
+        a3.metric("Ciclos Disponíveis", "Q1 - Q4")
 
 # --- ABAS ADMIN ---
-if st.session_state["role"] == "admin":
+if contexto.is_admin:
     with abas[1]: cria_templates_page()
     with abas[2]: ia_manager_page()
     with abas[3]:
@@ -212,11 +198,19 @@ if st.session_state["role"] == "admin":
         st.header("📝 Central de Monitoramento de Respostas")
         # 1. Visão Geral (Tabela Rápida)
         with st.expander("📊 Visão Geral de Envios (Tabela)", expanded=False):
-            df_envios = buscar_envios_startups()
-            if not df_envios.empty:
-                st.dataframe(df_envios, width="stretch")
-            else:
-                st.info("Nenhuma startup enviou respostas ainda.")
+            aba_visao_geral_envios()
+
+        with st.expander("📈 Análise de Coortes (Parquet)", expanded=False):
+            aba_analise_coortes()
+
+        with st.expander("⏱️ Desempenho do Banco", expanded=False):
+            aba_desempenho_banco()
+
+        with st.expander("🔬 Perfil de Renders (Waterfall)", expanded=False):
+            aba_perfis_render()
+
+        with st.expander("🤖 Telemetria de IA (Latência e Tokens)", expanded=False):
+            aba_telemetria_ia()
         
         st.divider()
 
@@ -225,4 +219,6 @@ if st.session_state["role"] == "admin":
         aba_consulta_respostas()        
        
     with abas[4]:
-        exibir_usuarios_admin()
\ No newline at end of file
+        exibir_usuarios_admin()
+
+finalizar_perfil()
\ No newline at end of file
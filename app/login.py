@@ -1,29 +1,21 @@
 import streamlit as st
-import mysql.connector
-import bcrypt
 import os
 from utils.ui import aplicar_estilo_fcj
-from utils.db import cadastrar_usuario_db
+from utils.db import conectar, atualizar_hash_senha
+from utils.autenticacao import (
+    limitador_login, verificar_senha, precisa_rehash, rehash_em_segundo_plano, ServidorOcupado
+)
+from utils.contexto_usuario import criar_contexto
+from utils.sessoes import (
+    criar_sessao, validar_sessao, encerrar_sessao, token_do_navegador, fixar_token_na_url, remover_token_da_url
+)
 
 # ---------------------------------------------------------
-# 1. CONEXÃO COM O BANCO (Ajustada para TiDB Cloud + SSL)
+# 1. CONEXÃO COM O BANCO (TiDB Cloud + SSL ou SQLite local)
 # ---------------------------------------------------------
 def get_connection():
-    """Estabelece conexão com o banco usando drivers puros para evitar erros de SSL."""
-    try:
-        return mysql.connector.connect(
-            host=st.secrets["mysql"]["host"],
-            port=int(st.secrets["mysql"]["port"]),
-            user=st.secrets["mysql"]["user"],
-            password=st.secrets["mysql"]["password"],
-            database=st.secrets["mysql"]["database"],
-            use_pure=True,            # Essencial para evitar erro SSL 2026 no Windows
-            ssl_disabled=False,       # Garante que a criptografia SSL exigida pelo TiDB esteja ativa
-            connection_timeout=20
-        )
-    except Exception as e:
-        st.error(f"❌ Erro ao conectar no banco: {e}")
-        return None
+    """Usa a mesma conexão do db.py (TiDB com SSL ou SQLite local, conforme a configuração)."""
+    return conectar()
 
 # ---------------------------------------------------------
 # 2. FUNÇÕES DE APOIO (Reset e Autenticação)
@@ -54,48 +46,79 @@ def registrar_solicitacao_reset(identificador):
             conn.close()
     return False
 
-def authenticate(username, password):
-    """Verifica credenciais no banco de dados com hash BCrypt."""
+def ip_cliente():
+    """IP de quem está logando (primeiro X-Forwarded-For atrás do proxy), se o Streamlit expuser."""
+    try:
+        encaminhado = st.context.headers.get("X-Forwarded-For")
+        if encaminhado:
+            return encaminhado.split(",")[0].strip()
+        return getattr(st.context, "ip_address", None)
+    except Exception:
+        return None
+
+def authenticate(username, password, ip=None):
+    """Verifica credenciais no banco de dados com hash BCrypt (calculado no pool de autenticação)."""
+    # Tentativas demais para este usuário/IP: recusa antes de consultar o banco e gastar CPU
+    if limitador_login.espera_restante(username, ip):
+        return None
     conn = get_connection()
     if not conn:
         return None
+    user = None
+    cursor = None
     try:
         cursor = conn.cursor(dictionary=True)
         query = "SELECT id, username, senha_hash, role, ativo FROM usuarios WHERE username = %s"
         cursor.execute(query, (username,))
         user = cursor.fetchone()
-
-        if user and user["ativo"]:
-            hash_do_banco = user["senha_hash"]
-            # Converte para bytes se necessário
-            if isinstance(hash_do_banco, str):
-                hash_do_banco = hash_do_banco.encode("utf-8")
-
-            # Valida a senha digitada contra o hash
-            if bcrypt.checkpw(password.encode("utf-8"), hash_do_banco):
-                return user
     except Exception as e:
         st.error(f"Erro na autenticação: {e}")
+        return None
     finally:
-        if 'cursor' in locals() and cursor: cursor.close()
+        if cursor: cursor.close()
         if conn and conn.is_connected(): conn.close()
+
+    try:
+        # A conexão já foi devolvida: o hash não segura conexão enquanto espera o pool
+        if user and user["ativo"] and verificar_senha(password, user["senha_hash"]):
+            limitador_login.registrar_sucesso(username, ip)
+            if precisa_rehash(user["senha_hash"]):
+                rehash_em_segundo_plano(password, lambda novo_hash: atualizar_hash_senha(user["id"], novo_hash))
+            return user
+    except ServidorOcupado:
+        raise # Quem chama avisa o usuário para tentar de novo (não conta como falha)
+    except Exception as e:
+        st.error(f"Erro na autenticação: {e}")
+        return None
+    limitador_login.registrar_falha(username, ip)
     return None
 
 # ---------------------------------------------------------
-# 3. LOGICA DE SINCRONIZAÇÃO DO USUÁRIO MASTER
+# 3. SESSÃO LOGADA (LOGIN E RETOMADA POR TOKEN)
 # ---------------------------------------------------------
-# Criamos o master apenas uma vez por sessão do servidor para performance
-if 'master_verificado' not in st.session_state:
-    try:
-        MASTER_PASS = st.secrets.get("MASTER_PASSWORD", "m@ster26")
-        # Esta função do db.py já ignora se o usuário já existir
-        sucesso, msg = cadastrar_usuario_db("master", MASTER_PASS, "admin")
-        
-        if sucesso:
-            print("✅ [Sistema] Usuário master garantido no banco.")
-        st.session_state['master_verificado'] = True
-    except Exception as e:
-        print(f"⚠️ [Aviso] Verificação de master: {e}")
+def _abrir_sessao(user, token):
+    st.session_state["authenticated"] = True
+    st.session_state["user"] = user["username"]
+    st.session_state["role"] = user["role"]
+    st.session_state["usuario_id"] = user["id"]
+    st.session_state["token_sessao"] = token
+    # Perfil, travas e contadores ficam no contexto da sessão (sem reconsultar a cada página)
+    criar_contexto(user)
+    fixar_token_na_url(token)
+
+def retomar_sessao():
+    """Após refresh/reconexão, restaura o login pelo token da URL/cookie (sem bcrypt). True se logado."""
+    if st.session_state.get("usuario_id") is not None:
+        return True
+    token = token_do_navegador()
+    if not token:
+        return False
+    user = validar_sessao(token)
+    if not user:
+        remover_token_da_url() # Expirado, revogado ou forjado
+        return False
+    _abrir_sessao(user, token)
+    return True
 
 # ---------------------------------------------------------
 # 4. INTERFACE DE LOGIN (UI)
@@ -124,12 +147,21 @@ def login():
                 submit = st.form_submit_button("Entrar", width="stretch", type="primary")
                 
                 if submit:
-                    user = authenticate(username, password)
-                    if user:
-                        st.session_state["authenticated"] = True
-                        st.session_state["user"] = user["username"]
-                        st.session_state["role"] = user["role"]
-                        st.session_state["usuario_id"] = user["id"]
+                    ip = ip_cliente()
+                    espera = limitador_login.espera_restante(username, ip)
+                    ocupado = False
+                    user = None
+                    if not espera:
+                        try:
+                            user = authenticate(username, password, ip)
+                        except ServidorOcupado:
+                            ocupado = True
+                    if espera:
+                        st.error(f"🔒 Muitas tentativas inválidas. Tente novamente em {int(espera // 60) + 1} min.")
+                    elif ocupado:
+                        st.warning("⏳ Muitos acessos ao mesmo tempo. Tente novamente em alguns segundos.")
+                    elif user:
+                        _abrir_sessao(user, criar_sessao(user["id"]))
                         st.rerun()
                     else:
                         st.error("❌ Usuário ou senha inválidos.")
@@ -159,6 +191,8 @@ def login():
                 st.rerun()
 
 def logout():
-    """Limpa a sessão e reinicia o app."""
+    """Encerra o token no banco, limpa a sessão e reinicia o app."""
+    encerrar_sessao(st.session_state.get("token_sessao"))
+    remover_token_da_url()
     st.session_state.clear()
     st.rerun()
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""
+Comandos de manutenção executados fora do Streamlit.
+Uso (a partir da raiz do projeto, para usar o mesmo .streamlit/secrets.toml):
+
+    python app/manutencao.py reconstruir-progresso [--usuario ID]
+    python app/manutencao.py exportar-parquet
+    python app/manutencao.py importar-usuarios turma.csv [--processos N] [--relatorio conflitos.csv]
+    python app/manutencao.py ingerir-conhecimento [app/data/aulas_q1 ...] [--trabalhadores N]
+    python app/manutencao.py reindexar-conhecimento
+    python app/manutencao.py gerar-pacotes [--trimestre Q1] [--forcar]
+"""
+import argparse
+import sys
+
+from utils.db import reconstruir_resumo_progresso, reindexar_conhecimento
+from utils.exportacao_parquet import exportar_parquet
+from utils.importacao_usuarios import ler_planilha_usuarios, importar_usuarios, PROCESSOS_HASH
+from utils.autenticacao import CUSTO_BCRYPT
+from utils.ingestao_conhecimento import ingerir_pasta, pastas_de_aulas, TRABALHADORES_INGESTAO
+from utils.pacotes_contexto import gerar_pacotes_contexto
+
+def cmd_reconstruir_progresso(args):
+    if reconstruir_resumo_progresso(args.usuario):
+        alvo = f"usuário {args.usuario}" if args.usuario else "todos os usuários"
+        print(f"✅ Resumo de progresso reconstruído para {alvo}.")
+        return 0
+    print("❌ Falha ao reconstruir o resumo de progresso.")
+    return 1
+
+def cmd_exportar_parquet(args):
+    for tabela, linhas in exportar_parquet().items():
+        print(f"📦 {tabela}: {linhas} novas linhas exportadas")
+    return 0
+
+def cmd_importar_usuarios(args):
+    df = ler_planilha_usuarios(args.arquivo)
+    print(f"📄 {len(df)} linhas em {args.arquivo}")
+    relatorio = importar_usuarios(
+        df, custo=args.custo, processos=args.processos,
+        progresso=lambda feitos, total: print(f"\r🔐 Hashes: {feitos}/{total}", end="", flush=True)
+    )
+    print()
+    tempos = relatorio["tempos_s"]
+    print(f"⏱️ validação {tempos['validacao']}s | hash {tempos['hash']}s | "
+          f"gravação {tempos.get('insercao', 0)}s | total {tempos['total']}s | {relatorio['usuarios_por_s']} usuários/s")
+    for problema in relatorio["problemas"]:
+        print(f"   linha {problema['linha']:>5} | {problema['username'] or '-':<30} | {problema['motivo']}")
+    if args.relatorio and relatorio["problemas"]:
+        import pandas as pd
+        pd.DataFrame(relatorio["problemas"]).to_csv(args.relatorio, index=False)
+        print(f"📄 Relatório de conflitos: {args.relatorio}")
+    if relatorio["erro"]:
+        print(relatorio["erro"])
+        return 1
+    print(f"✅ {relatorio['importados']} usuários importados, {len(relatorio['problemas'])} linhas ignoradas.")
+    return 0
+
+def cmd_ingerir_conhecimento(args):
+    pastas = args.pastas or pastas_de_aulas()
+    if not pastas:
+        print("❌ Nenhuma pasta de aulas encontrada.")
+        return 1
+    falhas = 0
+    for pasta in pastas:
+        print(f"📂 {pasta}")
+        relatorio = ingerir_pasta(
+            pasta, descricao=args.descricao, trimestre=args.trimestre, trabalhadores=args.trabalhadores,
+            progresso=lambda r, feitos, total: print(
+                f"   [{feitos}/{total}] {'✅' if r['status'] == 'concluido' else '❌'} {r['nome']} "
+                f"({r['segundos']}s){' - ' + r['mensagem'] if r['mensagem'] else ''}"
+            )
+        )
+        if relatorio["erro"]:
+            print(relatorio["erro"])
+            return 1
+        print(f"   {relatorio['ingeridos']} ingeridos, {relatorio['ignorados']} já na base, "
+              f"{relatorio['falhas']} falhas em {relatorio['segundos']}s")
+        falhas += relatorio["falhas"]
+    if falhas:
+        print(f"⚠️ {falhas} arquivos falharam; rode o comando de novo para tentar só esses.")
+        return 1
+    return 0
+
+def cmd_reindexar_conhecimento(args):
+    resumo = reindexar_conhecimento()
+    if resumo is None:
+        print("❌ Falha ao reindexar a base de conhecimento.")
+        return 1
+    print(f"✅ {resumo['materiais']} materiais indexados | {resumo['duplicados']} reenvios fundidos | "
+          f"passagens: +{resumo['inseridas']} / -{resumo['removidas']}")
+    for caminho in resumo["arquivos_removidos"]:
+        print(f"   🗑️ {caminho}")
+    return 0
+
+def cmd_gerar_pacotes(args):
+    relatorio = gerar_pacotes_contexto(trimestre=args.trimestre, forcar=args.forcar)
+    if relatorio["erro"]:
+        print(relatorio["erro"])
+        return 1
+    for r in relatorio["resultados"]:
+        icone = {"gerado": "✅", "reaproveitado": "♻️"}.get(r["situacao"], "❌")
+        detalhe = r["mensagem"] or f"{r['caracteres']} caracteres"
+        if r["perguntas"] is not None:
+            detalhe += f", {r['perguntas']} campos"
+        print(f"   {icone} [{r['trimestre']}] {r['etapa']} ({detalhe})")
+    print(f"{relatorio['gerados']} gerados, {relatorio['reaproveitados']} reaproveitados, "
+          f"{relatorio['falhas']} falhas em {relatorio['segundos']}s")
+    return 1 if relatorio["falhas"] else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manutenção da plataforma FCJ")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_prog = sub.add_parser("reconstruir-progresso", help="Recalcula a tabela progresso_resumo")
+    p_prog.add_argument("--usuario", type=int, default=None, help="Reconstrói apenas este usuario_id")
+    p_prog.set_defaults(func=cmd_reconstruir_progresso)
+
+    p_parquet = sub.add_parser("exportar-parquet", help="Exporta incrementalmente as tabelas analíticas para Parquet")
+    p_parquet.set_defaults(func=cmd_exportar_parquet)
+
+    p_import = sub.add_parser("importar-usuarios", help="Cadastra usuários em lote a partir de um CSV/XLSX")
+    p_import.add_argument("arquivo", help="CSV ou XLSX com username, senha [, role, ativo]")
+    p_import.add_argument("--processos", type=int, default=PROCESSOS_HASH, help="Processos para o bcrypt")
+    p_import.add_argument("--custo", type=int, default=CUSTO_BCRYPT, help="Custo do bcrypt")
+    p_import.add_argument("--relatorio", help="Grava as linhas não importadas neste CSV")
+    p_import.set_defaults(func=cmd_importar_usuarios)
+
+    p_ingest = sub.add_parser("ingerir-conhecimento", help="Indexa na base da IA os PDFs de pastas de aulas")
+    p_ingest.add_argument("pastas", nargs="*", help="Pastas com PDFs (padrão: app/data/aulas_*)")
+    p_ingest.add_argument("--trabalhadores", type=int, default=TRABALHADORES_INGESTAO, help="Arquivos processados em paralelo")
+    p_ingest.add_argument("--descricao", help="Descrição gravada nos materiais (padrão: nome da pasta)")
+    p_ingest.add_argument("--trimestre", choices=["Q1", "Q2", "Q3", "Q4"], help="Partição de busca (padrão: a da pasta)")
+    p_ingest.set_defaults(func=cmd_ingerir_conhecimento)
+
+    p_reindex = sub.add_parser("reindexar-conhecimento", help="Monta o índice de passagens e funde reenvios da mesma fonte")
+    p_reindex.set_defaults(func=cmd_reindexar_conhecimento)
+
+    p_pacotes = sub.add_parser("gerar-pacotes", help="Pré-computa o pacote de contexto do analisador de cada template")
+    p_pacotes.add_argument("--trimestre", choices=["Q1", "Q2", "Q3", "Q4"], help="Só os templates deste trimestre")
+    p_pacotes.add_argument("--forcar", action="store_true", help="Regera mesmo com as fontes inalteradas")
+    p_pacotes.set_defaults(func=cmd_gerar_pacotes)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
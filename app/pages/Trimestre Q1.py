@@ -5,17 +5,21 @@ import json
 import plotly.graph_objects as go
 import pandas as pd
 from utils.db import (
-    conectar, verificar_etapa_concluida, salvar_conclusao_etapa, 
+    listar_templates_trimestre, 
     salvar_entrega_e_feedback, buscar_ultimo_feedback_ia,
     TEMPLATES_DIR
 )
+from utils.contexto_usuario import contexto_atual
 from utils.ia_chat import analisar_documento_ia, mentoria_ia_sidebar
 from utils.ui import aplicar_estilo_fcj
 from utils.menu import renderizar_menu
-from utils.ui import criar_grafico_circular
+from login import retomar_sessao
+from utils.instrumentacao import iniciar_render
+from utils.perfilador import span, finalizar_perfil
+from utils.ui import exibir_grafico_circular
 
 # --- CONFIGURAÇÃO E SEGURANÇA --- #
-if st.session_state.get("usuario_id") is None:
+if st.session_state.get("usuario_id") is None and not retomar_sessao():
     st.switch_page("Home.py") 
     st.stop()
 
@@ -36,6 +40,7 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 st.session_state["current_page"] = "q1_page"
+iniciar_render("q1_page")
 aplicar_estilo_fcj()
 renderizar_menu()
 
@@ -43,20 +48,15 @@ renderizar_menu()
 def Q1_page():
     st.title("Q1 - Fundação: Diagnóstico Estratégico e Posicionamento")
     
-    user_id = st.session_state.get("usuario_id")
-    conn = conectar()
-    if not conn: return
+    contexto = contexto_atual()
+    user_id = contexto.usuario_id
+    # Lista de etapas vem do cache de referência (invalidado quando o admin altera templates)
+    templates = listar_templates_trimestre('Q1')
+    if templates is None:
+        st.error("Não foi possível carregar os formulários do Q1. Tente novamente em instantes.")
+        return
 
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT id, nome_formulario, caminho_arquivo, nome_arquivo_original 
-            FROM arquivos_templates 
-            WHERE template = 'Q1' AND status = 'ativo' 
-            ORDER BY id ASC
-        """)
-        templates = cursor.fetchall()
-
         if not templates:
             st.info("Nenhum formulário Q1 disponível no momento.")
             return
@@ -73,7 +73,7 @@ def Q1_page():
             t_id = temp['id']
             nome_etapa = temp['nome_formulario']
 
-            concluida = verificar_etapa_concluida(user_id, nome_etapa)
+            concluida = contexto.etapa_concluida(nome_etapa)
             lista_final_status.append(concluida)
             
             # Cache de Feedback
@@ -100,7 +100,7 @@ def Q1_page():
                     )
                     
                     if escolha == "Concluído" and not concluida:
-                        if salvar_conclusao_etapa(user_id, nome_etapa):
+                        if contexto.concluir_etapa(nome_etapa):
                             st.rerun()
 
                 if not etapa_liberada:
@@ -116,7 +116,7 @@ def Q1_page():
                         st.error(f"Arquivo não encontrado no servidor: {nome_fisico}")
                     else:
                         try:   
-                            with open(caminho_completo, "rb") as f:
+                            with span("ler template", "io"), open(caminho_completo, "rb") as f:
                                 templates_bytes = f.read()
                                 
                                 st.download_button(
@@ -159,7 +159,7 @@ def Q1_page():
                                                 if f"feedback_{t_id}" in st.session_state:
                                                     del st.session_state[f"feedback_{t_id}"]
                                                 # Registra a conclusão da etapa para liberar a próxima
-                                                salvar_conclusao_etapa(user_id, nome_etapa)                                                                                                
+                                                contexto.concluir_etapa(nome_etapa)                                                                                                
                                                 st.toast("Análise salva no banco de dados!")
                                                 time.sleep(2) # Pequena pausa para garantir o commit no TiDB
                                                 st.rerun()
@@ -176,7 +176,7 @@ def Q1_page():
                         
                         c1, c2 = st.columns([1, 2])
                         with c1:
-                            st.plotly_chart(criar_grafico_circular(res['porcentagem']), width="stretch", config={'displayModeBar': False})
+                            exibir_grafico_circular(res['porcentagem'])
                         with c2:
                             st.markdown(f"#### Diagnóstico de Maturidade")
                             st.markdown(f"**Nível:** <span style='color:{res['cor']}; font-size:1.2rem; font-weight:bold;'>{res['zona']}</span>", unsafe_allow_html=True)
@@ -215,11 +215,9 @@ def Q1_page():
 
     except Exception as e:
         st.error(f"Erro ao carregar página: {e}")
-    finally:           
-        if conn and conn.is_connected():
-                if 'cursor' in locals(): # Verifica se o cursor foi definido
-                    cursor.close()
-                conn.close()
 
 if __name__ == "__main__":
-    Q1_page()
\ No newline at end of file
+    try:
+        Q1_page()
+    finally:
+        finalizar_perfil()
\ No newline at end of file
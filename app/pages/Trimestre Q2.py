@@ -3,12 +3,16 @@ import os
 import json
 import plotly.graph_objects as go
 from utils.db import (
-    conectar, verificar_etapa_concluida, salvar_conclusao_etapa, 
+    listar_templates_trimestre, 
     salvar_entrega_e_feedback, buscar_ultimo_feedback_ia
 )
+from utils.contexto_usuario import contexto_atual
 from utils.ia_chat import analisar_documento_ia, mentoria_ia_sidebar
-from utils.ui import aplicar_estilo_fcj, criar_grafico_circular
+from utils.ui import aplicar_estilo_fcj, exibir_grafico_circular
 from utils.menu import renderizar_menu
+from login import retomar_sessao
+from utils.instrumentacao import iniciar_render
+from utils.perfilador import span, finalizar_perfil
 
 # --- 1. CONFIGURAÇÃO E SEGURANÇA --- #
 st.set_page_config(
@@ -17,7 +21,7 @@ st.set_page_config(
 )
 
 # Bloqueio de acesso se não estiver logado
-if st.session_state.get("usuario_id") is None:
+if st.session_state.get("usuario_id") is None and not retomar_sessao():
     st.switch_page("Home.py") 
     st.stop()
 
@@ -32,25 +36,16 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 st.session_state["current_page"] = "q2_page"
+iniciar_render("q2_page")
 aplicar_estilo_fcj()
 renderizar_menu()
 
 # --- 2. VALIDAÇÃO DE ACESSO (TRAVA Q1) --- #
-def validar_acesso_q2(user_id):
-    conn = conectar()
-    if not conn: return False
-    try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT nome_formulario FROM arquivos_templates WHERE template = 'Q1' AND status = 'ativo'")
-        etapas_q1 = cursor.fetchall()
-        for etapa in etapas_q1:
-            if not verificar_etapa_concluida(user_id, etapa['nome_formulario']):
-                return False
-        return True
-    finally:
-        conn.close()
+def validar_acesso_q2():
+    # O Q2 só abre se o Q1 estiver 100% concluído (resumo em cache no contexto da sessão)
+    return contexto_atual().trimestre_liberado('Q2')
 
-if not validar_acesso_q2(st.session_state.get("usuario_id")):
+if not validar_acesso_q2():
     st.warning("⚠️ Acesso Bloqueado: Você precisa concluir 100% das etapas do Q1 antes de iniciar o Q2.")     
 
     col_v1, col_v2, col_v3 = st.columns([2, 1, 2])
@@ -64,20 +59,15 @@ if not validar_acesso_q2(st.session_state.get("usuario_id")):
 def Q2_page():
     st.title("Q2 - Tração: Execução de Canal e Validação de Aquisição")
     
-    user_id = st.session_state.get("usuario_id")
-    conn = conectar()
-    if not conn: return
+    contexto = contexto_atual()
+    user_id = contexto.usuario_id
+    # Lista de etapas vem do cache de referência (invalidado quando o admin altera templates)
+    templates = listar_templates_trimestre('Q2')
+    if templates is None:
+        st.error("Não foi possível carregar os formulários do Q2. Tente novamente em instantes.")
+        return
 
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT id, nome_formulario, caminho_arquivo, nome_arquivo_original 
-            FROM arquivos_templates 
-            WHERE template = 'Q2' AND status = 'ativo' 
-            ORDER BY id ASC
-        """)
-        templates = cursor.fetchall()
-
         if not templates:
             st.info("Nenhum formulário Q2 disponível no momento.")
             return
@@ -91,7 +81,7 @@ def Q2_page():
         for idx, temp in enumerate(templates):
             t_id = temp['id']
             nome_etapa = temp['nome_formulario']
-            concluida = verificar_etapa_concluida(user_id, nome_etapa)
+            concluida = contexto.etapa_concluida(nome_etapa)
             status_geral.append(concluida)
             
             # Cache de Feedback
@@ -113,7 +103,7 @@ def Q2_page():
                                      disabled=not etapa_liberada)
                     
                     if escolha == "Concluído" and not concluida:
-                        if salvar_conclusao_etapa(user_id, nome_etapa):
+                        if contexto.concluir_etapa(nome_etapa):
                             st.rerun()
 
                 if not etapa_liberada:
@@ -128,7 +118,7 @@ def Q2_page():
                         st.error(f"Arquivo não encontrado no servidor: {nome_fisico}")
                     else:
                         try:
-                            with open(caminho_completo, "rb") as f:
+                            with span("ler template", "io"), open(caminho_completo, "rb") as f:
                                 templates_bytes = f.read()
                                                                 
                                 st.download_button(
@@ -161,7 +151,7 @@ def Q2_page():
                                             sucesso_db = salvar_entrega_e_feedback(user_id, nome_etapa, upload_arquivo, resultado)
                                             if sucesso_db:
 
-                                                salvar_conclusao_etapa(user_id, nome_etapa)
+                                                contexto.concluir_etapa(nome_etapa)
                                                 st.toast("Análise finalizada com sucesso!")
                                                 st.rerun()
                                             else:
@@ -178,7 +168,7 @@ def Q2_page():
                         
                         c1, c2 = st.columns([1, 2])
                         with c1:
-                            st.plotly_chart(criar_grafico_circular(res['porcentagem']), width="stretch", config={'displayModeBar': False})
+                            exibir_grafico_circular(res['porcentagem'])
                         with c2:
                             st.markdown(f"#### Diagnóstico de Maturidade")
                             st.markdown(f"**Nível:** <span style='color:{res['cor']}; font-weight:bold;'>{res['zona']}</span>", unsafe_allow_html=True)
@@ -224,10 +214,11 @@ def Q2_page():
                         st.session_state["current_page"] = "q3_page" # Atualiza o estado antes de mudar
                         st.switch_page("pages/Trimestre Q3.py")
 
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
+    except Exception as e:
+        st.error(f"Erro ao carregar página: {e}")
 
 if __name__ == "__main__":
-    Q2_page()
\ No newline at end of file
+    try:
+        Q2_page()
+    finally:
+        finalizar_perfil()
\ No newline at end of file
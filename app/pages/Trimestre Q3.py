@@ -3,12 +3,16 @@ import os
 import json
 import plotly.graph_objects as go
 from utils.db import (
-    conectar, verificar_etapa_concluida, salvar_conclusao_etapa, 
+    listar_templates_trimestre, 
     salvar_entrega_e_feedback, buscar_ultimo_feedback_ia
 )
+from utils.contexto_usuario import contexto_atual
 from utils.ia_chat import analisar_documento_ia, mentoria_ia_sidebar
-from utils.ui import aplicar_estilo_fcj, criar_grafico_circular
+from utils.ui import aplicar_estilo_fcj, exibir_grafico_circular
 from utils.menu import renderizar_menu
+from login import retomar_sessao
+from utils.instrumentacao import iniciar_render
+from utils.perfilador import span, finalizar_perfil
 
 # --- 1. CONFIGURAÇÃO E SEGURANÇA --- #
 st.set_page_config(
@@ -17,7 +21,7 @@ st.set_page_config(
 )
 
 # Bloqueio de acesso se não estiver logado
-if st.session_state.get("usuario_id") is None:
+if st.session_state.get("usuario_id") is None and not retomar_sessao():
     st.switch_page("Home.py") 
     st.stop()
 
@@ -32,28 +36,16 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 st.session_state["current_page"] = "q3_page"
+iniciar_render("q3_page")
 aplicar_estilo_fcj()
 renderizar_menu()
 
 # --- 2. VALIDAÇÃO DE ACESSO (TRAVA Q2) --- #
-def validar_acesso_q3(user_id):
-    conn = conectar()
-    if not conn: return False
-    try:
-        cursor = conn.cursor(dictionary=True)
-        # O Q3 só abre se o Q2 estiver 100% concluído
-        cursor.execute("SELECT nome_formulario FROM arquivos_templates WHERE template = 'Q2' AND status = 'ativo'")
-        etapas_q2 = cursor.fetchall()
-        for etapa in etapas_q2:
-            if not verificar_etapa_concluida(user_id, etapa['nome_formulario']):
-                return False
-        return True
-    except Exception:
-        return False
-    finally:
-        conn.close()
+def validar_acesso_q3():
+    # O Q3 só abre se o Q2 estiver 100% concluído (resumo em cache no contexto da sessão)
+    return contexto_atual().trimestre_liberado('Q3')
 
-if not validar_acesso_q3(st.session_state.get("usuario_id")):
+if not validar_acesso_q3():
     st.warning("⚠️ Acesso Bloqueado: Você precisa concluir 100% das etapas do Q2 antes de iniciar o Q3.")
     
     col_v1, col_v2, col_v3 = st.columns([2, 1, 2])
@@ -67,20 +59,15 @@ if not validar_acesso_q3(st.session_state.get("usuario_id")):
 def Q3_page():
     st.title("Q3 - Escala: Crescimento com Eficiência")
         
-    user_id = st.session_state.get("usuario_id")
-    conn = conectar()
-    if not conn: return
+    contexto = contexto_atual()
+    user_id = contexto.usuario_id
+    # Lista de etapas vem do cache de referência (invalidado quando o admin altera templates)
+    templates = listar_templates_trimestre('Q3')
+    if templates is None:
+        st.error("Não foi possível carregar os formulários do Q3. Tente novamente em instantes.")
+        return
 
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT id, nome_formulario, caminho_arquivo, nome_arquivo_original 
-            FROM arquivos_templates 
-            WHERE template = 'Q3' AND status = 'ativo' 
-            ORDER BY id ASC
-        """)
-        templates = cursor.fetchall()
-
         if not templates:
             st.info("Nenhum formulário Q3 disponível no momento.")
             return
@@ -94,7 +81,7 @@ def Q3_page():
         for idx, temp in enumerate(templates):
             t_id = temp['id']
             nome_etapa = temp['nome_formulario']
-            concluida = verificar_etapa_concluida(user_id, nome_etapa)
+            concluida = contexto.etapa_concluida(nome_etapa)
             lista_status.append(concluida)
             
             # Carregar feedback do banco para o estado da sessão
@@ -116,7 +103,7 @@ def Q3_page():
                                      disabled=not etapa_liberada)
                     
                     if escolha == "Concluído" and not concluida:
-                        if salvar_conclusao_etapa(user_id, nome_etapa):
+                        if contexto.concluir_etapa(nome_etapa):
                             st.rerun()
 
                 if not etapa_liberada:
@@ -131,7 +118,7 @@ def Q3_page():
                         st.error(f"Arquivo não encontrado no servidor: {nome_fisico}")
                     else:
                         try:
-                            with open(caminho_completo, "rb") as f:
+                            with span("ler template", "io"), open(caminho_completo, "rb") as f:
                                 templates_bytes = f.read()
                                 
                                 st.download_button(
@@ -164,7 +151,7 @@ def Q3_page():
                                             sucesso_db = salvar_entrega_e_feedback(user_id, nome_etapa, upload_arquivo, resultado)
                                             if sucesso_db:
 
-                                                salvar_conclusao_etapa(user_id, nome_etapa)
+                                                contexto.concluir_etapa(nome_etapa)
                                                 st.toast("Análise finalizada com sucesso!")
                                                 st.rerun()
                                             else:
@@ -179,7 +166,7 @@ def Q3_page():
                         st.divider()
                         c1, c2 = st.columns([1, 2])
                         with c1:
-                            st.plotly_chart(criar_grafico_circular(res['porcentagem']), width="stretch", config={'displayModeBar': False})
+                            exibir_grafico_circular(res['porcentagem'])
                         with c2:
                             st.markdown(f"**Nível:** <span style='color:{res['cor']}; font-weight:bold;'>{res['zona']}</span>", unsafe_allow_html=True)
                             st.markdown(f"""
@@ -220,10 +207,11 @@ def Q3_page():
                         st.session_state["current_page"] = "q4_page" # Atualiza o estado antes de mudar
                         st.switch_page("pages/Trimestre Q4.py")
 
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
+    except Exception as e:
+        st.error(f"Erro ao carregar página: {e}")
 
 if __name__ == "__main__":
-    Q3_page()
\ No newline at end of file
+    try:
+        Q3_page()
+    finally:
+        finalizar_perfil()
\ No newline at end of file
@@ -3,12 +3,16 @@ import os
 import json
 import plotly.graph_objects as go
 from utils.db import (
-    conectar, verificar_etapa_concluida, salvar_conclusao_etapa, 
+    listar_templates_trimestre, 
     salvar_entrega_e_feedback, buscar_ultimo_feedback_ia
 )
+from utils.contexto_usuario import contexto_atual
 from utils.ia_chat import analisar_documento_ia, mentoria_ia_sidebar
-from utils.ui import aplicar_estilo_fcj, criar_grafico_circular
+from utils.ui import aplicar_estilo_fcj, exibir_grafico_circular
 from utils.menu import renderizar_menu
+from login import retomar_sessao
+from utils.instrumentacao import iniciar_render
+from utils.perfilador import span, finalizar_perfil
 
 # --- 1. CONFIGURAÇÃO E SEGURANÇA --- #
 st.set_page_config(
@@ -17,7 +21,7 @@ st.set_page_config(
 )
 
 # Bloqueio de acesso se não estiver logado
-if st.session_state.get("usuario_id") is None:
+if st.session_state.get("usuario_id") is None and not retomar_sessao():
     st.switch_page("Home.py") 
     st.stop()
 
@@ -32,28 +36,16 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 st.session_state["current_page"] = "q4_page"
+iniciar_render("q4_page")
 aplicar_estilo_fcj()
 renderizar_menu()
 
 # --- 2. VALIDAÇÃO DE ACESSO (TRAVA Q3) --- #
-def validar_acesso_q4(user_id):
-    conn = conectar()
-    if not conn: return False
-    try:
-        cursor = conn.cursor(dictionary=True)
-        # O Q4 só abre se o Q3 estiver 100% concluído
-        cursor.execute("SELECT nome_formulario FROM arquivos_templates WHERE template = 'Q3' AND status = 'ativo'")
-        etapas_q3 = cursor.fetchall()
-        for etapa in etapas_q3:
-            if not verificar_etapa_concluida(user_id, etapa['nome_formulario']):
-                return False
-        return True
-    except Exception:
-        return False
-    finally:
-        conn.close()
+def validar_acesso_q4():
+    # O Q4 só abre se o Q3 estiver 100% concluído (resumo em cache no contexto da sessão)
+    return contexto_atual().trimestre_liberado('Q4')
 
-if not validar_acesso_q4(st.session_state.get("usuario_id")):
+if not validar_acesso_q4():
     st.warning("⚠️ Acesso Bloqueado: Você precisa concluir 100% das etapas do Q3 antes de iniciar o Q4.")
     
     # Centralizar o botão para melhor UX
@@ -67,20 +59,15 @@ if not validar_acesso_q4(st.session_state.get("usuario_id")):
 def Q4_page():
     st.title("Q4 - Estratégia: Pitch, Captação e Governança")
     
-    user_id = st.session_state.get("usuario_id")
-    conn = conectar()
-    if not conn: return
+    contexto = contexto_atual()
+    user_id = contexto.usuario_id
+    # Lista de etapas vem do cache de referência (invalidado quando o admin altera templates)
+    templates = listar_templates_trimestre('Q4')
+    if templates is None:
+        st.error("Não foi possível carregar os formulários do Q4. Tente novamente em instantes.")
+        return
 
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT id, nome_formulario, caminho_arquivo, nome_arquivo_original 
-            FROM arquivos_templates 
-            WHERE template = 'Q4' AND status = 'ativo' 
-            ORDER BY id ASC
-        """)
-        templates = cursor.fetchall()
-
         if not templates:
             st.info("Nenhum formulário Q4 disponível no momento.")
             return
@@ -95,7 +82,7 @@ def Q4_page():
         for idx, temp in enumerate(templates):
             t_id = temp['id']
             nome_etapa = temp['nome_formulario']
-            concluida = verificar_etapa_concluida(user_id, nome_etapa)
+            concluida = contexto.etapa_concluida(nome_etapa)
             status_final.append(concluida)
             
             # Cache de Feedback (Padronizado)
@@ -117,7 +104,7 @@ def Q4_page():
                                      disabled=not etapa_liberada)
                     
                     if escolha == "Concluído" and not concluida:
-                        if salvar_conclusao_etapa(user_id, nome_etapa):
+                        if contexto.concluir_etapa(nome_etapa):
                             st.rerun()
 
                 if not etapa_liberada:
@@ -133,7 +120,7 @@ def Q4_page():
                         st.error(f"Arquivo não encontrado no servidor: {nome_fisico}")
                     else:
                         try:
-                            with open(caminho_completo, "rb") as f:
+                            with span("ler template", "io"), open(caminho_completo, "rb") as f:
                                 templates_bytes = f.read()
                                                                 
                                 st.download_button(
@@ -166,7 +153,7 @@ def Q4_page():
                                             sucesso_db = salvar_entrega_e_feedback(user_id, nome_etapa, upload_arquivo, resultado)
                                             if sucesso_db:
 
-                                                salvar_conclusao_etapa(user_id, nome_etapa)
+                                                contexto.concluir_etapa(nome_etapa)
                                                 st.toast("Análise finalizada com sucesso!")
                                                 st.rerun()
                                             else:
@@ -183,7 +170,7 @@ def Q4_page():
                         
                         c1, c2 = st.columns([1, 2])
                         with c1:
-                            st.plotly_chart(criar_grafico_circular(res['porcentagem']), width="stretch", config={'displayModeBar': False})
+                            exibir_grafico_circular(res['porcentagem'])
                         with c2:
                             st.markdown(f"#### Diagnóstico de Maturidade Final")
                             st.markdown(f"**Nível:** <span style='color:{res['cor']}; font-size:1.2rem; font-weight:bold;'>{res['zona']}</span>", unsafe_allow_html=True)
@@ -231,10 +218,11 @@ def Q4_page():
         if p_val == 1.0:
             st.info("🎉 **PARABÉNS!** Você completou a jornada de aceleração anual. Sua startup está pronta para novos desafios de governança e mercado.")
 
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
+    except Exception as e:
+        st.error(f"Erro ao carregar página: {e}")
 
 if __name__ == "__main__":
-    Q4_page()
\ No newline at end of file
+    try:
+        Q4_page()
+    finally:
+        finalizar_perfil()
\ No newline at end of file
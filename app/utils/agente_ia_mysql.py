@@ -1,9 +1,12 @@
 import os
 import streamlit as st
 import google.generativeai as genai 
-from youtube_transcript_api import YouTubeTranscriptApi
 import re
 import time
+from utils.perfilador import perfilar
+from utils.telemetria_ia import medir_chamada_ia, preencher_uso_gemini, capturar_contexto, no_contexto
+from utils.transcricoes import carregar_transcricao, segmentar, estruturar_segmentos
+from utils.passagens import formatar_tempo, juntar_segmentos
 
 # ==========================================================
 # 1. CONFIGURAÇÃO GLOBAL (USANDO ST.SECRETS)
@@ -21,6 +24,13 @@ except Exception as e:
 # Modelo que funcionou nos seus testes de terminal
 MODELO = 'models/gemini-2.5-flash'
 
+def _gerar_conteudo(model, conteudo, operacao):
+    """generate_content com registro de telemetria (tokens, latência, resultado)."""
+    with medir_chamada_ia("gemini", MODELO, operacao, etapa="Base de Conhecimento") as telemetria:
+        response = model.generate_content(conteudo)
+        preencher_uso_gemini(telemetria, response)
+    return response
+
 def extrair_id_youtube(url):
     """
     Extrai o ID do vídeo de URLs comuns do YouTube.
@@ -35,6 +45,38 @@ def extrair_id_youtube(url):
             return match.group(1)
     return None
 
+def _estruturar_segmento(model, segmento):
+    prompt = (
+        f"Abaixo está o trecho {formatar_tempo(segmento['inicio_s'])}–{formatar_tempo(segmento['fim_s'])} "
+        "da transcrição bruta de um vídeo. "
+        "Organize este trecho em um material de estudo estruturado e detalhado. "
+        "Não resuma drasticamente; preserve os ensinamentos técnicos. "
+        "Não invente conteúdo que não esteja na transcrição.\n\n"
+        f"TRANSCRIÇÃO:\n{segmento['texto']}"
+    )
+    return _gerar_conteudo(model, prompt, "transcricao_youtube").text
+
+def processar_video_youtube(url):
+    """
+    Legenda (com cache em disco) -> segmentos por tempo -> um prompt por segmento, em paralelo.
+    Retorna (Sucesso: bool, Segmentos_ou_Erro): segmentos = [{inicio_s, fim_s, texto, conteudo, falhou}].
+    """
+    video_id = extrair_id_youtube(url)
+    if not video_id:
+        return False, "ID do YouTube inválido."
+    try:
+        trechos = carregar_transcricao(video_id)
+    except Exception as e:
+        # Sem legenda não há o que indexar: o modelo não assiste ao vídeo pelo link
+        return False, f"Legenda indisponível para este vídeo ({type(e).__name__})."
+    segmentos = segmentar(trechos)
+    if not segmentos:
+        return False, "A legenda do vídeo está vazia."
+    model = genai.GenerativeModel(MODELO)
+    estruturar = no_contexto(capturar_contexto(), lambda segmento: _estruturar_segmento(model, segmento))
+    return True, estruturar_segmentos(segmentos, estruturar)
+
+@perfilar("ia")
 def processar_conteudo_ia(origem_conteudo, nome_para_db=None):
     """
     Função para extrair conhecimento de PDFs (UploadedFile) ou Vídeos do YouTube (URL).
@@ -89,7 +131,7 @@ def processar_conteudo_ia(origem_conteudo, nome_para_db=None):
             )
                         
             # Chamada de geração corrigida para a biblioteca estável
-            response = model.generate_content([prompt, documento])
+            response = _gerar_conteudo(model, [prompt, documento], "extracao_arquivo")
             conteudo_extraido = response.text
             
             # Deleta o arquivo do servidor do Google para limpar cota
@@ -97,36 +139,11 @@ def processar_conteudo_ia(origem_conteudo, nome_para_db=None):
 
         # --- FLUXO YOUTUBE (URL) ---
         elif isinstance(origem_conteudo, str) and ("youtube.com" in origem_conteudo or "youtu.be" in origem_conteudo):
-            video_id = extrair_id_youtube(origem_conteudo)
             caminho_final_banco = origem_conteudo # No caso de vídeo, o "caminho" é a URL
-            
-            if not video_id:
-                return False, "ID do YouTube inválido.", None
-
-            try:
-                # Tenta buscar a legenda original
-                transcript_list = YouTubeTranscriptApi.get_transcript(video_id, languages=['pt', 'en'])
-                texto_transcrito = " ".join([t['text'] for t in transcript_list])
-
-                prompt = (
-                    "Abaixo está a transcrição bruta de um vídeo. "
-                    "Organize este texto em um material de estudo estruturado e detalhado. "
-                    "Não resuma drasticamente; preserve os ensinamentos técnicos.\n\n"
-                    f"TRANSCRIÇÃO:\n{texto_transcrito}"
-                )
-
-                response = model.generate_content(prompt)
-                conteudo_extraido = response.text
-                
-            except Exception:
-                # Fallback: Caso não haja legenda, tenta análise visual pelo prompt
-                prompt_fallback = (
-                    f"Analise o conteúdo do vídeo no link {origem_conteudo}. "
-                    "Descreva detalhadamente todos os pontos ensinados para criar uma base de conhecimento."
-                )
-                
-                response = model.generate_content(prompt_fallback)
-                conteudo_extraido = response.text
+            sucesso, segmentos = processar_video_youtube(origem_conteudo)
+            if not sucesso:
+                return False, segmentos, None
+            conteudo_extraido = juntar_segmentos(segmentos)
              
         else:
             return False, "Origem de conteúdo não suportada.", None
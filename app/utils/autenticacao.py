@@ -0,0 +1,137 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+
+# ==========================================================
+# 1. CONFIGURAÇÃO
+# ==========================================================
+# Custo do bcrypt para hashes novos; hashes antigos com outro custo são refeitos no login
+CUSTO_BCRYPT = int(os.environ.get("FCJ_BCRYPT_CUSTO", 12))
+# O bcrypt libera o GIL: um pool pequeno de threads usa vários núcleos sem travar os scripts
+TRABALHADORES_HASH = int(os.environ.get("FCJ_AUTH_TRABALHADORES", min(4, os.cpu_count() or 1)))
+# Verificações aguardando um trabalhador; acima disso o login responde "tente de novo"
+FILA_MAXIMA_HASH = int(os.environ.get("FCJ_AUTH_FILA", 64))
+TIMEOUT_HASH_S = 15
+
+# Limite de tentativas com senha errada dentro da janela; o IP tem limite maior
+# porque a turma inteira costuma sair pelo mesmo NAT da sala de aula
+JANELA_TENTATIVAS_S = int(os.environ.get("FCJ_AUTH_JANELA_S", 300))
+LIMITE_POR_USUARIO = int(os.environ.get("FCJ_AUTH_LIMITE_USUARIO", 5))
+LIMITE_POR_IP = int(os.environ.get("FCJ_AUTH_LIMITE_IP", 50))
+MAX_CHAVES_LIMITADOR = 10_000
+
+class ServidorOcupado(Exception):
+    """A fila de verificações de senha está cheia."""
+
+# ==========================================================
+# 2. LIMITADOR DE TENTATIVAS (PROCESSO INTEIRO)
+# ==========================================================
+class LimitadorTentativas:
+    """Conta falhas por usuário e por IP numa janela deslizante, antes de gastar CPU com o bcrypt."""
+
+    def __init__(self, janela_s=JANELA_TENTATIVAS_S, limite_usuario=LIMITE_POR_USUARIO, limite_ip=LIMITE_POR_IP):
+        self.janela_s = janela_s
+        self.limites = {"usuario": limite_usuario, "ip": limite_ip}
+        self._falhas = {}
+        self._trava = threading.Lock()
+
+    def _chaves(self, username, ip):
+        chaves = [("usuario", (username or "").strip().lower())]
+        if ip:
+            chaves.append(("ip", ip))
+        return chaves
+
+    def _limpar_antigas(self, fila, agora):
+        while fila and agora - fila[0] > self.janela_s:
+            fila.popleft()
+
+    def espera_restante(self, username, ip=None):
+        """Segundos até liberar uma nova tentativa (0 se liberado)."""
+        agora = time.monotonic()
+        espera = 0.0
+        with self._trava:
+            for chave in self._chaves(username, ip):
+                fila = self._falhas.get(chave)
+                if not fila:
+                    continue
+                self._limpar_antigas(fila, agora)
+                if len(fila) >= self.limites[chave[0]]:
+                    espera = max(espera, self.janela_s - (agora - fila[0]))
+        return espera
+
+    def registrar_falha(self, username, ip=None):
+        agora = time.monotonic()
+        with self._trava:
+            if len(self._falhas) >= MAX_CHAVES_LIMITADOR:
+                # Descarta chaves sem falhas recentes para a memória não crescer sem limite
+                for chave in [c for c, f in self._falhas.items() if not f or agora - f[-1] > self.janela_s]:
+                    del self._falhas[chave]
+            for chave in self._chaves(username, ip):
+                fila = self._falhas.setdefault(chave, deque())
+                self._limpar_antigas(fila, agora)
+                fila.append(agora)
+
+    def registrar_sucesso(self, username, ip=None):
+        # Só zera o usuário: um login certo não apaga as falhas de outros no mesmo IP
+        with self._trava:
+            self._falhas.pop(self._chaves(username, ip)[0], None)
+
+limitador_login = LimitadorTentativas()
+
+# ==========================================================
+# 3. HASH E VERIFICAÇÃO FORA DA THREAD DO SCRIPT
+# ==========================================================
+_pool_hash = ThreadPoolExecutor(max_workers=TRABALHADORES_HASH, thread_name_prefix="bcrypt")
+_vagas_fila = threading.BoundedSemaphore(TRABALHADORES_HASH + FILA_MAXIMA_HASH)
+
+def _executar_no_pool(funcao, *args):
+    if not _vagas_fila.acquire(blocking=False):
+        raise ServidorOcupado("fila de autenticação cheia")
+    try:
+        futuro = _pool_hash.submit(funcao, *args)
+    except Exception:
+        _vagas_fila.release()
+        raise
+    futuro.add_done_callback(lambda _: _vagas_fila.release())
+    return futuro
+
+def _para_bytes(valor):
+    return valor.encode("utf-8") if isinstance(valor, str) else valor
+
+def gerar_hash(senha, custo=CUSTO_BCRYPT):
+    """Hash bcrypt (str) com o custo configurado."""
+    return bcrypt.hashpw(_para_bytes(senha), bcrypt.gensalt(rounds=custo)).decode("utf-8")
+
+def gerar_hashes(senhas, custo=CUSTO_BCRYPT):
+    """Hash de uma lista de senhas; roda dentro dos processos da importação em lote."""
+    return [gerar_hash(senha, custo) for senha in senhas]
+
+def verificar_senha(senha, senha_hash):
+    """bcrypt.checkpw no pool de trabalhadores; bloqueia só a sessão que está logando."""
+    futuro = _executar_no_pool(bcrypt.checkpw, _para_bytes(senha), _para_bytes(senha_hash))
+    return futuro.result(timeout=TIMEOUT_HASH_S)
+
+def custo_do_hash(senha_hash):
+    """Custo gravado no hash ($2b$12$...), ou None se o formato for desconhecido."""
+    try:
+        return int(str(senha_hash).split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+def precisa_rehash(senha_hash):
+    return custo_do_hash(senha_hash) != CUSTO_BCRYPT
+
+def rehash_em_segundo_plano(senha, gravar):
+    """Refaz o hash com o custo atual sem atrasar o login; gravar(novo_hash) persiste o resultado."""
+    def tarefa():
+        try:
+            gravar(gerar_hash(senha))
+        except Exception as e:
+            print(f"⚠️ Falha ao refazer hash de senha: {e}")
+    try:
+        _executar_no_pool(tarefa)
+    except ServidorOcupado:
+        pass # Fica para o próximo login
@@ -0,0 +1,327 @@
+import os
+import re
+import sqlite3
+from datetime import datetime, date
+from functools import lru_cache
+
+# ==========================================================
+# 1. CONFIGURAÇÃO
+# ==========================================================
+CAMINHO_PADRAO = os.path.join(os.getcwd(), "data", "fcj.sqlite3")
+TIMEOUT_LOCK_S = 10
+
+# Datas gravadas como texto ISO; lidas de volta como datetime (igual ao mysql-connector)
+sqlite3.register_adapter(datetime, lambda d: d.isoformat(" "))
+sqlite3.register_adapter(date, lambda d: d.isoformat())
+
+def _converter_datetime(valor):
+    texto = valor.decode()
+    try:
+        return datetime.fromisoformat(texto)
+    except ValueError:
+        return texto
+
+sqlite3.register_converter("DATETIME", _converter_datetime)
+
+# ==========================================================
+# 2. ESQUEMA (MESMAS TABELAS E ÍNDICES DO TIDB)
+# ==========================================================
+ESQUEMA_SQLITE = """
+CREATE TABLE IF NOT EXISTS usuarios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(100) NOT NULL UNIQUE,
+    senha_hash VARCHAR(255) NOT NULL,
+    role VARCHAR(20) NOT NULL DEFAULT 'aluno',
+    ativo BOOLEAN NOT NULL DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS progresso_etapas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    usuario_id INTEGER NOT NULL,
+    nome_etapa VARCHAR(255) NOT NULL,
+    data_conclusao DATETIME DEFAULT (datetime('now', 'localtime')),
+    UNIQUE (usuario_id, nome_etapa)
+);
+
+CREATE TABLE IF NOT EXISTS avaliacoes_ia (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    usuario_id INTEGER NOT NULL,
+    etapa VARCHAR(255) NOT NULL,
+    caminho_arquivo_aluno VARCHAR(500),
+    nome_arquivo_original VARCHAR(255),
+    porcentagem INTEGER,
+    zona VARCHAR(50),
+    feedback_ludico TEXT,
+    cor VARCHAR(20),
+    perguntas_faltantes TEXT,
+    dicas TEXT,
+    data_avaliacao DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_avaliacoes_usuario_data ON avaliacoes_ia (usuario_id, data_avaliacao, id);
+
+CREATE TABLE IF NOT EXISTS arquivos_templates (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome_formulario VARCHAR(255) NOT NULL,
+    template VARCHAR(10) NOT NULL,
+    nome_arquivo_original VARCHAR(255),
+    caminho_arquivo VARCHAR(500),
+    tipo_arquivo VARCHAR(20),
+    status VARCHAR(20) DEFAULT 'ativo',
+    data_upload DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE IF NOT EXISTS logs_erros_ia (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    usuario_id INTEGER NULL,
+    etapa VARCHAR(255),
+    tipo_erro VARCHAR(100),
+    mensagem_erro TEXT,
+    data_erro DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE IF NOT EXISTS ia_conhecimento (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome VARCHAR(255),
+    tipo_conteudo VARCHAR(50),
+    caminho_ou_url VARCHAR(500),
+    conteudo TEXT,
+    descricao TEXT,
+    status VARCHAR(20) DEFAULT 'ativo',
+    data_subida DATETIME DEFAULT (datetime('now', 'localtime')),
+    chave_origem VARCHAR(255) NULL,
+    trimestre VARCHAR(10) NULL,
+    etapa VARCHAR(255) NULL
+);
+-- chave_origem única: duplicados antigos perdem a chave (o reindexar-conhecimento funde depois)
+UPDATE ia_conhecimento SET chave_origem = NULL
+WHERE chave_origem IS NOT NULL
+  AND id < (SELECT MAX(d.id) FROM ia_conhecimento d WHERE d.chave_origem = ia_conhecimento.chave_origem);
+DROP INDEX IF EXISTS idx_conhecimento_origem;
+CREATE UNIQUE INDEX IF NOT EXISTS uk_conhecimento_origem ON ia_conhecimento (chave_origem);
+
+CREATE TABLE IF NOT EXISTS recuperacao_senhas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    identificador VARCHAR(255),
+    data_solicitacao DATETIME DEFAULT (datetime('now', 'localtime')),
+    status VARCHAR(50) DEFAULT 'Pendente'
+);
+
+CREATE TABLE IF NOT EXISTS progresso_resumo (
+    usuario_id INTEGER NOT NULL,
+    trimestre VARCHAR(10) NOT NULL,
+    concluidas INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    ultima_atividade DATETIME NULL,
+    ultima_nota INTEGER NULL,
+    atualizado_em DATETIME DEFAULT (datetime('now', 'localtime')),
+    PRIMARY KEY (usuario_id, trimestre)
+);
+
+CREATE TABLE IF NOT EXISTS telemetria_ia (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    usuario_id INTEGER NULL,
+    etapa VARCHAR(255) NULL,
+    trimestre VARCHAR(10) NULL,
+    provedor VARCHAR(30) NOT NULL,
+    modelo VARCHAR(100) NOT NULL,
+    operacao VARCHAR(50) NOT NULL,
+    tokens_prompt INTEGER NULL,
+    tokens_resposta INTEGER NULL,
+    tokens_cache INTEGER NULL,
+    ttft_ms INTEGER NULL,
+    latencia_ms INTEGER NOT NULL,
+    cache VARCHAR(10) NULL,
+    resultado VARCHAR(10) NOT NULL,
+    mensagem_erro TEXT NULL,
+    data_registro DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_telemetria_data ON telemetria_ia (data_registro);
+
+CREATE TABLE IF NOT EXISTS cache_versions (
+    conjunto VARCHAR(50) NOT NULL PRIMARY KEY,
+    versao INTEGER NOT NULL DEFAULT 0,
+    atualizado_em DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE IF NOT EXISTS sessoes (
+    token_hash CHAR(64) NOT NULL PRIMARY KEY,
+    usuario_id INTEGER NOT NULL,
+    criado_em DATETIME DEFAULT (datetime('now', 'localtime')),
+    expira_em DATETIME NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessoes_usuario ON sessoes (usuario_id);
+CREATE INDEX IF NOT EXISTS idx_sessoes_expira ON sessoes (expira_em);
+
+CREATE TABLE IF NOT EXISTS ingestao_conhecimento (
+    hash_arquivo CHAR(64) NOT NULL PRIMARY KEY,
+    nome_arquivo VARCHAR(255) NOT NULL,
+    conhecimento_id INTEGER NULL,
+    status VARCHAR(20) NOT NULL,
+    mensagem TEXT NULL,
+    atualizado_em DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_ingestao_conhecimento ON ingestao_conhecimento (conhecimento_id);
+
+CREATE TABLE IF NOT EXISTS ia_passagens (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    conhecimento_id INTEGER NOT NULL,
+    ordem INTEGER NOT NULL,
+    hash_passagem CHAR(64) NOT NULL,
+    texto TEXT NOT NULL,
+    inicio_s INTEGER NULL,
+    fim_s INTEGER NULL,
+    trimestre VARCHAR(10) NULL,
+    UNIQUE (conhecimento_id, hash_passagem)
+);
+CREATE INDEX IF NOT EXISTS idx_passagens_trimestre ON ia_passagens (trimestre, conhecimento_id);
+
+CREATE TABLE IF NOT EXISTS pacotes_contexto (
+    template_id INTEGER NOT NULL PRIMARY KEY,
+    etapa VARCHAR(255) NOT NULL,
+    trimestre VARCHAR(10) NULL,
+    versao_fonte CHAR(64) NOT NULL,
+    perguntas TEXT NULL,
+    conteudo TEXT NOT NULL,
+    gerado_em DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+"""
+
+# ==========================================================
+# 3. TRADUÇÃO DO DIALETO MYSQL
+# ==========================================================
+# Só as construções que o app realmente usa; o resto do SQL já é compatível
+_TRADUCOES = (
+    (re.compile(r"\bINSERT\s+IGNORE\s+INTO\b", re.I), "INSERT OR IGNORE INTO"),
+    (re.compile(r"\bTRUNCATE\s+TABLE\b", re.I), "DELETE FROM"),
+    (re.compile(r"\bNOW\(\)\s*-\s*INTERVAL\s+(%s|\d+)\s+DAY\b", re.I), r"datetime('now', 'localtime', '-' || \1 || ' days')"),
+    (re.compile(r"\bNOW\(\)\s*\+\s*INTERVAL\s+(%s|\d+)\s+SECOND\b", re.I), r"datetime('now', 'localtime', '+' || \1 || ' seconds')"),
+    (re.compile(r"\bDATE_ADD\(\s*([^,]+?)\s*,\s*INTERVAL\s+(%s|\d+)\s+DAY\s*\)", re.I), r"datetime(\1, '+' || \2 || ' days')"),
+    (re.compile(r"\bTIMESTAMPDIFF\(\s*HOUR\s*,\s*([^,]+?)\s*,\s*([^)]+?)\s*\)", re.I),
+     r"CAST((julianday(\2) - julianday(\1)) * 24 AS INTEGER)"),
+    (re.compile(r"\bNOW\(\)", re.I), "datetime('now', 'localtime')"),
+    # O SQLite trava o banco inteiro na escrita: a trava por linha não existe (nem é necessária)
+    (re.compile(r"\s+FOR\s+UPDATE\b", re.I), ""),
+)
+
+@lru_cache(maxsize=512)
+def traduzir_sql(sql):
+    """Converte o SQL do mysql-connector (%s, NOW(), INTERVAL...) para o dialeto do SQLite."""
+    for padrao, substituto in _TRADUCOES:
+        sql = padrao.sub(substituto, sql)
+    return sql.replace("%s", "?").replace("%%", "%")
+
+# ==========================================================
+# 4. CONEXÃO E CURSOR COM A INTERFACE DO MYSQL-CONNECTOR
+# ==========================================================
+class CursorSQLite:
+    """Cursor com a mesma interface usada do mysql-connector (inclusive dictionary=True)."""
+
+    def __init__(self, conn, dictionary=False):
+        self._cursor = conn.cursor()
+        self._dicionario = dictionary
+
+    def execute(self, sql, params=None, *args, **kwargs):
+        self._cursor.execute(traduzir_sql(sql), tuple(params) if params else ())
+
+    def executemany(self, sql, seq_params, *args, **kwargs):
+        self._cursor.executemany(traduzir_sql(sql), [tuple(p) for p in seq_params])
+
+    def _converter(self, linha):
+        if linha is None or not self._dicionario:
+            return linha
+        return dict(zip([c[0] for c in self._cursor.description], linha))
+
+    def fetchone(self):
+        return self._converter(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._converter(l) for l in self._cursor.fetchall()]
+
+    def fetchmany(self, tamanho=1):
+        return [self._converter(l) for l in self._cursor.fetchmany(tamanho)]
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+class ConexaoSQLite:
+    """Conexão SQLite vista pelo app como se fosse a do mysql-connector."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._aberta = True
+
+    def cursor(self, dictionary=False, *args, **kwargs):
+        return CursorSQLite(self._conn, dictionary=dictionary)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def executescript(self, script):
+        self._conn.executescript(script)
+
+    def is_connected(self):
+        return self._aberta
+
+    def close(self):
+        if self._aberta:
+            self._conn.close()
+            self._aberta = False
+
+def conectar_sqlite(caminho=CAMINHO_PADRAO):
+    """Abre o arquivo SQLite em modo WAL (leitores não bloqueiam o escritor)."""
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    conn = sqlite3.connect(caminho, timeout=TIMEOUT_LOCK_S, detect_types=sqlite3.PARSE_DECLTYPES)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={TIMEOUT_LOCK_S * 1000}")
+    return ConexaoSQLite(conn)
+
+# Colunas acrescentadas depois da criação das tabelas: bancos locais antigos ganham via ALTER
+COLUNAS_ADICIONADAS = (
+    ("ia_conhecimento", "chave_origem", "VARCHAR(255) NULL"),
+    ("ia_passagens", "inicio_s", "INTEGER NULL"),
+    ("ia_passagens", "fim_s", "INTEGER NULL"),
+    ("ia_conhecimento", "trimestre", "VARCHAR(10) NULL"),
+    ("ia_conhecimento", "etapa", "VARCHAR(255) NULL"),
+    ("ia_passagens", "trimestre", "VARCHAR(10) NULL"),
+)
+
+def _migrar_colunas(conn):
+    cursor = conn.cursor()
+    for tabela, coluna, definicao in COLUNAS_ADICIONADAS:
+        cursor.execute(f"PRAGMA table_info({tabela})")
+        colunas = {linha[1] for linha in cursor.fetchall()}
+        if colunas and coluna not in colunas:
+            cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}")
+    cursor.close()
+
+def criar_esquema_sqlite(conn):
+    """Cria todas as tabelas e índices (equivalente ao esquema do TiDB + init_db)."""
+    _migrar_colunas(conn)
+    conn.executescript(ESQUEMA_SQLITE)
+    conn.commit()
@@ -0,0 +1,133 @@
+import os
+import copy
+import time
+import threading
+
+# ==========================================================
+# 1. CACHE DE DADOS DE REFERÊNCIA (PROCESSO INTEIRO)
+# ==========================================================
+# Templates e metadados da base de conhecimento mudam raramente (só pelo admin)
+# e são lidos a cada render das páginas Q1-Q4 e das abas de gestão.
+# Cada conjunto tem um carimbo de versão: qualquer escrita chama invalidar(),
+# que sobe a versão e faz a próxima leitura voltar ao banco.
+CONJUNTOS = ("templates", "conhecimento")
+
+# Conjuntos derivados: sobem de versão junto com a fonte (aqui ou vindo de outra réplica).
+# Os pacotes de contexto do analisador são montados a partir de templates e base de conhecimento.
+DEPENDENTES = {"templates": ("pacotes",), "conhecimento": ("pacotes",)}
+
+# Com várias réplicas, as versões também ficam na tabela cache_versions.
+# Cada processo consulta essa tabela no máximo a cada INTERVALO_SYNC_S segundos,
+# então uma escrita feita em outra réplica aparece aqui com esse atraso máximo.
+INTERVALO_SYNC_S = float(os.environ.get("FCJ_CACHE_SYNC_S", 5))
+
+class CacheReferencia:
+    """Cache read-through por conjunto/chave, invalidado por carimbo de versão."""
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._versoes = {}
+        self._entradas = {}
+        # Uma trava por chave: sessões simultâneas esperam uma única ida ao banco
+        self._travas_carga = {}
+        self.acertos = 0
+        self.faltas = 0
+        self.invalidacoes = 0
+        # Sincronização entre réplicas (configurada pelo db.py)
+        self._ler_versoes_remotas = None
+        self._versoes_remotas = {}
+        self._ultimo_sync = 0.0
+        self._sync_em_andamento = False
+        self.sincronizacoes = 0
+        self.invalidacoes_remotas = 0
+
+    def configurar_sincronizacao(self, ler_versoes):
+        """ler_versoes() -> {conjunto: versao} lido da tabela cache_versions."""
+        self._ler_versoes_remotas = ler_versoes
+
+    def _sincronizar(self):
+        """Consulta as versões remotas se o intervalo venceu; só uma thread faz a leitura."""
+        if self._ler_versoes_remotas is None:
+            return
+        with self._trava:
+            if self._sync_em_andamento or time.monotonic() - self._ultimo_sync < INTERVALO_SYNC_S:
+                return
+            self._sync_em_andamento = True
+        try:
+            remotas = self._ler_versoes_remotas()
+        except Exception as e:
+            remotas = None
+            print(f"⚠️ Falha ao sincronizar versões do cache: {e}")
+        with self._trava:
+            self._sync_em_andamento = False
+            self._ultimo_sync = time.monotonic()
+            if remotas is None:
+                return
+            # Na primeira leitura só guardamos a base; depois, conjunto novo conta como versão 0
+            primeira = self.sincronizacoes == 0
+            self.sincronizacoes += 1
+            for conjunto, versao in remotas.items():
+                if self._versoes_remotas.get(conjunto, versao if primeira else 0) != versao:
+                    # Outra réplica (ou este processo) escreveu: descarta o que está em memória
+                    self._subir_versao(conjunto)
+                    self.invalidacoes_remotas += 1
+                self._versoes_remotas[conjunto] = versao
+
+    def _subir_versao(self, conjunto):
+        """Sobe a versão do conjunto e dos que dependem dele (chamar com self._trava)."""
+        for alvo in (conjunto,) + DEPENDENTES.get(conjunto, ()):
+            self._versoes[alvo] = self._versoes.get(alvo, 0) + 1
+
+    def versao(self, conjunto):
+        with self._trava:
+            return self._versoes.get(conjunto, 0)
+
+    def obter(self, conjunto, chave, carregar):
+        """Devolve uma cópia do valor em cache ou chama carregar() e guarda o resultado."""
+        self._sincronizar()
+        with self._trava:
+            versao = self._versoes.get(conjunto, 0)
+            entrada = self._entradas.get((conjunto, chave))
+            if entrada and entrada[0] == versao:
+                self.acertos += 1
+                return copy.deepcopy(entrada[1])
+            trava_carga = self._travas_carga.setdefault((conjunto, chave), threading.Lock())
+
+        with trava_carga:
+            # Outra thread pode ter carregado enquanto esperávamos
+            with self._trava:
+                versao = self._versoes.get(conjunto, 0)
+                entrada = self._entradas.get((conjunto, chave))
+                if entrada and entrada[0] == versao:
+                    self.acertos += 1
+                    return copy.deepcopy(entrada[1])
+                self.faltas += 1
+
+            valor = carregar()
+
+            with self._trava:
+                # Se houve escrita durante a carga a versão mudou: o valor já nasce vencido
+                self._entradas[(conjunto, chave)] = (versao, valor)
+            return copy.deepcopy(valor)
+
+    def invalidar(self, *conjuntos):
+        with self._trava:
+            for conjunto in conjuntos:
+                self._subir_versao(conjunto)
+            self.invalidacoes += 1
+
+    def estatisticas(self):
+        with self._trava:
+            total = self.acertos + self.faltas
+            return {
+                "versoes": dict(self._versoes),
+                "entradas": len(self._entradas),
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+                "taxa_acerto_%": round(100 * self.acertos / total, 1) if total else 0.0,
+                "invalidacoes": self.invalidacoes,
+                "sincronizacoes": self.sincronizacoes,
+                "invalidacoes_remotas": self.invalidacoes_remotas,
+            }
+
+cache_referencia = CacheReferencia()
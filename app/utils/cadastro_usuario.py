@@ -3,13 +3,148 @@ import pandas as pd
 import time
 import os
 from dotenv import load_dotenv
-from utils.db import conectar, cadastrar_usuario_db, remover_usuario_db
+from utils.db import cadastrar_usuario_db, buscar_usuarios_paginados, aplicar_alteracoes_usuarios
+from utils.importacao_usuarios import ler_planilha_usuarios, validar_usuarios, importar_usuarios
 
 # ==========================================================
 # 1. CONFIGURAÇÃO DE CREDENCIAIS (HÍBRIDO: LOCAL/CLOUD)
 # ==========================================================
 load_dotenv()
 
+USUARIOS_POR_PAGINA = 25
+
+def _resetar_paginacao_usuarios(assinatura):
+    """Volta para a primeira página sempre que os filtros mudarem."""
+    if st.session_state.get("usuarios_assinatura") != assinatura:
+        st.session_state.usuarios_assinatura = assinatura
+        st.session_state.usuarios_pilha_chaves = [None]
+
+def lista_usuarios_paginada():
+    # --- 1. FILTROS (APLICADOS NO BANCO) ---
+    f1, f2, f3 = st.columns([2, 1, 1])
+    with f1:
+        busca = st.text_input("Buscar usuário", placeholder="Parte do username", key="usuarios_filtro_busca")
+    with f2:
+        role = st.selectbox("Perfil", ["Todos", "aluno", "admin"], key="usuarios_filtro_role")
+    with f3:
+        status = st.selectbox("Status", ["Todos", "Ativos", "Inativos"], key="usuarios_filtro_status")
+
+    role = None if role == "Todos" else role
+    ativo = {"Ativos": True, "Inativos": False}.get(status)
+    _resetar_paginacao_usuarios((busca, role, ativo))
+
+    # --- 2. PÁGINA ATUAL ---
+    pilha = st.session_state.usuarios_pilha_chaves
+    usuarios, proxima_chave = buscar_usuarios_paginados(
+        busca=busca, role=role, ativo=ativo, apos=pilha[-1], limite=USUARIOS_POR_PAGINA
+    )
+    if not usuarios:
+        if len(pilha) > 1:
+            # Página vazia depois da chave (ex: outro admin removeu os usuários restantes): volta uma página
+            pilha.pop()
+            st.rerun()
+        st.info("Nenhum usuário encontrado.")
+        return
+
+    df_users = pd.DataFrame(usuarios)
+    df_users["ativo"] = df_users["ativo"].astype(bool)
+    df_users["remover"] = False
+    chave_editor = f"usuarios_editor_{len(pilha)}_{st.session_state.get('usuarios_versao_editor', 0)}"
+    editado = st.data_editor(
+        df_users,
+        key=chave_editor,
+        hide_index=True,
+        width="stretch",
+        disabled=["id", "username", "role"],
+        column_order=["username", "role", "ativo", "remover"],
+        column_config={
+            "username": st.column_config.TextColumn("Usuário"),
+            "role": st.column_config.TextColumn("Perfil"),
+            "ativo": st.column_config.CheckboxColumn("Ativo"),
+            "remover": st.column_config.CheckboxColumn("Remover", help="Marque e clique em Aplicar alterações"),
+        },
+    )
+
+    # --- 3. ALTERAÇÕES EM LOTE (UMA TRANSAÇÃO) ---
+    # O 'master' é protegido: qualquer marcação nele é ignorada
+    mudou = editado[editado["username"].str.lower() != "master"]
+    original = df_users.set_index("id")["ativo"]
+    ativar = [int(i) for i, a in zip(mudou["id"], mudou["ativo"]) if a and not original[i]]
+    desativar = [int(i) for i, a in zip(mudou["id"], mudou["ativo"]) if not a and original[i]]
+    remover = [int(i) for i in mudou.loc[mudou["remover"], "id"]]
+
+    if ativar or desativar or remover:
+        st.caption(f"Pendentes: {len(ativar)} ativar · {len(desativar)} desativar · {len(remover)} remover")
+        confirmado = True
+        if remover:
+            confirmado = st.checkbox(f"Confirmo a exclusão de {len(remover)} usuário(s)", key="usuarios_confirma_remocao")
+        if st.button("Aplicar alterações", type="primary", disabled=not confirmado, key="usuarios_aplicar"):
+            sucesso, resultado = aplicar_alteracoes_usuarios(ativar, desativar, remover)
+            if sucesso:
+                st.toast(f"✅ {resultado['ativados']} ativados, {resultado['desativados']} desativados, "
+                         f"{resultado['removidos']} removidos.")
+                # Nova chave descarta as edições já aplicadas; a página volta ao início (chaves podem ter sumido)
+                st.session_state["usuarios_versao_editor"] = st.session_state.get("usuarios_versao_editor", 0) + 1
+                st.session_state.usuarios_pilha_chaves = [None]
+                time.sleep(0.5)
+                st.rerun()
+            else:
+                st.error(resultado)
+
+    # --- 4. NAVEGAÇÃO ENTRE PÁGINAS ---
+    c_ant, c_pag, c_prox = st.columns([1, 2, 1])
+    with c_ant:
+        if st.button("⬅️ Anterior", disabled=len(pilha) == 1, key="usuarios_pag_anterior", width="stretch"):
+            pilha.pop()
+            st.rerun()
+    with c_pag:
+        st.caption(f"Página {len(pilha)}")
+    with c_prox:
+        if st.button("Próxima ➡️", disabled=proxima_chave is None, key="usuarios_pag_proxima", width="stretch"):
+            pilha.append(proxima_chave)
+            st.rerun()
+
+def importacao_em_lote():
+    st.caption("Colunas: **username**, **senha** e, opcionalmente, **role** (aluno/admin) e **ativo**.")
+    arquivo = st.file_uploader("Planilha de usuários", type=["csv", "xlsx"], key="imp_usuarios_arquivo")
+    if not arquivo:
+        return
+
+    try:
+        df = ler_planilha_usuarios(arquivo)
+    except Exception as e:
+        st.error(f"Não foi possível ler a planilha: {e}")
+        return
+
+    validos, problemas = validar_usuarios(df)
+    c1, c2 = st.columns(2)
+    c1.metric("Linhas válidas", len(validos))
+    c2.metric("Linhas com problema", len(problemas))
+    if problemas:
+        st.dataframe(pd.DataFrame(problemas), width="stretch", hide_index=True)
+
+    if st.button("Importar usuários válidos", type="primary", disabled=not validos, key="imp_usuarios_btn"):
+        barra = st.progress(0.0, text="Gerando hashes das senhas...")
+        relatorio = importar_usuarios(
+            df, progresso=lambda feitos, total: barra.progress(feitos / total, text=f"Hashes: {feitos}/{total}")
+        )
+        barra.empty()
+        if relatorio["erro"]:
+            st.error(relatorio["erro"])
+        else:
+            tempos = relatorio["tempos_s"]
+            st.success(f"✅ {relatorio['importados']} usuários importados em {tempos['total']}s "
+                       f"({relatorio['usuarios_por_s']} usuários/s; hash {tempos['hash']}s, "
+                       f"gravação {tempos.get('insercao', 0)}s).")
+        if relatorio["problemas"]:
+            df_problemas = pd.DataFrame(relatorio["problemas"])
+            st.warning(f"⚠️ {len(df_problemas)} linhas não importadas.")
+            st.dataframe(df_problemas, width="stretch", hide_index=True)
+            st.download_button(
+                "⬇️ Baixar relatório de conflitos (CSV)", data=df_problemas.to_csv(index=False).encode("utf-8"),
+                file_name="conflitos_importacao.csv", mime="text/csv", key="imp_usuarios_relatorio"
+            )
+
 def exibir_usuarios_admin():
     # --- ESTILIZAÇÃO CSS PRESERVADA ---
     st.markdown("""
@@ -52,48 +187,12 @@ def exibir_usuarios_admin():
             else:
                 st.warning("⚠️ Preencha todos os campos.")
 
+    # --- IMPORTAÇÃO EM LOTE (TURMA INTEIRA) ---
+    with st.expander("📥 Importar usuários em lote (CSV/XLSX)", expanded=False):
+        importacao_em_lote()
+
     st.divider()
 
-    # --- LISTA DE USUÁRIOS (LAYOUT PRESERVADO) ---
+    # --- LISTA DE USUÁRIOS (PAGINADA NO BANCO) ---
     st.subheader("📋 Usuários Cadastrados")
-    
-    conn = conectar() # Usa sua função padrão de conexão para testar disponibilidade
-    if conn:
-        try:
-            query = "SELECT id, username, role, ativo FROM usuarios ORDER BY username ASC"
-            # O pandas usa o engine SQLAlchemy para converter SQL em DataFrame
-            df_users = pd.read_sql(query, conn)
-            
-            if not df_users.empty:
-                # Cabeçalho da Tabela
-                h1, h2, h3, h4 = st.columns([0.3, 0.3, 0.2, 0.2])
-                h1.markdown("**Usuário**")
-                h2.markdown("**Perfil**")
-                h3.markdown("**Status**")
-                h4.markdown("**Ação**")
-                st.divider()
-
-                for _, row in df_users.iterrows():
-                    c1, c2, c3, c4 = st.columns([0.3, 0.3, 0.2, 0.2])
-                    c1.write(f"👤 {row['username']}")
-                    c2.write(row['role'])
-                    c3.write("✅ Ativo" if row['ativo'] else "❌ Inativo")
-                    
-                    with c4:
-                        # Proteção para o usuário master não ser deletado por acidente
-                        if row['username'].lower() == "master":
-                            st.button("🔒", key=f"lock_{row['id']}", disabled=True, help="Usuário mestre")
-                        else:
-                            if st.button("🗑️", key=f"user_del_{row['id']}"):
-                                if remover_usuario_db(row['id'], row['username']):
-                                    st.toast(f"Usuário {row['username']} removido!")
-                                    time.sleep(0.5)
-                                    st.rerun()
-                    
-                    st.markdown('<hr style="margin: 0.5rem 0; opacity: 0.1;">', unsafe_allow_html=True)
-            else:
-                st.info("Nenhum usuário encontrado.")
-        except Exception as e:
-            st.error(f"Erro ao processar lista de usuários: {e}")
-        finally:
-            conn.close() # Importante para não travar o banco
\ No newline at end of file
+    lista_usuarios_paginada()
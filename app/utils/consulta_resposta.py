@@ -2,13 +2,81 @@ import streamlit as st
 import pandas as pd
 import json
 import os
-from utils.db import conectar
-from utils.ui import criar_grafico_circular
+from utils.db import (
+    conectar, buscar_avaliacoes_paginadas, buscar_avaliacao_por_id, listar_etapas_avaliadas
+)
+from utils.ui import exibir_grafico_circular
+from utils.perfilador import span
+
+ITENS_POR_PAGINA = 20
+
+def _resetar_paginacao(assinatura):
+    """Volta para a primeira página sempre que o aluno ou os filtros mudarem."""
+    if st.session_state.get("consulta_assinatura") != assinatura:
+        st.session_state.consulta_assinatura = assinatura
+        st.session_state.consulta_pilha_chaves = [None]
+
+def _exibir_detalhes_entrega(avaliacao_id):
+    """Materializa o conteúdo da entrega (arquivo, gráfico e parecer) sob demanda."""
+    entrega = buscar_avaliacao_por_id(avaliacao_id)
+    if not entrega:
+        st.error("Não foi possível carregar os detalhes desta entrega.")
+        return
+
+    # Conteúdo interno (Download e Diagnóstico)
+    st.markdown("### 📥 Arquivo Enviado")
+
+    # ---CAMINHO E DOWNLOAD ---#
+    caminho_db = entrega['caminho_arquivo_aluno'] or ""
+    # Extrai apenas o nome do arquivo para evitar uploads/entregas_alunos duplicado
+    nome_fisico = os.path.basename(caminho_db)
+    caminho_completo = os.path.join("uploads", "entregas_alunos", nome_fisico)
+
+    if nome_fisico and os.path.exists(caminho_completo):
+        try:
+            with span("ler entrega do aluno", "io"), open(caminho_completo, "rb") as f:
+                conteudo_arquivo = f.read()
+
+            st.download_button(
+                label=f"⬇️ Baixar {entrega['nome_arquivo_original']}",
+                data=conteudo_arquivo, # Passamos o binário lido
+                file_name=entrega['nome_arquivo_original'] or "entrega.xlsx",
+                mime="application/octet-stream", # Genérico para aceitar PDF/Excel
+                key=f"dl_admin_{entrega['id']}"
+            )
+        except Exception as e:
+            st.error(f"Erro ao ler arquivo para download: {e}")
+    else:
+        st.error(f"⚠️ Arquivo não encontrado.")
+        st.caption(f"Caminho esperado: `{caminho_completo}`")
+
+    st.divider()
+    st.markdown("### 🤖 Diagnóstico da IA")
+
+    # Gráfico e Métricas
+    porcentagem = entrega.get('porcentagem', 0)
+    c_esq, c_meio, c_dir = st.columns([1, 2, 1])
+    with c_meio:
+        exibir_grafico_circular(porcentagem)
+
+    st.write(f"**Performance:** `{porcentagem}%` | **Zona:** `{entrega['zona']}`")
+    st.info(f"**Parecer:** {entrega['feedback_ludico']}")
+
+    if entrega.get('perguntas_faltantes'):
+        try:
+            faltantes = json.loads(entrega['perguntas_faltantes']) if isinstance(entrega['perguntas_faltantes'], str) else entrega['perguntas_faltantes']
+            if faltantes:
+                with st.expander("⚠️ Itens não detectados"):
+                    for item in faltantes:
+                        st.write(f"• {item}")
+        except: pass
+    if entrega.get('dicas'):
+        st.info(f"💡 **Diretriz Estratégica:** {entrega['dicas']}")
 
 def aba_consulta_respostas():
     # ÚNICO CABEÇALHO DA PÁGINA
     st.header("🔍 Resultados das Startups")
-    
+
     conn = conectar()
     if not conn:
         st.error("Erro ao conectar ao banco de dados.")
@@ -16,92 +84,73 @@ def aba_consulta_respostas():
 
     try:
         cursor = conn.cursor(dictionary=True)
-       
+
         # --- 1. SELEÇÃO INDIVIDUAL DO ALUNO ---
         cursor.execute("SELECT id, username FROM usuarios WHERE role = 'aluno'")
         alunos = cursor.fetchall()
-        
-        if not alunos:
-            st.warning("Nenhum aluno cadastrado no sistema.")
-            return
-
-        lista_alunos = {a['username']: a['id'] for a in alunos}
-        
-        # Filtro de seleção direto
-        nome_aluno = st.selectbox("Selecione a Startup/Aluno para detalhes:", options=list(lista_alunos.keys()))
-        aluno_id = lista_alunos[nome_aluno]
-
-        # --- 2. BUSCA O HISTÓRICO INDIVIDUAL ---
-        query = """
-            SELECT id, etapa, caminho_arquivo_aluno, nome_arquivo_original, 
-                   porcentagem, zona, feedback_ludico, perguntas_faltantes, dicas, data_avaliacao 
-            FROM avaliacoes_ia  
-            WHERE usuario_id = %s 
-            ORDER BY data_avaliacao DESC
-        """
-        cursor.execute(query, (aluno_id,))
-        entregas = cursor.fetchall()
-
-        if not entregas:
-            st.info(f"O aluno **{nome_aluno}** ainda não realizou nenhuma entrega.")
-        else:
-            # Exibe cada entrega em um expander
-            for entrega in entregas:
-                data_dt = entrega['data_avaliacao']
-                data_formatada = data_dt.strftime("%d/%m/%Y %H:%M") if data_dt else "Data N/A"
-                
-                with st.expander(f"📅 {entrega['etapa']} - Avaliado em: {data_formatada}"):
-                    # Conteúdo interno (Download e Diagnóstico)
-                    st.markdown("### 📥 Arquivo Enviado")
-                       
-                    # ---CAMINHO E DOWNLOAD ---#                                     
-                    caminho_db = entrega['caminho_arquivo_aluno'] 
-                    # Extrai apenas o nome do arquivo para evitar uploads/entregas_alunos duplicado
-                    nome_fisico = os.path.basename(caminho_db)
-                    caminho_completo = os.path.join("uploads", "entregas_alunos", nome_fisico)
-                    
-                    if os.path.exists(caminho_completo):
-                        try:
-                            with open(caminho_completo, "rb") as f:
-                                conteudo_arquivo = f.read()
-                                
-                            st.download_button(
-                                label=f"⬇️ Baixar {entrega['nome_arquivo_original']}",
-                                data=conteudo_arquivo, # Passamos o binário lido
-                                file_name=entrega['nome_arquivo_original'] or "entrega.xlsx",
-                                mime="application/octet-stream", # Genérico para aceitar PDF/Excel
-                                key=f"dl_admin_{entrega['id']}"
-                            )
-                        except Exception as e:
-                            st.error(f"Erro ao ler arquivo para download: {e}")
-                    else:
-                        st.error(f"⚠️ Arquivo não encontrado.")
-                        st.caption(f"Caminho esperado: `{caminho_completo}`")
-                    
-                    st.divider()
-                    st.markdown("### 🤖 Diagnóstico da IA")
-                    
-                    # Gráfico e Métricas
-                    porcentagem = entrega.get('porcentagem', 0)
-                    c_esq, c_meio, c_dir = st.columns([1, 2, 1])
-                    with c_meio:
-                        st.plotly_chart(criar_grafico_circular(porcentagem), width="stretch")
-                    
-                    st.write(f"**Performance:** `{porcentagem}%` | **Zona:** `{entrega['zona']}`")
-                    st.info(f"**Parecer:** {entrega['feedback_ludico']}")
-                    
-                    if entrega.get('perguntas_faltantes'):
-                        try:
-                            faltantes = json.loads(entrega['perguntas_faltantes']) if isinstance(entrega['perguntas_faltantes'], str) else entrega['perguntas_faltantes']
-                            if faltantes:
-                                with st.expander("⚠️ Itens não detectados"):
-                                    for item in faltantes:
-                                        st.write(f"• {item}")
-                        except: pass
-                    if entrega.get('dicas'):
-                        st.info(f"💡 **Diretriz Estratégica:** {entrega['dicas']}")
-
     except Exception as e:
         st.error(f"Erro ao carregar dados: {str(e)}")
+        return
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+    if not alunos:
+        st.warning("Nenhum aluno cadastrado no sistema.")
+        return
+
+    lista_alunos = {a['username']: a['id'] for a in alunos}
+
+    # Filtro de seleção direto
+    nome_aluno = st.selectbox("Selecione a Startup/Aluno para detalhes:", options=list(lista_alunos.keys()))
+    aluno_id = lista_alunos[nome_aluno]
+
+    # --- 2. FILTROS DO HISTÓRICO ---
+    f1, f2, f3, f4 = st.columns([1.5, 0.8, 0.9, 0.9])
+    with f1:
+        etapa = st.selectbox("Etapa", ["Todas"] + listar_etapas_avaliadas(aluno_id), key="consulta_filtro_etapa")
+    with f2:
+        trimestre = st.selectbox("Trimestre", ["Todos", "Q1", "Q2", "Q3", "Q4"], key="consulta_filtro_trimestre")
+    with f3:
+        data_inicio = st.date_input("De", value=None, format="DD/MM/YYYY", key="consulta_filtro_inicio")
+    with f4:
+        data_fim = st.date_input("Até", value=None, format="DD/MM/YYYY", key="consulta_filtro_fim")
+
+    etapa = None if etapa == "Todas" else etapa
+    trimestre = None if trimestre == "Todos" else trimestre
+    _resetar_paginacao((aluno_id, etapa, trimestre, data_inicio, data_fim))
+
+    # --- 3. BUSCA A PÁGINA ATUAL DO HISTÓRICO ---
+    pilha = st.session_state.consulta_pilha_chaves
+    entregas, proxima_chave = buscar_avaliacoes_paginadas(
+        aluno_id, etapa=etapa, trimestre=trimestre,
+        data_inicio=data_inicio, data_fim=data_fim,
+        apos=pilha[-1], limite=ITENS_POR_PAGINA
+    )
+
+    if not entregas and len(pilha) == 1:
+        st.info(f"O aluno **{nome_aluno}** ainda não realizou nenhuma entrega com esses filtros.")
+        return
+
+    # Exibe cada entrega em um expander; o conteúdo só é carregado quando solicitado
+    for entrega in entregas:
+        data_dt = entrega['data_avaliacao']
+        data_formatada = data_dt.strftime("%d/%m/%Y %H:%M") if data_dt else "Data N/A"
+
+        with st.expander(f"📅 {entrega['etapa']} - Avaliado em: {data_formatada} - {entrega['porcentagem']}%"):
+            if st.toggle("Carregar detalhes", key=f"consulta_detalhes_{entrega['id']}"):
+                _exibir_detalhes_entrega(entrega['id'])
+            else:
+                st.caption(f"Zona: {entrega['zona']}")
+
+    # --- 4. NAVEGAÇÃO ENTRE PÁGINAS ---
+    c_ant, c_pag, c_prox = st.columns([1, 2, 1])
+    with c_ant:
+        if st.button("⬅️ Anterior", disabled=len(pilha) == 1, key="consulta_pag_anterior", width="stretch"):
+            pilha.pop()
+            st.rerun()
+    with c_pag:
+        st.caption(f"Página {len(pilha)}")
+    with c_prox:
+        if st.button("Próxima ➡️", disabled=proxima_chave is None, key="consulta_pag_proxima", width="stretch"):
+            pilha.append(proxima_chave)
+            st.rerun()
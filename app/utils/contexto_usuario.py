@@ -0,0 +1,102 @@
+import os
+import time
+import streamlit as st
+from utils.db import (
+    buscar_resumo_progresso, trimestre_concluido, listar_etapas_concluidas,
+    salvar_conclusao_etapa, contar_alunos, listar_templates_db
+)
+
+# ==========================================================
+# 1. CONFIGURAÇÃO
+# ==========================================================
+# Progresso e contadores ficam na sessão por até TTL_CONTEXTO_S segundos.
+# As escritas do próprio aluno (concluir_etapa) invalidam na hora; o TTL cobre
+# mudanças feitas por outros (ex: admin alterando templates).
+TTL_CONTEXTO_S = float(os.environ.get("FCJ_CONTEXTO_TTL_S", 60))
+TRIMESTRES = ("Q1", "Q2", "Q3", "Q4")
+CHAVE_SESSAO = "contexto_usuario"
+
+# ==========================================================
+# 2. CONTEXTO DO USUÁRIO (UM POR SESSÃO)
+# ==========================================================
+class ContextoUsuario:
+    """Perfil, permissões e progresso do usuário logado, montado uma vez no login."""
+
+    def __init__(self, usuario_id, username, role):
+        self.usuario_id = usuario_id
+        self.username = username
+        self.role = role
+        self._valores = {}
+
+    @property
+    def is_admin(self):
+        return self.role == "admin"
+
+    def _obter(self, nome, carregar):
+        """Valor em cache na sessão enquanto não vencer o TTL; falhas do banco (None) não ficam em cache."""
+        entrada = self._valores.get(nome)
+        if entrada and time.monotonic() - entrada[0] < TTL_CONTEXTO_S:
+            return entrada[1]
+        valor = carregar()
+        if valor is not None:
+            self._valores[nome] = (time.monotonic(), valor)
+        return valor
+
+    def invalidar_progresso(self):
+        self._valores.pop("progresso", None)
+        self._valores.pop("etapas_concluidas", None)
+
+    # --- PROGRESSO E TRAVAS DOS TRIMESTRES ---
+    def progresso(self):
+        """Resumo materializado {trimestre: {concluidas, total, ...}} ou None se o banco falhar."""
+        return self._obter("progresso", lambda: buscar_resumo_progresso(self.usuario_id))
+
+    def fracao_trimestre(self, trimestre):
+        linha = (self.progresso() or {}).get(trimestre)
+        if not linha or not linha['total']:
+            return 0
+        return linha['concluidas'] / linha['total']
+
+    def trimestre_liberado(self, trimestre):
+        """Q1 sempre abre; os demais só com o trimestre anterior 100% concluído."""
+        indice = TRIMESTRES.index(trimestre)
+        if indice == 0:
+            return True
+        return trimestre_concluido(self.progresso(), TRIMESTRES[indice - 1])
+
+    def etapa_concluida(self, nome_etapa):
+        concluidas = self._obter("etapas_concluidas", lambda: listar_etapas_concluidas(self.usuario_id))
+        return nome_etapa.strip() in (concluidas or set())
+
+    def concluir_etapa(self, nome_etapa):
+        """Grava a conclusão e descarta o progresso em cache da sessão."""
+        sucesso = salvar_conclusao_etapa(self.usuario_id, nome_etapa)
+        self.invalidar_progresso()
+        return sucesso
+
+    # --- CONTADORES DO PAINEL ADMIN ---
+    def contadores(self):
+        return {
+            "alunos": self._obter("total_alunos", contar_alunos),
+            "templates": self._obter("total_templates", lambda: len(listar_templates_db())),
+        }
+
+# ==========================================================
+# 3. ACESSO PELA SESSÃO
+# ==========================================================
+def criar_contexto(user):
+    """Chamado no login com a linha do usuário autenticado."""
+    contexto = ContextoUsuario(user["id"], user["username"], user["role"])
+    st.session_state[CHAVE_SESSAO] = contexto
+    return contexto
+
+def contexto_atual():
+    """Contexto da sessão logada; remonta a partir dos campos da sessão se ainda não existir."""
+    contexto = st.session_state.get(CHAVE_SESSAO)
+    if contexto is None and st.session_state.get("usuario_id") is not None:
+        contexto = criar_contexto({
+            "id": st.session_state["usuario_id"],
+            "username": st.session_state.get("user", "Usuário"),
+            "role": st.session_state.get("role", "aluno"),
+        })
+    return contexto
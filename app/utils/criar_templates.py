@@ -6,6 +6,7 @@ import base64
 import time
 from datetime import datetime
 from utils.db import salvar_template_db, listar_templates_db, excluir_template, conectar
+from utils.pacotes_contexto import gerar_pacotes_contexto
 
 # --------------------------------
 # FUNÇÕES DE APOIO (LAYOUT)
@@ -138,5 +139,18 @@ def cria_templates_page():
                             st.rerun()
                 
                 st.markdown('<hr style="margin: 0.3rem 0; opacity: 0.1;">', unsafe_allow_html=True)
+
+        # Pacotes de contexto do analisador: só os templates/aulas que mudaram são regerados
+        if st.button("🧩 Atualizar pacotes de contexto da IA", key="btn_pacotes_contexto"):
+            with st.spinner("Montando os pacotes de cada etapa..."):
+                relatorio = gerar_pacotes_contexto()
+            if relatorio["erro"]:
+                st.error(relatorio["erro"])
+            elif relatorio["falhas"]:
+                st.warning(f"⚠️ {relatorio['gerados']} gerados, {relatorio['reaproveitados']} reaproveitados e "
+                           f"{relatorio['falhas']} falhas.")
+            else:
+                st.success(f"✅ {relatorio['gerados']} gerados e {relatorio['reaproveitados']} reaproveitados "
+                           f"em {relatorio['segundos']}s.")
     else:
         st.info("Nenhum template encontrado.")
\ No newline at end of file
@@ -1,39 +1,96 @@
-import bcrypt
 import mysql.connector
 import pandas as pd
 from mysql.connector import Error
 import os
 from datetime import datetime
 import json
+import sys
+import time
 import streamlit as st
+from utils.instrumentacao import coletor, ConexaoInstrumentada
+from utils.perfilador import span
+from utils.gravacao_lote import GravadorEmLote
+from utils.cache_referencia import cache_referencia, CONJUNTOS as CONJUNTOS_CACHE
+from utils.autenticacao import gerar_hash
+from utils.passagens import (
+    chave_origem, dividir_em_passagens, passagens_de_segmentos, diferenca_passagens, formatar_tempo,
+    segmentos_do_texto
+)
+from utils.banco_sqlite import conectar_sqlite, criar_esquema_sqlite, CAMINHO_PADRAO as CAMINHO_SQLITE_PADRAO
 
 # ==========================================================
 # 1. CONFIGURAÇÕES E CONEXÃO (TIDB CLOUD + STREAMLIT SECRETS)
 # ==========================================================
 
+def backend_configurado():
+    """'mysql' (TiDB Cloud, padrão) ou 'sqlite' (arquivo local em WAL). FCJ_DB_BACKEND tem prioridade sobre o [db] do secrets."""
+    backend = os.environ.get("FCJ_DB_BACKEND")
+    if not backend:
+        try:
+            backend = st.secrets.get("db", {}).get("backend")
+        except Exception:
+            backend = None
+    return (backend or "mysql").lower()
+
+def _caminho_sqlite():
+    caminho = os.environ.get("FCJ_SQLITE_PATH")
+    if not caminho:
+        try:
+            caminho = st.secrets.get("db", {}).get("sqlite_path")
+        except Exception:
+            caminho = None
+    return caminho or CAMINHO_SQLITE_PADRAO
+
+def _origem_da_conexao(profundidade=2):
+    # Quem pediu a conexão: as consultas feitas nela são atribuídas a essa função
+    chamador = sys._getframe(profundidade).f_code
+    return f"{os.path.basename(chamador.co_filename)}:{chamador.co_name}"
+
 def conectar(incluir_db=True):
     """Estabelece a conexão com o banco de dados via st.secrets para INSERT/UPDATE."""
     try:
-        config = {                       
-            "host": st.secrets["mysql"]["host"],
-            "port": st.secrets["mysql"]["port"],
-            "user": st.secrets["mysql"]["user"],
-            "password": st.secrets["mysql"]["password"],            
-            "use_pure": True,            
-            "ssl_verify_cert": False,
-            "ssl_disabled": False,
-            "connection_timeout": 20
-        }        
-        config["ssl_ca"] = None  # Usa os certificados do sistema
-        
-        if incluir_db:
-            config["database"] = st.secrets["mysql"]["database"]
-            
-        return mysql.connector.connect(**config)
+        return _abrir_conexao(_origem_da_conexao(), incluir_db)
     except Exception as e:
         st.error(f"Erro ao conectar no banco (Driver): {e}")
         return None
 
+def conectar_em_segundo_plano(incluir_db=True):
+    """Mesma conexão para threads de fundo (sem sessão do Streamlit): a falha vai para o log, não para st.error."""
+    try:
+        return _abrir_conexao(_origem_da_conexao(), incluir_db)
+    except Exception as e:
+        print(f"❌ Erro ao conectar no banco (Driver): {e}")
+        return None
+
+def _abrir_conexao(origem, incluir_db):
+    """Abre a conexão instrumentada (SQLite ou TiDB/MySQL); erros sobem para quem chamou."""
+    inicio = time.perf_counter()
+    if backend_configurado() == "sqlite":
+        with span(f"conectar ({origem})", "db"):
+            conn = conectar_sqlite(_caminho_sqlite())
+        coletor.registrar_conexao(origem, (time.perf_counter() - inicio) * 1000)
+        return ConexaoInstrumentada(conn, origem)
+
+    config = {                       
+        "host": st.secrets["mysql"]["host"],
+        "port": st.secrets["mysql"]["port"],
+        "user": st.secrets["mysql"]["user"],
+        "password": st.secrets["mysql"]["password"],            
+        "use_pure": True,            
+        "ssl_verify_cert": False,
+        "ssl_disabled": False,
+        "connection_timeout": 20
+    }        
+    config["ssl_ca"] = None  # Usa os certificados do sistema
+    
+    if incluir_db:
+        config["database"] = st.secrets["mysql"]["database"]
+        
+    with span(f"conectar ({origem})", "db"):
+        conn = mysql.connector.connect(**config)
+    coletor.registrar_conexao(origem, (time.perf_counter() - inicio) * 1000)
+    return ConexaoInstrumentada(conn, origem)
+
 # --- LÓGICA DE CAMINHOS TÉCNICOs---
 RAIZ_PROJETO = os.getcwd()
 UPLOAD_DIR = os.path.join(RAIZ_PROJETO, "uploads", "entregas_alunos")
@@ -44,24 +101,235 @@ TEMPLATES_DIR = os.path.join(RAIZ_PROJETO, "assets_global", "templates")
 for folder in [UPLOAD_DIR, IA_KNOWLEDGE_DIR, TEMPLATES_DIR]:
     os.makedirs(folder, exist_ok=True)
 
+# --- INVALIDAÇÃO DO CACHE DE REFERÊNCIA ENTRE RÉPLICAS ---
+def subir_versao_cache(cursor, *conjuntos):
+    """Sobe a versão dos conjuntos dentro da transação da escrita (vale para todas as réplicas)."""
+    for conjunto in conjuntos:
+        cursor.execute("INSERT IGNORE INTO cache_versions (conjunto, versao) VALUES (%s, 0)", (conjunto,))
+        cursor.execute(
+            "UPDATE cache_versions SET versao = versao + 1, atualizado_em = NOW() WHERE conjunto = %s",
+            (conjunto,)
+        )
+
+def _ler_versoes_cache():
+    """Uma leitura pela chave primária de uma tabela de poucas linhas."""
+    conn = conectar()
+    if not conn:
+        raise ConnectionError("sem conexão com o banco")
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT conjunto, versao FROM cache_versions")
+        return {conjunto: versao for conjunto, versao in cursor.fetchall()}
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+cache_referencia.configurar_sincronizacao(_ler_versoes_cache)
+
 # ==========================================================
 # 2. INFRAESTRUTURA (INIT DB)
 # ==========================================================
 
+# --- DDL IDEMPOTENTE (MYSQL 8 NÃO ACEITA ADD COLUMN / CREATE INDEX IF NOT EXISTS; TIDB ACEITA) ---
+def _criar_indice(cur, tabela, indice, colunas, unico=False):
+    """Cria o índice só se ainda não existir (consulta o information_schema do banco atual)."""
+    cur.execute(
+        """SELECT 1 FROM information_schema.statistics
+           WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s LIMIT 1""",
+        (tabela, indice)
+    )
+    if not cur.fetchall():
+        cur.execute(f"CREATE {'UNIQUE ' if unico else ''}INDEX {indice} ON {tabela} ({colunas})")
+
+def _remover_indice(cur, tabela, indice):
+    """Remove o índice se ele existir."""
+    cur.execute(
+        """SELECT 1 FROM information_schema.statistics
+           WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s LIMIT 1""",
+        (tabela, indice)
+    )
+    if cur.fetchall():
+        cur.execute(f"DROP INDEX {indice} ON {tabela}")
+
+def _adicionar_coluna(cur, tabela, coluna, definicao):
+    """Acrescenta a coluna só se ainda não existir."""
+    cur.execute(
+        """SELECT 1 FROM information_schema.columns
+           WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s LIMIT 1""",
+        (tabela, coluna)
+    )
+    if not cur.fetchall():
+        cur.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}")
+
 def init_db():
-    """Cria o banco e todas as tabelas necessárias no TiDB."""
+    """Cria o banco e todas as tabelas necessárias no TiDB. Retorna True se o esquema ficou pronto."""
     conn = conectar(incluir_db=True)
-    if not conn: return
+    if not conn: return False
+    if backend_configurado() == "sqlite":
+        # O SQLite local tem o esquema completo (tabelas base + derivadas) num só script
+        try:
+            criar_esquema_sqlite(conn)
+            cur = conn.cursor()
+            cur.executemany(
+                "INSERT IGNORE INTO cache_versions (conjunto, versao) VALUES (%s, 0)",
+                [(c,) for c in CONJUNTOS_CACHE]
+            )
+            conn.commit()
+            return True
+        except Exception as e:
+            st.error(f"❌ Erro ao inicializar banco: {e}")
+            return False
+        finally:
+            conn.close()
     try:
         with conn.cursor() as cur:
             # Aqui devem estar seus comandos CREATE TABLE IF NOT EXISTS
-            conn.commit()        
+            # Índice usado pela paginação por chave (data_avaliacao, id) do histórico
+            _criar_indice(cur, "avaliacoes_ia", "idx_avaliacoes_usuario_data", "usuario_id, data_avaliacao, id")
+            # Resumo materializado de progresso (usuário x trimestre), mantido nas escritas
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS progresso_resumo (
+                    usuario_id INT NOT NULL,
+                    trimestre VARCHAR(10) NOT NULL,
+                    concluidas INT NOT NULL DEFAULT 0,
+                    total INT NOT NULL DEFAULT 0,
+                    ultima_atividade DATETIME NULL,
+                    ultima_nota INT NULL,
+                    atualizado_em DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                    PRIMARY KEY (usuario_id, trimestre)
+                )
+            """)
+            # Telemetria das chamadas aos provedores de IA (gravada em lote)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS telemetria_ia (
+                    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                    usuario_id INT NULL,
+                    etapa VARCHAR(255) NULL,
+                    trimestre VARCHAR(10) NULL,
+                    provedor VARCHAR(30) NOT NULL,
+                    modelo VARCHAR(100) NOT NULL,
+                    operacao VARCHAR(50) NOT NULL,
+                    tokens_prompt INT NULL,
+                    tokens_resposta INT NULL,
+                    tokens_cache INT NULL,
+                    ttft_ms INT NULL,
+                    latencia_ms INT NOT NULL,
+                    cache VARCHAR(10) NULL,
+                    resultado VARCHAR(10) NOT NULL,
+                    mensagem_erro TEXT NULL,
+                    data_registro DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    INDEX idx_telemetria_data (data_registro)
+                )
+            """)
+            # Versões dos dados de referência: canal de invalidação do cache entre réplicas
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS cache_versions (
+                    conjunto VARCHAR(50) NOT NULL PRIMARY KEY,
+                    versao BIGINT NOT NULL DEFAULT 0,
+                    atualizado_em DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cur.executemany(
+                "INSERT IGNORE INTO cache_versions (conjunto, versao) VALUES (%s, 0)",
+                [(c,) for c in CONJUNTOS_CACHE]
+            )
+            # Sessões de login retomáveis (token assinado; só o SHA-256 do token fica no banco)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS sessoes (
+                    token_hash CHAR(64) NOT NULL PRIMARY KEY,
+                    usuario_id INT NOT NULL,
+                    criado_em DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    expira_em DATETIME NOT NULL,
+                    INDEX idx_sessoes_usuario (usuario_id),
+                    INDEX idx_sessoes_expira (expira_em)
+                )
+            """)
+            # Manifesto da ingestão em lote: um registro por conteúdo (SHA-256 do arquivo)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS ingestao_conhecimento (
+                    hash_arquivo CHAR(64) NOT NULL PRIMARY KEY,
+                    nome_arquivo VARCHAR(255) NOT NULL,
+                    conhecimento_id INT NULL,
+                    status VARCHAR(20) NOT NULL,
+                    mensagem TEXT NULL,
+                    atualizado_em DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    INDEX idx_ingestao_conhecimento (conhecimento_id)
+                )
+            """)
+            # Índice de recuperação por passagem: reenvios da mesma fonte atualizam só o que mudou
+            _adicionar_coluna(cur, "ia_conhecimento", "chave_origem", "VARCHAR(255) NULL")
+            # Chave única: dois envios simultâneos da mesma fonte não geram duas linhas.
+            # Duplicados antigos perdem a chave (o reindexar-conhecimento funde depois).
+            cur.execute("""
+                UPDATE ia_conhecimento c
+                JOIN (SELECT chave_origem, MAX(id) AS mantido FROM ia_conhecimento
+                      WHERE chave_origem IS NOT NULL GROUP BY chave_origem) d ON d.chave_origem = c.chave_origem
+                SET c.chave_origem = NULL
+                WHERE c.id < d.mantido
+            """)
+            _criar_indice(cur, "ia_conhecimento", "uk_conhecimento_origem", "chave_origem", unico=True)
+            _remover_indice(cur, "ia_conhecimento", "idx_conhecimento_origem")
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS ia_passagens (
+                    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                    conhecimento_id INT NOT NULL,
+                    ordem INT NOT NULL,
+                    hash_passagem CHAR(64) NOT NULL,
+                    texto TEXT NOT NULL,
+                    UNIQUE KEY uk_passagem (conhecimento_id, hash_passagem)
+                )
+            """)
+            # Passagens de vídeo guardam o intervalo (segundos) do trecho da transcrição
+            _adicionar_coluna(cur, "ia_passagens", "inicio_s", "INT NULL")
+            _adicionar_coluna(cur, "ia_passagens", "fim_s", "INT NULL")
+            # Partição por trimestre: o material é marcado na ingestão e as passagens herdam a marca
+            _adicionar_coluna(cur, "ia_conhecimento", "trimestre", "VARCHAR(10) NULL")
+            _adicionar_coluna(cur, "ia_conhecimento", "etapa", "VARCHAR(255) NULL")
+            _adicionar_coluna(cur, "ia_passagens", "trimestre", "VARCHAR(10) NULL")
+            _criar_indice(cur, "ia_passagens", "idx_passagens_trimestre", "trimestre, conhecimento_id")
+            # Pacote de contexto do analisador por template (campos esperados + trechos da aula)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS pacotes_contexto (
+                    template_id INT NOT NULL PRIMARY KEY,
+                    etapa VARCHAR(255) NOT NULL,
+                    trimestre VARCHAR(10) NULL,
+                    versao_fonte CHAR(64) NOT NULL,
+                    perguntas TEXT NULL,
+                    conteudo MEDIUMTEXT NOT NULL,
+                    gerado_em DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.commit()
+        return True
     except Error as e:
         conn.rollback()
         st.error(f"❌ Erro ao inicializar banco: {e}")
+        return False
     finally:        
         conn.close()
 
+# Suba quando init_db ganhar tabelas/índices novos: força a inicialização a rodar de novo
+VERSAO_ESQUEMA = 8
+
+@st.cache_resource(show_spinner=False)
+def inicializar_aplicacao(versao_esquema=VERSAO_ESQUEMA):
+    """
+    Rotina de partida, uma vez por processo (não por sessão): esquema + usuário master.
+    Se algo falhar, levanta exceção para não ficar em cache e tenta de novo na próxima sessão.
+    """
+    if not init_db():
+        raise RuntimeError("não foi possível inicializar o esquema do banco")
+    senha_master = st.secrets.get("MASTER_PASSWORD", "m@ster26")
+    # cadastrar_usuario_db já ignora se o usuário existir; só erros de banco começam com ❌
+    sucesso, msg = cadastrar_usuario_db("master", senha_master, "admin")
+    if not sucesso and msg.startswith("❌"):
+        raise RuntimeError(f"verificação do usuário master: {msg}")
+    if sucesso:
+        print("✅ [Sistema] Usuário master garantido no banco.")
+    remover_sessoes_expiradas()
+    return versao_esquema
+
 # ==========================================================
 # 3. GESTÃO DE USUÁRIOS
 # ==========================================================
@@ -76,9 +344,8 @@ def cadastrar_usuario_db(username, password, role):
             if cursor.fetchone():
                 return False, "⚠️ Este nome de usuário já está em uso."
             
-            # 2. Hashing da senha (Segurança)
-            password_bytes = password.encode('utf-8')
-            senha_hash = bcrypt.hashpw(password_bytes, bcrypt.gensalt()).decode('utf-8')
+            # 2. Hashing da senha (Segurança, custo em FCJ_BCRYPT_CUSTO)
+            senha_hash = gerar_hash(password)
             
             # 3. Inserção
             sql = "INSERT INTO usuarios (username, senha_hash, role, ativo) VALUES (%s, %s, %s, %s)"
@@ -92,6 +359,246 @@ def cadastrar_usuario_db(username, password, role):
             conn.close()
     return False, "❌ Falha na conexão com o banco."
 
+# --- LISTA DE USUÁRIOS (ADMIN) ---
+def buscar_usuarios_paginados(busca=None, role=None, ativo=None, apos=None, limite=25):
+    """
+    Uma página de usuários filtrada no banco, com paginação por chave no username (único).
+    `apos` é o username da última linha da página anterior.
+    Retorna (linhas, proxima_chave) — proxima_chave é None quando não há mais páginas.
+    """
+    conn = conectar()
+    if not conn: return [], None
+    cur = None
+    try:
+        cur = conn.cursor(dictionary=True)
+        filtros = ["1 = 1"]
+        params = []
+        if busca:
+            filtros.append("username LIKE %s")
+            params.append(f"%{busca.strip()}%")
+        if role:
+            filtros.append("role = %s")
+            params.append(role)
+        if ativo is not None:
+            filtros.append("ativo = %s")
+            params.append(bool(ativo))
+        if apos:
+            filtros.append("username > %s")
+            params.append(apos)
+
+        # Uma linha a mais indica se existe próxima página
+        query = f"""
+            SELECT id, username, role, ativo
+            FROM usuarios
+            WHERE {" AND ".join(filtros)}
+            ORDER BY username ASC
+            LIMIT %s
+        """
+        params.append(limite + 1)
+        cur.execute(query, tuple(params))
+        linhas = cur.fetchall()
+
+        proxima_chave = None
+        if len(linhas) > limite:
+            linhas = linhas[:limite]
+            proxima_chave = linhas[-1]['username']
+        return linhas, proxima_chave
+    except Exception as e:
+        print(f"❌ Erro ao paginar usuários: {e}")
+        return [], None
+    finally:
+        if cur: cur.close()
+        conn.close()
+
+def aplicar_alteracoes_usuarios(ativar_ids=(), desativar_ids=(), remover_ids=()):
+    """
+    Aplica ativações, desativações e exclusões numa única transação.
+    O 'master' nunca é alterado; quem é desativado ou removido perde as sessões abertas.
+    Retorna (True, {"ativados", "desativados", "removidos"}) ou (False, mensagem).
+    """
+    conn = conectar()
+    if not conn: return False, "❌ Falha na conexão com o banco."
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        resumo = {}
+        for chave, ids, sql in (
+            ("ativados", ativar_ids, "UPDATE usuarios SET ativo = TRUE WHERE id IN ({}) AND LOWER(username) <> 'master'"),
+            ("desativados", desativar_ids, "UPDATE usuarios SET ativo = FALSE WHERE id IN ({}) AND LOWER(username) <> 'master'"),
+            ("removidos", remover_ids, "DELETE FROM usuarios WHERE id IN ({}) AND LOWER(username) <> 'master'"),
+        ):
+            ids = list(ids)
+            resumo[chave] = 0
+            if not ids:
+                continue
+            marcadores = ", ".join(["%s"] * len(ids))
+            cursor.execute(sql.format(marcadores), ids)
+            resumo[chave] = cursor.rowcount
+
+        encerrar = list(desativar_ids) + list(remover_ids)
+        if encerrar:
+            marcadores = ", ".join(["%s"] * len(encerrar))
+            cursor.execute(f"DELETE FROM sessoes WHERE usuario_id IN ({marcadores})", encerrar)
+        conn.commit()
+        return True, resumo
+    except Exception as e:
+        conn.rollback()
+        return False, f"❌ Erro no banco (nenhuma alteração aplicada): {e}"
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+# --- IMPORTAÇÃO EM LOTE ---
+def usernames_existentes(usernames, tamanho_bloco=1000):
+    """Quais destes usernames já estão cadastrados (consulta em blocos com IN)."""
+    conn = conectar()
+    if not conn: return None
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        existentes = set()
+        usernames = list(usernames)
+        for i in range(0, len(usernames), tamanho_bloco):
+            bloco = usernames[i:i + tamanho_bloco]
+            marcadores = ", ".join(["%s"] * len(bloco))
+            cursor.execute(f"SELECT username FROM usuarios WHERE username IN ({marcadores})", bloco)
+            existentes.update(linha[0] for linha in cursor.fetchall())
+        return existentes
+    except Exception as e:
+        print(f"❌ Erro ao consultar usernames: {e}")
+        return None
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+def inserir_usuarios_em_lote(usuarios):
+    """
+    Insere [(username, senha_hash, role, ativo), ...] numa única transação (executemany).
+    Tudo ou nada: retorna (True, qtd) ou (False, mensagem de erro) após rollback.
+    """
+    conn = conectar()
+    if not conn: return False, "❌ Falha na conexão com o banco."
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT INTO usuarios (username, senha_hash, role, ativo) VALUES (%s, %s, %s, %s)", usuarios
+        )
+        conn.commit()
+        return True, len(usuarios)
+    except Exception as e:
+        conn.rollback()
+        return False, f"❌ Erro no banco (nenhum usuário foi importado): {e}"
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+# --- SESSÕES DE LOGIN (TOKENS) ---
+def registrar_sessao_db(token_hash, usuario_id, duracao_s):
+    """A validade é calculada pelo relógio do banco, o mesmo do NOW() que a confere."""
+    conn = conectar()
+    if not conn: return False
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO sessoes (token_hash, usuario_id, expira_em) VALUES (%s, %s, NOW() + INTERVAL %s SECOND)",
+            (token_hash, usuario_id, int(duracao_s))
+        )
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"❌ Erro ao registrar sessão: {e}")
+        return False
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+def buscar_sessao_db(token_hash):
+    """Uma leitura pela chave primária: dados do usuário se a sessão existir, não expirou e o usuário está ativo."""
+    conn = conectar()
+    if not conn: return None
+    cursor = None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT u.id, u.username, u.role
+            FROM sessoes s JOIN usuarios u ON u.id = s.usuario_id
+            WHERE s.token_hash = %s AND s.expira_em > NOW() AND u.ativo
+        """, (token_hash,))
+        return cursor.fetchone()
+    except Exception as e:
+        print(f"❌ Erro ao buscar sessão: {e}")
+        return None
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+def remover_sessao_db(token_hash):
+    conn = conectar()
+    if not conn: return False
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM sessoes WHERE token_hash = %s", (token_hash,))
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"❌ Erro ao encerrar sessão: {e}")
+        return False
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+def remover_sessoes_expiradas():
+    conn = conectar()
+    if not conn: return 0
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM sessoes WHERE expira_em <= NOW()")
+        conn.commit()
+        return cursor.rowcount
+    except Exception as e:
+        print(f"❌ Erro ao limpar sessões expiradas: {e}")
+        return 0
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+def atualizar_hash_senha(usuario_id, senha_hash):
+    """Troca o hash gravado (rehash no login quando o custo do bcrypt muda)."""
+    conn = conectar()
+    if not conn: return False
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE usuarios SET senha_hash = %s WHERE id = %s", (senha_hash, usuario_id))
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"❌ Erro ao atualizar hash de senha: {e}")
+        return False
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+def contar_alunos():
+    """Quantidade de usuários com perfil aluno (métrica do painel admin)."""
+    conn = conectar()
+    if not conn: return None
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM usuarios WHERE role = 'aluno'")
+        return cursor.fetchone()[0]
+    except Exception as e:
+        print(f"❌ Erro ao contar alunos: {e}")
+        return None
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
 def remover_usuario_db(user_id, username):
     # Trava de segurança para o administrador principal
     if username.lower() == "master":
@@ -137,6 +644,22 @@ def verificar_etapa_concluida(usuario_id, nome_formulario):
             conn.close()
     return concluido
 
+def listar_etapas_concluidas(usuario_id):
+    """Todas as etapas concluídas do aluno numa só consulta (nomes sem espaços nas pontas). None se o banco falhar."""
+    conn = conectar()
+    if not conn: return None
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT DISTINCT TRIM(nome_etapa) FROM progresso_etapas WHERE usuario_id = %s", (usuario_id,))
+        return {linha[0] for linha in cursor.fetchall()}
+    except Exception as e:
+        print(f"Erro ao listar etapas concluídas: {e}")
+        return None
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
 def salvar_conclusao_etapa(usuario_id, nome_etapa):
     conn = conectar()
     if not conn: return False
@@ -147,6 +670,7 @@ def salvar_conclusao_etapa(usuario_id, nome_etapa):
         query = "INSERT IGNORE INTO progresso_etapas (usuario_id, nome_etapa) VALUES (%s, %s)"
         cursor.execute(query, (usuario_id, nome_etapa.strip()))
         conn.commit()
+        _atualizar_resumo_do_aluno(conn, cursor, usuario_id)
         return True
     except Exception as e:
         print(f"Erro ao salvar progresso: {e}")
@@ -174,7 +698,7 @@ def salvar_entrega_e_feedback(usuario_id, etapa, arquivo_objeto, feedback_json):
         caminho_fisico = os.path.join(UPLOAD_DIR, nome_unico)
                 
         # Gravação do arquivo binário
-        with open(caminho_fisico, "wb") as f:
+        with span("gravar entrega", "io"), open(caminho_fisico, "wb") as f:
             f.write(arquivo_objeto.getbuffer())
         
         # Caminho relativo para consulta futura
@@ -216,8 +740,8 @@ def salvar_entrega_e_feedback(usuario_id, etapa, arquivo_objeto, feedback_json):
             usuario_id, etapa.strip(), caminho_banco, nome_original,
             porcentagem, zona, feedback_ludico, cor, perguntas_str, dicas_str
         ))
-        
         conn.commit()
+        _atualizar_resumo_do_aluno(conn, cursor, usuario_id)
         return True    
     except Exception as e:
         st.error(f"❌ Erro crítico ao salvar entrega: {e}")
@@ -225,6 +749,124 @@ def salvar_entrega_e_feedback(usuario_id, etapa, arquivo_objeto, feedback_json):
     finally:
         if cursor: cursor.close()
         if conn: conn.close()
+
+def _atualizar_resumo_do_aluno(conn, cursor, usuario_id):
+    """
+    Recalcula o resumo do aluno numa transação própria, depois que a entrega/conclusão foi gravada.
+    Se falhar (ex: espera de trava contra uma escrita de templates do admin), o envio continua
+    gravado e o resumo só fica defasado até a próxima escrita ou o reconstruir-progresso.
+    """
+    try:
+        _atualizar_resumo_progresso(cursor, usuario_id=usuario_id)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"⚠️ Resumo de progresso do usuário {usuario_id} não foi atualizado: {e}")
+
+def _atualizar_resumo_progresso(cursor, usuario_id=None, trimestres=None):
+    """
+    Recalcula as linhas de progresso_resumo dentro da transação do chamador.
+    Sem usuario_id, recalcula todos os alunos; com trimestres, só as linhas desses
+    trimestres (usado quando os templates de um trimestre mudam).
+    """
+    filtros_delete, filtro_select, params = [], "", ()
+    if usuario_id is not None:
+        filtros_delete.append("usuario_id = %s")
+        filtro_select += " AND u.id = %s"
+        params += (usuario_id,)
+    if trimestres is not None:
+        trimestres = tuple(sorted(set(trimestres)))
+        if not trimestres:
+            return
+        marcadores = ", ".join(["%s"] * len(trimestres))
+        filtros_delete.append(f"trimestre IN ({marcadores})")
+        filtro_select += f" AND t.template IN ({marcadores})"
+        params += trimestres
+    filtro_delete = ("WHERE " + " AND ".join(filtros_delete)) if filtros_delete else ""
+
+    cursor.execute(f"DELETE FROM progresso_resumo {filtro_delete}", params)
+    cursor.execute(f"""
+        INSERT INTO progresso_resumo (usuario_id, trimestre, concluidas, total, ultima_atividade, ultima_nota)
+        SELECT u.id, t.template,
+               COUNT(DISTINCT CASE WHEN p.id IS NOT NULL THEN t.id END),
+               COUNT(DISTINCT t.id),
+               (SELECT MAX(a.data_avaliacao) FROM avaliacoes_ia a
+                 JOIN arquivos_templates t2 ON TRIM(t2.nome_formulario) = TRIM(a.etapa)
+                 WHERE a.usuario_id = u.id AND t2.template = t.template AND t2.status = 'ativo'),
+               (SELECT a.porcentagem FROM avaliacoes_ia a
+                 JOIN arquivos_templates t2 ON TRIM(t2.nome_formulario) = TRIM(a.etapa)
+                 WHERE a.usuario_id = u.id AND t2.template = t.template AND t2.status = 'ativo'
+                 ORDER BY a.data_avaliacao DESC, a.id DESC LIMIT 1)
+        FROM usuarios u
+        CROSS JOIN arquivos_templates t
+        LEFT JOIN progresso_etapas p
+               ON p.usuario_id = u.id AND TRIM(p.nome_etapa) = TRIM(t.nome_formulario)
+        WHERE t.status = 'ativo'{filtro_select}
+        GROUP BY u.id, t.template
+    """, params)
+
+def reconstruir_resumo_progresso(usuario_id=None):
+    """Reconstrói o resumo de progresso (todos os alunos ou apenas um)."""
+    conn = conectar()
+    if not conn: return False
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        _atualizar_resumo_progresso(cursor, usuario_id=usuario_id)
+        conn.commit()
+        return True
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Erro ao reconstruir resumo de progresso: {e}")
+        return False
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+def buscar_resumo_progresso(usuario_id):
+    """
+    Lê o progresso materializado do aluno: {trimestre: {concluidas, total, ultima_atividade, ultima_nota}}.
+    Se o aluno ainda não tiver linhas (ex: antes da primeira reconstrução), gera o resumo na hora.
+    Retorna None se o banco estiver indisponível.
+    """
+    conn = conectar()
+    if not conn: return None
+    cur = None
+    try:
+        cur = conn.cursor(dictionary=True)
+        query = """
+            SELECT trimestre, concluidas, total, ultima_atividade, ultima_nota
+            FROM progresso_resumo WHERE usuario_id = %s
+        """
+        cur.execute(query, (usuario_id,))
+        linhas = cur.fetchall()
+        if not linhas:
+            # Sem etapas ativas (ou aluno inexistente) o resumo fica vazio: responde sem escrever
+            cur.execute("""
+                SELECT 1 FROM usuarios u CROSS JOIN arquivos_templates t
+                WHERE u.id = %s AND t.status = 'ativo' LIMIT 1
+            """, (usuario_id,))
+            if not cur.fetchall():
+                return {}
+            _atualizar_resumo_progresso(cur, usuario_id=usuario_id)
+            conn.commit()
+            cur.execute(query, (usuario_id,))
+            linhas = cur.fetchall()
+        return {l['trimestre']: l for l in linhas}
+    except Exception as e:
+        print(f"❌ Erro ao buscar resumo de progresso: {e}")
+        return None
+    finally:
+        if cur: cur.close()
+        conn.close()
+
+def trimestre_concluido(resumo, trimestre):
+    """Um trimestre sem etapas ativas não bloqueia o seguinte (mesma regra das páginas)."""
+    if resumo is None:
+        return False # Sem banco, mantém a trava fechada
+    linha = resumo.get(trimestre)
+    return not linha or linha['concluidas'] >= linha['total']
+
 # ==========================================================
 # 5. CONSULTAS IA E FEEDBACK
 # ==========================================================
@@ -263,28 +905,208 @@ def buscar_ultimo_feedback_ia(usuario_id, etapa=None):
         if conn: # Verificação adicional de segurança
             conn.close()
 
-def buscar_envios_startups():
+def buscar_avaliacoes_paginadas(usuario_id, etapa=None, trimestre=None, data_inicio=None,
+                                data_fim=None, apos=None, limite=20):
+    """
+    Busca uma página do histórico de avaliações usando paginação por chave (keyset).
+    `apos` é a tupla (data_avaliacao, id) da última linha da página anterior.
+    Retorna (linhas, proxima_chave) — proxima_chave é None quando não há mais páginas.
+    Só traz as colunas leves; os detalhes ficam em buscar_avaliacao_por_id.
+    """
+    conn = conectar()
+    if not conn: return [], None
+    cur = None
+    try:
+        cur = conn.cursor(dictionary=True)
+        filtros = ["a.usuario_id = %s"]
+        params = [usuario_id]
+
+        if etapa:
+            filtros.append("TRIM(a.etapa) = %s")
+            params.append(etapa.strip())
+        if trimestre:
+            filtros.append("""TRIM(a.etapa) IN (
+                SELECT TRIM(t.nome_formulario) FROM arquivos_templates t WHERE t.template = %s)""")
+            params.append(trimestre)
+        if data_inicio:
+            filtros.append("a.data_avaliacao >= %s")
+            params.append(data_inicio)
+        if data_fim:
+            # Data final inclusiva: compara com o início do dia seguinte
+            filtros.append("a.data_avaliacao < DATE_ADD(%s, INTERVAL 1 DAY)")
+            params.append(data_fim)
+        if apos:
+            filtros.append("(a.data_avaliacao < %s OR (a.data_avaliacao = %s AND a.id < %s))")
+            params.extend([apos[0], apos[0], apos[1]])
+
+        # Pedimos uma linha a mais para saber se existe próxima página
+        query = f"""
+            SELECT a.id, a.etapa, a.porcentagem, a.zona, a.data_avaliacao
+            FROM avaliacoes_ia a
+            WHERE {" AND ".join(filtros)}
+            ORDER BY a.data_avaliacao DESC, a.id DESC
+            LIMIT %s
+        """
+        params.append(limite + 1)
+        cur.execute(query, tuple(params))
+        linhas = cur.fetchall()
+
+        proxima_chave = None
+        if len(linhas) > limite:
+            linhas = linhas[:limite]
+            proxima_chave = (linhas[-1]['data_avaliacao'], linhas[-1]['id'])
+        return linhas, proxima_chave
+    except Exception as e:
+        print(f"❌ Erro ao paginar avaliações: {e}")
+        return [], None
+    finally:
+        if cur: cur.close()
+        if conn: conn.close()
+
+def buscar_avaliacao_por_id(avaliacao_id):
+    """Carrega todos os campos de uma avaliação (usado ao abrir os detalhes)."""
+    conn = conectar()
+    if not conn: return None
+    cur = None
+    try:
+        cur = conn.cursor(dictionary=True)
+        cur.execute("""
+            SELECT id, etapa, caminho_arquivo_aluno, nome_arquivo_original,
+                   porcentagem, zona, feedback_ludico, perguntas_faltantes, dicas, data_avaliacao
+            FROM avaliacoes_ia WHERE id = %s
+        """, (avaliacao_id,))
+        return cur.fetchone()
+    except Exception as e:
+        print(f"❌ Erro ao buscar avaliação {avaliacao_id}: {e}")
+        return None
+    finally:
+        if cur: cur.close()
+        if conn: conn.close()
+
+def listar_etapas_avaliadas(usuario_id):
+    """Lista as etapas distintas já avaliadas para um aluno (opções de filtro)."""
+    conn = conectar()
+    if not conn: return []
+    cur = None
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT DISTINCT TRIM(etapa) FROM avaliacoes_ia WHERE usuario_id = %s ORDER BY 1", (usuario_id,))
+        return [r[0] for r in cur.fetchall() if r[0]]
+    except Exception as e:
+        print(f"❌ Erro ao listar etapas avaliadas: {e}")
+        return []
+    finally:
+        if cur: cur.close()
+        if conn: conn.close()
+
+def buscar_envios_startups(apos=None, limite=50):
+    """
+    Página da tabela bruta de envios (keyset por data_avaliacao, id).
+    Retorna (DataFrame, proxima_chave) — proxima_chave é None na última página.
+    """
     conn = conectar()
     if not conn:
-        return pd.DataFrame()
-    try:      
-        query = """
+        return pd.DataFrame(), None
+    try:
+        filtro = ""
+        params = []
+        if apos:
+            filtro = "WHERE (a.data_avaliacao < %s OR (a.data_avaliacao = %s AND a.id < %s))"
+            params = [apos[0], apos[0], apos[1]]
+        query = f"""
             SELECT a.id, u.username, a.etapa, a.porcentagem, a.data_avaliacao, a.caminho_arquivo_aluno 
             FROM avaliacoes_ia a
             JOIN usuarios u ON a.usuario_id = u.id
-            ORDER BY a.data_avaliacao DESC
+            {filtro}
+            ORDER BY a.data_avaliacao DESC, a.id DESC
+            LIMIT %s
         """
+        params.append(limite + 1)
         # O pandas já cuida de abrir o cursor, ler os dados e fechar o cursor internamente
-        df = pd.read_sql(query, conn) 
-        return df
+        df = pd.read_sql(query, conn, params=tuple(params))
+
+        proxima_chave = None
+        if len(df) > limite:
+            df = df.iloc[:limite]
+            proxima_chave = (df.iloc[-1]['data_avaliacao'].to_pydatetime(), int(df.iloc[-1]['id']))
+        return df, proxima_chave
     except Exception as e:
         st.error(f"Erro ao buscar envios: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(), None
     finally:
         # Fechamos apenas a conexão, pois o pandas/sqlalchemy gerencia o resto
         if conn:
             conn.close()
 
+# CTE com a última avaliação de cada (aluno, etapa), calculada no banco com funções de janela
+_CTE_ULTIMAS_AVALIACOES = """
+    WITH ultimas AS (
+        SELECT a.usuario_id, TRIM(a.etapa) AS etapa, a.porcentagem, a.zona, a.data_avaliacao,
+               ROW_NUMBER() OVER (PARTITION BY a.usuario_id, TRIM(a.etapa)
+                                  ORDER BY a.data_avaliacao DESC, a.id DESC) AS ordem,
+               COUNT(*) OVER (PARTITION BY a.usuario_id, TRIM(a.etapa)) AS tentativas,
+               MIN(a.data_avaliacao) OVER (PARTITION BY a.usuario_id, TRIM(a.etapa)) AS primeira_avaliacao
+        FROM avaliacoes_ia a
+    )
+"""
+
+@st.cache_data(ttl=60, show_spinner=False)
+def resumo_por_startup():
+    """Agregados por startup: etapas avaliadas, tentativas, média da última nota e tempo até a versão final."""
+    conn = conectar()
+    if not conn:
+        return pd.DataFrame()
+    try:
+        query = _CTE_ULTIMAS_AVALIACOES + """
+            SELECT u.username,
+                   COUNT(*) AS etapas_avaliadas,
+                   SUM(ult.tentativas) AS tentativas,
+                   ROUND(AVG(ult.porcentagem), 1) AS media_ultima_nota,
+                   ROUND(AVG(TIMESTAMPDIFF(HOUR, ult.primeira_avaliacao, ult.data_avaliacao)), 1) AS horas_ate_versao_final,
+                   MAX(ult.data_avaliacao) AS ultimo_envio
+            FROM ultimas ult
+            JOIN usuarios u ON u.id = ult.usuario_id
+            WHERE ult.ordem = 1
+            GROUP BY u.username
+            ORDER BY ultimo_envio DESC
+        """
+        return pd.read_sql(query, conn)
+    except Exception as e:
+        st.error(f"Erro ao calcular resumo por startup: {e}")
+        return pd.DataFrame()
+    finally:
+        if conn: conn.close()
+
+@st.cache_data(ttl=60, show_spinner=False)
+def resumo_por_etapa():
+    """Agregados por etapa: startups, tentativas, média da última nota e distribuição de zonas."""
+    conn = conectar()
+    if not conn:
+        return pd.DataFrame()
+    try:
+        query = _CTE_ULTIMAS_AVALIACOES + """
+            SELECT ult.etapa,
+                   COUNT(*) AS startups,
+                   SUM(ult.tentativas) AS tentativas,
+                   ROUND(AVG(ult.porcentagem), 1) AS media_ultima_nota,
+                   ROUND(AVG(TIMESTAMPDIFF(HOUR, ult.primeira_avaliacao, ult.data_avaliacao)), 1) AS horas_ate_versao_final,
+                   SUM(CASE WHEN ult.zona LIKE 'Completo%%' THEN 1 ELSE 0 END) AS zona_completo,
+                   SUM(CASE WHEN ult.zona LIKE 'Parcial%%' THEN 1 ELSE 0 END) AS zona_parcial,
+                   SUM(CASE WHEN ult.zona LIKE 'Incompleto%%' THEN 1 ELSE 0 END) AS zona_incompleto,
+                   SUM(CASE WHEN ult.zona NOT LIKE 'Completo%%' AND ult.zona NOT LIKE 'Parcial%%'
+                             AND ult.zona NOT LIKE 'Incompleto%%' THEN 1 ELSE 0 END) AS zona_outras
+            FROM ultimas ult
+            WHERE ult.ordem = 1
+            GROUP BY ult.etapa
+            ORDER BY ult.etapa ASC
+        """
+        return pd.read_sql(query, conn)
+    except Exception as e:
+        st.error(f"Erro ao calcular resumo por etapa: {e}")
+        return pd.DataFrame()
+    finally:
+        if conn: conn.close()
+
 def buscar_usuario_id(username):
     conn = conectar()
     if not conn:
@@ -307,41 +1129,38 @@ def buscar_usuario_id(username):
             cursor.close()
         conn.close()
 
+# Logs de erro vão para uma fila e são gravados em lote fora do caminho do usuário
+gravador_erros_ia = GravadorEmLote(
+    "logs_erros_ia", ("usuario_id", "etapa", "tipo_erro", "mensagem_erro"), conectar_em_segundo_plano
+)
+
 def registrar_erro_ia(usuario_id, etapa, tipo_erro, mensagem):
-    conn = conectar()
-    if not conn: 
-        return False
-    
-    cursor = None
-    try:            
-        cursor = conn.cursor()
-        # Garantimos que a mensagem seja string e limitamos o tamanho para não estourar o campo no banco
-        mensagem_segura = str(mensagem)[:1000] 
-        
-        query = "INSERT INTO logs_erros_ia (usuario_id, etapa, tipo_erro, mensagem_erro) VALUES (%s, %s, %s, %s)"
-        cursor.execute(query, (usuario_id, etapa, tipo_erro, mensagem_segura))
-        conn.commit()
-        return True
-    except Exception as e:
-        # Se falhar aqui, imprimimos no console do servidor para não entrar em loop de erro
-        print(f"❌ Falha crítica ao registrar log de erro no banco: {e}")
-        return False
-    finally:
-        if cursor:
-            cursor.close()
-        conn.close()
+    # Garantimos que a mensagem seja string e limitamos o tamanho para não estourar o campo no banco
+    mensagem_segura = str(mensagem)[:1000]
+    return gravador_erros_ia.enfileirar((usuario_id, etapa, tipo_erro, mensagem_segura))
 
 # ==========================================================
 # 6. GESTÃO DE TEMPLATES
 # ==========================================================
+def _trimestre_do_template(cursor, id_template):
+    cursor.execute("SELECT template FROM arquivos_templates WHERE id = %s", (id_template,))
+    linha = cursor.fetchone()
+    return linha[0] if linha else None
+
 def excluir_template(id_template):
     conn = conectar()
     if not conn: return False
     cur = None
     try:
         cur = conn.cursor()
+        trimestre = _trimestre_do_template(cur, id_template)
         cur.execute("DELETE FROM arquivos_templates WHERE id = %s", (id_template,))
+        cur.execute("DELETE FROM pacotes_contexto WHERE template_id = %s", (id_template,))
+        # O total de etapas do trimestre mudou: só as linhas dele são recalculadas
+        _atualizar_resumo_progresso(cur, trimestres=[trimestre] if trimestre else [])
+        subir_versao_cache(cur, "templates")
         conn.commit()
+        cache_referencia.invalidar("templates")
         return True
     except Exception as e:
         if conn: conn.rollback()
@@ -370,8 +1189,10 @@ def salvar_template_db(nome_form, trimestre, arquivo_objeto, id_editando=None):
             with open(caminho_fisico, "wb") as f:
                 f.write(arquivo_objeto.getbuffer())
 
+        trimestres_afetados = {trimestre}
         if id_editando:
-            # Lógica de Atualização (Edit)
+            # Lógica de Atualização (Edit): a etapa pode ter saído de outro trimestre
+            trimestres_afetados.add(_trimestre_do_template(cursor, id_editando))
             if arquivo_objeto:
                 # Atualiza tudo, incluindo o novo arquivo
                 sql = """UPDATE arquivos_templates 
@@ -393,7 +1214,11 @@ def salvar_template_db(nome_form, trimestre, arquivo_objeto, id_editando=None):
             cursor.execute(sql, (nome_form, trimestre, arquivo_objeto.name, 
                                  caminho_final_banco, arquivo_objeto.type, "ativo"))
         
+        # O total de etapas mudou nos trimestres de origem e destino: só as linhas deles são recalculadas
+        _atualizar_resumo_progresso(cursor, trimestres=[t for t in trimestres_afetados if t])
+        subir_versao_cache(cursor, "templates")
         conn.commit()
+        cache_referencia.invalidar("templates")
         return True
     except Exception as e:
         st.error(f"Erro no banco ao salvar template: {e}")
@@ -402,32 +1227,96 @@ def salvar_template_db(nome_form, trimestre, arquivo_objeto, id_editando=None):
         if cursor: cursor.close()
         if conn: conn.close()
 
-def listar_templates_db():
-    """Retorna um DataFrame com todos os templates para exibição em tabelas."""
+def _carregar_templates_df():
     conn = conectar()
     if not conn:
-        return pd.DataFrame()
+        raise ConnectionError("sem conexão com o banco")
     try:
-        # Usamos o engine do SQLAlchemy (definido no arquivo principal) ou a conexão direta
         query = """
             SELECT id, nome_formulario, template as trimestre, nome_arquivo_original, caminho_arquivo, status 
             FROM arquivos_templates 
             ORDER BY template ASC, id DESC
         """
         # Nota: pd.read_sql funciona bem com a conexão do mysql-connector
-        df = pd.read_sql(query, conn)
-        return df
+        return pd.read_sql(query, conn)
+    finally:
+        conn.close()
+
+def listar_templates_db():
+    """Retorna um DataFrame com todos os templates para exibição em tabelas (via cache de referência)."""
+    try:
+        return cache_referencia.obter("templates", "todos", _carregar_templates_df)
     except Exception as e:
         st.error(f"Erro ao listar templates: {e}")
         return pd.DataFrame()
+
+def _carregar_templates_trimestre(trimestre):
+    conn = conectar()
+    if not conn:
+        raise ConnectionError("sem conexão com o banco")
+    cursor = None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT id, nome_formulario, caminho_arquivo, nome_arquivo_original 
+            FROM arquivos_templates 
+            WHERE template = %s AND status = 'ativo' 
+            ORDER BY id ASC
+        """, (trimestre,))
+        return cursor.fetchall()
     finally:
-        if conn: conn.close()
+        if cursor: cursor.close()
+        conn.close()
+
+def listar_templates_trimestre(trimestre):
+    """Templates ativos de um trimestre (Q1-Q4) na ordem das etapas. Retorna None se o banco falhar."""
+    try:
+        return cache_referencia.obter("templates", trimestre, lambda: _carregar_templates_trimestre(trimestre))
+    except Exception as e:
+        print(f"❌ Erro ao listar templates do {trimestre}: {e}")
+        return None
 
 # ==========================================================
 # 7. CONHECIMENTO DA IA
 # ==========================================================
-def buscar_conhecimento_ia(termo_busca):
-    """Busca trechos de conhecimento para alimentar o contexto da IA."""
+# Passagens devolvidas por busca (cada uma tem no máximo TAMANHO_MAX_PASSAGEM caracteres)
+LIMITE_PASSAGENS_BUSCA = 3
+
+def _buscar_passagens(cursor, termo, limite, trimestre=None, fora_do_trimestre=None):
+    filtro, params = "", [termo, termo]
+    if trimestre:
+        filtro, params = "AND p.trimestre = %s", params + [trimestre]
+    elif fora_do_trimestre:
+        filtro, params = "AND (p.trimestre IS NULL OR p.trimestre <> %s)", params + [fora_do_trimestre]
+    cursor.execute(f"""
+        SELECT p.hash_passagem, p.texto, p.inicio_s, p.fim_s, k.caminho_ou_url FROM ia_passagens p
+        JOIN ia_conhecimento k ON k.id = p.conhecimento_id
+        WHERE k.status = 'ativo' AND (p.texto LIKE %s OR k.nome LIKE %s) {filtro}
+        ORDER BY k.id DESC, p.ordem
+        LIMIT %s
+    """, params + [limite])
+    return cursor.fetchall()
+
+def _acrescentar_trechos(linhas, trechos, vistos):
+    """Acrescenta passagens ainda não vistas até o limite da busca."""
+    for r in linhas:
+        if len(trechos) == LIMITE_PASSAGENS_BUSCA:
+            return
+        if r['hash_passagem'] in vistos:
+            continue
+        vistos.add(r['hash_passagem'])
+        if r['inicio_s'] is None:
+            trechos.append(r['texto'])
+        else:
+            # Trecho de vídeo: a IA pode citar o minuto exato para o aluno
+            intervalo = f"{formatar_tempo(r['inicio_s'])}–{formatar_tempo(r['fim_s'])}"
+            trechos.append(f"[Vídeo {r['caminho_ou_url']} • {intervalo}]\n{r['texto']}")
+
+def buscar_conhecimento_ia(termo_busca, trimestre=None):
+    """
+    Busca passagens de conhecimento (sem repetição) para alimentar o contexto da IA.
+    Com `trimestre`, procura primeiro só na partição do trimestre e completa com o resto da base.
+    """
     conn = conectar()
     if not conn: return ""
     cursor = None 
@@ -436,21 +1325,26 @@ def buscar_conhecimento_ia(termo_busca):
         # Limpa o termo e prepara para busca parcial
         termo = f"%{termo_busca.strip()}%"
         
-        # Buscamos os 3 trechos mais relevantes que estejam ativos
-        query = """
-            SELECT conteudo FROM ia_conhecimento 
-            WHERE status = 'ativo' AND (conteudo LIKE %s OR nome LIKE %s) 
-            LIMIT 3
-        """
-        cursor.execute(query, (termo, termo))
-        resultados = cursor.fetchall()       
-        
-        if not resultados: 
-            return ""
-            
+        # Folga no LIMIT: a mesma passagem pode estar em mais de um material
+        folga = LIMITE_PASSAGENS_BUSCA * 4
+        trechos, vistos = [], set()
+        _acrescentar_trechos(_buscar_passagens(cursor, termo, folga, trimestre=trimestre), trechos, vistos)
+        if trimestre and len(trechos) < LIMITE_PASSAGENS_BUSCA:
+            # Partição sem passagens suficientes: completa com o resto da base
+            _acrescentar_trechos(_buscar_passagens(cursor, termo, folga, fora_do_trimestre=trimestre), trechos, vistos)
+
+        if len(trechos) < LIMITE_PASSAGENS_BUSCA:
+            # Materiais antigos ainda sem passagens (antes do `manutencao.py reindexar-conhecimento`)
+            cursor.execute("""
+                SELECT k.conteudo FROM ia_conhecimento k
+                WHERE k.status = 'ativo' AND (k.conteudo LIKE %s OR k.nome LIKE %s)
+                  AND NOT EXISTS (SELECT 1 FROM ia_passagens p WHERE p.conhecimento_id = k.id)
+                LIMIT %s
+            """, (termo, termo, LIMITE_PASSAGENS_BUSCA - len(trechos)))
+            trechos.extend(r['conteudo'] for r in cursor.fetchall() if r['conteudo'])
+
         # Une os textos com um separador claro para a IA entender que são fontes diferentes
-        contexto = "\n---\n".join([r['conteudo'] for r in resultados if r['conteudo']])
-        return contexto
+        return "\n---\n".join(trechos)
     except Exception as e:
         print(f"❌ Erro ao buscar conhecimento: {e}")
         return ""
@@ -458,48 +1352,159 @@ def buscar_conhecimento_ia(termo_busca):
         if cursor: cursor.close()
         if conn: conn.close()
 
-def registrar_no_banco(nome, tipo, caminho, descricao, texto_extraido):
-    """Registra novos textos ou documentos na base de conhecimento da IA."""
+def _sincronizar_passagens(cursor, conhecimento_id, texto, segmentos=None, trimestre=None):
+    """
+    Aplica no índice só a diferença entre as passagens gravadas e as do texto novo.
+    Com `segmentos` (vídeo), cada segmento com marcação de tempo vira uma passagem.
+    Todas as passagens ficam na partição `trimestre` do material.
+    """
+    cursor.execute(
+        "SELECT id, hash_passagem, ordem FROM ia_passagens WHERE conhecimento_id = %s", (conhecimento_id,)
+    )
+    existentes = {h: (id_, ordem) for id_, h, ordem in cursor.fetchall()}
+    novas = passagens_de_segmentos(segmentos) if segmentos else dividir_em_passagens(texto)
+    inserir, remover, reordenar = diferenca_passagens(existentes, novas)
+    if remover:
+        cursor.execute(f"DELETE FROM ia_passagens WHERE id IN ({', '.join(['%s'] * len(remover))})", remover)
+    if reordenar:
+        cursor.executemany("UPDATE ia_passagens SET ordem = %s WHERE id = %s", reordenar)
+    if len(existentes) > len(remover):
+        cursor.execute("UPDATE ia_passagens SET trimestre = %s WHERE conhecimento_id = %s", (trimestre, conhecimento_id))
+    if inserir:
+        cursor.executemany(
+            """INSERT INTO ia_passagens (conhecimento_id, ordem, hash_passagem, texto, inicio_s, fim_s, trimestre)
+               VALUES (%s, %s, %s, %s, %s, %s, %s)""",
+            [(conhecimento_id, ordem, h, texto_p, *(intervalo or (None, None)), trimestre)
+             for ordem, h, texto_p, *intervalo in inserir]
+        )
+    return {"inseridas": len(inserir), "removidas": len(remover), "mantidas": len(existentes) - len(remover)}
+
+def _gravar_material(cursor, nome, tipo, caminho, descricao, texto_extraido, segmentos=None,
+                     trimestre=None, etapa=None):
+    """
+    Mesma fonte já na base (chave_origem): atualiza a linha e as passagens que mudaram.
+    Fonte nova: insere. trimestre/etapa vazios mantêm a marcação que o material já tinha.
+    Retorna (conhecimento_id, caminho_anterior, estatisticas_passagens).
+    """
+    chave = chave_origem(nome, tipo, caminho)
+    # Garante que o texto extraído não seja nulo e remove espaços desnecessários
+    texto_limpo = texto_extraido.strip() if texto_extraido else ""
+    consulta = "SELECT id, caminho_ou_url, trimestre FROM ia_conhecimento WHERE chave_origem = %s"
+    cursor.execute(consulta, (chave,))
+    atual = cursor.fetchone()
+    if not atual:
+        # chave_origem é única: se outro envio da mesma fonte inseriu antes, o INSERT é ignorado
+        cursor.execute(
+            """INSERT IGNORE INTO ia_conhecimento
+                   (nome, tipo_conteudo, caminho_ou_url, conteudo, descricao, status, chave_origem, trimestre, etapa)
+               VALUES (%s, %s, %s, %s, %s, 'ativo', %s, %s, %s)""",
+            (nome, tipo, caminho, texto_limpo, descricao, chave, trimestre, etapa)
+        )
+        if cursor.rowcount:
+            conhecimento_id, caminho_anterior = cursor.lastrowid, None
+        else:
+            # ... e este envio vira atualização da linha dele (leitura com trava vê a versão já gravada)
+            cursor.execute(consulta + " FOR UPDATE", (chave,))
+            atual = cursor.fetchone()
+            if not atual:
+                raise RuntimeError(f"material {nome} não foi inserido nem encontrado")
+    if atual:
+        conhecimento_id, caminho_anterior, trimestre_atual = atual
+        trimestre = trimestre or trimestre_atual
+        cursor.execute(
+            """UPDATE ia_conhecimento SET nome = %s, tipo_conteudo = %s, caminho_ou_url = %s, conteudo = %s,
+                      descricao = COALESCE(NULLIF(%s, ''), descricao), status = 'ativo', data_subida = NOW(),
+                      trimestre = %s, etapa = COALESCE(%s, etapa)
+               WHERE id = %s""",
+            (nome, tipo, caminho, texto_limpo, descricao, trimestre, etapa, conhecimento_id)
+        )
+        # O conteúdo mudou: hashes de arquivos antigos deixam de representar este material
+        cursor.execute("DELETE FROM ingestao_conhecimento WHERE conhecimento_id = %s", (conhecimento_id,))
+    estatisticas = _sincronizar_passagens(cursor, conhecimento_id, texto_limpo, segmentos, trimestre)
+    return conhecimento_id, caminho_anterior, estatisticas
+
+def _remover_copia_antiga(caminho_anterior, caminho_novo):
+    """Apaga o arquivo substituído, se for uma cópia nossa em knowledge_base. Retorna True se apagou."""
+    if not caminho_anterior or caminho_anterior == caminho_novo:
+        return False
+    absoluto = os.path.abspath(caminho_anterior)
+    if absoluto.startswith(os.path.abspath(IA_KNOWLEDGE_DIR) + os.sep) and os.path.exists(absoluto):
+        try:
+            os.remove(absoluto)
+            return True
+        except OSError as e:
+            print(f"⚠️ Não foi possível remover {absoluto}: {e}")
+    return False
+
+def registrar_no_banco(nome, tipo, caminho, descricao, texto_extraido, segmentos=None, trimestre=None, etapa=None):
+    """
+    Registra ou atualiza (mesma fonte) um material na base de conhecimento da IA.
+    segmentos: trechos de vídeo com marcação de tempo (processar_video_youtube), indexados um a um.
+    trimestre/etapa: partição de busca do material (None = base geral).
+    """
     conn = conectar()
     if not conn: return False
     cursor = None
     try:
         cursor = conn.cursor()
-        # Garante que o texto extraído não seja nulo e remove espaços desnecessários
-        texto_limpo = texto_extraido.strip() if texto_extraido else ""
-        
-        sql = """INSERT INTO ia_conhecimento 
-                 (nome, tipo_conteudo, caminho_ou_url, conteudo, descricao, status) 
-                 VALUES (%s, %s, %s, %s, %s, 'ativo')"""
-        
-        cursor.execute(sql, (nome, tipo, caminho, texto_limpo, descricao))
+        _, caminho_anterior, _ = _gravar_material(
+            cursor, nome, tipo, caminho, descricao, texto_extraido, segmentos, trimestre, etapa
+        )
+        subir_versao_cache(cursor, "conhecimento")
         conn.commit()
+        cache_referencia.invalidar("conhecimento")
+        _remover_copia_antiga(caminho_anterior, caminho)
         return True
     except Exception as e:
+        conn.rollback()
         st.error(f"Erro ao salvar conhecimento no banco: {e}")
         return False
     finally:
         if cursor: cursor.close()
         if conn: conn.close()
 
-def consultar_base_ativa():
-    """Retorna todos os materiais de conhecimento para a tabela do Admin."""
+def _carregar_base_ativa_df():
     conn = conectar()
     if not conn:
-        return pd.DataFrame()
+        raise ConnectionError("sem conexão com o banco")
     try:
         # Buscamos metadados (sem o campo 'conteudo' que é pesado) para a tabela de gestão
         query = """
-            SELECT id, nome, tipo_conteudo, caminho_ou_url, descricao, data_subida 
+            SELECT id, nome, tipo_conteudo, caminho_ou_url, descricao, data_subida, trimestre, etapa 
             FROM ia_conhecimento 
             ORDER BY id DESC
         """
-        df = pd.read_sql(query, conn)
-        return df
+        return pd.read_sql(query, conn)
+    finally:
+        conn.close()
+
+def consultar_base_ativa():
+    """Retorna todos os materiais de conhecimento para a tabela do Admin (via cache de referência)."""
+    try:
+        return cache_referencia.obter("conhecimento", "metadados", _carregar_base_ativa_df)
     except Exception as e:
         st.error(f"Erro ao listar base de conhecimento: {e}")
         return pd.DataFrame()
+
+def classificar_material_db(id_db, trimestre, etapa):
+    """Muda a partição (trimestre) e a etapa de um material; as passagens acompanham."""
+    conn = conectar()
+    if not conn: return False
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE ia_conhecimento SET trimestre = %s, etapa = %s WHERE id = %s", (trimestre, etapa, id_db))
+        cursor.execute("UPDATE ia_passagens SET trimestre = %s WHERE conhecimento_id = %s", (trimestre, id_db))
+        subir_versao_cache(cursor, "conhecimento")
+        conn.commit()
+        cache_referencia.invalidar("conhecimento")
+        return True
+    except Exception as e:
+        conn.rollback()
+        st.error(f"Erro ao classificar material: {e}")
+        return False
     finally:
+        if cursor: cursor.close()
         if conn: conn.close()
 
 def deletar_material_db(id_db):
@@ -510,11 +1515,255 @@ def deletar_material_db(id_db):
     try:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM ia_conhecimento WHERE id = %s", (id_db,))
+        cursor.execute("DELETE FROM ia_passagens WHERE conhecimento_id = %s", (id_db,))
+        # Sem o material, o arquivo volta a ser elegível para a ingestão em lote
+        cursor.execute("DELETE FROM ingestao_conhecimento WHERE conhecimento_id = %s", (id_db,))
+        subir_versao_cache(cursor, "conhecimento")
         conn.commit()
+        cache_referencia.invalidar("conhecimento")
         return True
     except Exception as e:
         st.error(f"Erro ao deletar material: {e}")
         return False
     finally:
         if cursor: cursor.close()
-        if conn: conn.close()
\ No newline at end of file
+        if conn: conn.close()
+
+# --- INGESTÃO EM LOTE (MANIFESTO POR HASH DO ARQUIVO) ---
+def hashes_ingeridos():
+    """Hashes de arquivos já indexados pela ingestão em lote (set), ou None se o banco falhar."""
+    conn = conectar()
+    if not conn: return None
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT hash_arquivo FROM ingestao_conhecimento WHERE status = 'concluido'")
+        return {h for (h,) in cursor.fetchall()}
+    except Exception as e:
+        print(f"❌ Erro ao ler manifesto de ingestão: {e}")
+        return None
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+def marcar_ingestao(hash_arquivo, nome_arquivo, status, mensagem=None):
+    """Grava o estado de um arquivo no manifesto ('processando' ou 'erro')."""
+    conn = conectar()
+    if not conn: return False
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """REPLACE INTO ingestao_conhecimento (hash_arquivo, nome_arquivo, conhecimento_id, status, mensagem)
+               VALUES (%s, %s, NULL, %s, %s)""",
+            (hash_arquivo, nome_arquivo, status, (mensagem or "")[:1000] or None)
+        )
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"❌ Erro ao atualizar manifesto de ingestão: {e}")
+        return False
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+def registrar_ingestao_arquivo(hash_arquivo, nome, caminho, descricao, texto_extraido, trimestre=None, etapa=None):
+    """
+    Indexa o material e marca o arquivo como concluído na mesma transação:
+    uma interrupção nunca deixa material indexado fora do manifesto (nem o contrário).
+    Retorna o id em ia_conhecimento, ou None.
+    """
+    conn = conectar()
+    if not conn: return None
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        conhecimento_id, caminho_anterior, _ = _gravar_material(
+            cursor, nome, "arquivo", caminho, descricao, texto_extraido, trimestre=trimestre, etapa=etapa
+        )
+        cursor.execute(
+            """REPLACE INTO ingestao_conhecimento (hash_arquivo, nome_arquivo, conhecimento_id, status, mensagem)
+               VALUES (%s, %s, %s, 'concluido', NULL)""",
+            (hash_arquivo, nome, conhecimento_id)
+        )
+        subir_versao_cache(cursor, "conhecimento")
+        conn.commit()
+        cache_referencia.invalidar("conhecimento")
+        _remover_copia_antiga(caminho_anterior, caminho)
+        return conhecimento_id
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Erro ao indexar {nome}: {e}")
+        return None
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+def reindexar_conhecimento():
+    """
+    Passa a base inteira para o índice de passagens: preenche chave_origem, funde reenvios
+    da mesma fonte (fica o mais recente) e sincroniza as passagens de cada material.
+    Retorna {materiais, duplicados, inseridas, removidas, arquivos_removidos} ou None.
+    """
+    conn = conectar()
+    if not conn: return None
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT id, nome, tipo_conteudo, caminho_ou_url, conteudo, trimestre FROM ia_conhecimento ORDER BY id DESC"
+        )
+        materiais = cursor.fetchall()
+        resumo = {"materiais": 0, "duplicados": 0, "inseridas": 0, "removidas": 0, "arquivos_removidos": []}
+        mantidos, caminhos_duplicados, manter = {}, [], []
+        # Primeiro apaga os duplicados: a chave_origem é única e o mantido pode ainda estar sem ela
+        for id_db, nome, tipo, caminho, conteudo, trimestre in materiais:
+            chave = chave_origem(nome, tipo, caminho)
+            if chave in mantidos:
+                cursor.execute("DELETE FROM ia_passagens WHERE conhecimento_id = %s", (id_db,))
+                cursor.execute(
+                    "UPDATE ingestao_conhecimento SET conhecimento_id = %s WHERE conhecimento_id = %s",
+                    (mantidos[chave], id_db)
+                )
+                cursor.execute("DELETE FROM ia_conhecimento WHERE id = %s", (id_db,))
+                resumo["duplicados"] += 1
+                if tipo == 'arquivo':
+                    caminhos_duplicados.append(caminho)
+                continue
+            mantidos[chave] = id_db
+            manter.append((id_db, chave, tipo, conteudo, trimestre))
+        for id_db, chave, tipo, conteudo, trimestre in manter:
+            cursor.execute("UPDATE ia_conhecimento SET chave_origem = %s WHERE id = %s", (chave, id_db))
+            segmentos = segmentos_do_texto(conteudo) if tipo == 'youtube' else None
+            estatisticas = _sincronizar_passagens(cursor, id_db, (conteudo or "").strip(), segmentos, trimestre)
+            resumo["materiais"] += 1
+            resumo["inseridas"] += estatisticas["inseridas"]
+            resumo["removidas"] += estatisticas["removidas"]
+        subir_versao_cache(cursor, "conhecimento")
+        conn.commit()
+        cache_referencia.invalidar("conhecimento")
+        resumo["arquivos_removidos"] = [c for c in caminhos_duplicados if _remover_copia_antiga(c, None)]
+        return resumo
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Erro ao reindexar conhecimento: {e}")
+        return None
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+# ==========================================================
+# 8. PACOTES DE CONTEXTO DO ANALISADOR
+# ==========================================================
+def templates_para_pacotes(trimestre=None, nome_etapa=None):
+    """Templates ativos (dicts), do mais novo para o mais antigo. Retorna None se o banco falhar."""
+    conn = conectar()
+    if not conn: return None
+    cursor = None
+    try:
+        filtros, params = ["status = 'ativo'"], []
+        if trimestre:
+            filtros.append("template = %s")
+            params.append(trimestre)
+        if nome_etapa:
+            filtros.append("TRIM(nome_formulario) = TRIM(%s)")
+            params.append(nome_etapa)
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f"""
+            SELECT id, nome_formulario, template, caminho_arquivo, data_upload
+            FROM arquivos_templates WHERE {' AND '.join(filtros)}
+            ORDER BY id DESC
+        """, tuple(params))
+        return cursor.fetchall()
+    except Exception as e:
+        print(f"❌ Erro ao listar templates para os pacotes: {e}")
+        return None
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+def materiais_candidatos_pacote(nome_etapa, trimestre):
+    """
+    Materiais ativos marcados com a etapa ou do trimestre, com o total e o maior id das
+    passagens (mudam quando o material é reindexado). Retorna None se o banco falhar.
+    """
+    conn = conectar()
+    if not conn: return None
+    cursor = None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT k.id, k.nome, k.etapa, COUNT(p.id) AS passagens, MAX(p.id) AS ultima_passagem
+            FROM ia_conhecimento k
+            LEFT JOIN ia_passagens p ON p.conhecimento_id = k.id
+            WHERE k.status = 'ativo' AND (TRIM(k.etapa) = TRIM(%s) OR k.trimestre = %s)
+            GROUP BY k.id, k.nome, k.etapa
+            ORDER BY k.id
+        """, (nome_etapa, trimestre))
+        return cursor.fetchall()
+    except Exception as e:
+        print(f"❌ Erro ao buscar materiais da etapa {nome_etapa}: {e}")
+        return None
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+def passagens_dos_materiais(ids_materiais):
+    """[(conhecimento_id, ordem, texto)] na ordem de cada material. Retorna None se o banco falhar."""
+    if not ids_materiais:
+        return []
+    conn = conectar()
+    if not conn: return None
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        marcadores = ", ".join(["%s"] * len(ids_materiais))
+        cursor.execute(f"""
+            SELECT conhecimento_id, ordem, texto FROM ia_passagens
+            WHERE conhecimento_id IN ({marcadores})
+            ORDER BY conhecimento_id, ordem
+        """, tuple(ids_materiais))
+        return cursor.fetchall()
+    except Exception as e:
+        print(f"❌ Erro ao ler passagens dos materiais: {e}")
+        return None
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+def buscar_pacote_contexto(template_id):
+    """{versao_fonte, conteudo} do pacote gravado, ou None (sem pacote ou falha no banco)."""
+    conn = conectar()
+    if not conn: return None
+    cursor = None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT versao_fonte, conteudo FROM pacotes_contexto WHERE template_id = %s", (template_id,))
+        return cursor.fetchone()
+    except Exception as e:
+        print(f"❌ Erro ao ler pacote de contexto do template {template_id}: {e}")
+        return None
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+def salvar_pacote_contexto(template_id, etapa, trimestre, versao_fonte, perguntas, conteudo):
+    """Grava (ou substitui) o pacote de um template. perguntas: lista, gravada em JSON."""
+    conn = conectar()
+    if not conn: return False
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """REPLACE INTO pacotes_contexto (template_id, etapa, trimestre, versao_fonte, perguntas, conteudo, gerado_em)
+               VALUES (%s, %s, %s, %s, %s, %s, NOW())""",
+            (template_id, etapa, trimestre, versao_fonte, json.dumps(perguntas, ensure_ascii=False), conteudo)
+        )
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"❌ Erro ao gravar pacote de contexto do template {template_id}: {e}")
+        return False
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
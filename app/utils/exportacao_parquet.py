@@ -0,0 +1,158 @@
+import os
+import json
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+from utils.db import conectar, RAIZ_PROJETO
+
+# ==========================================================
+# 1. CONFIGURAÇÃO DA EXPORTAÇÃO
+# ==========================================================
+EXPORT_DIR = os.path.join(RAIZ_PROJETO, "exports", "parquet")
+ARQUIVO_WATERMARK = os.path.join(EXPORT_DIR, "_watermark.json")
+TAMANHO_LOTE = 5000
+
+# Tabela -> coluna com o nome da etapa (usada para descobrir o trimestre)
+TABELAS_EXPORTADAS = {
+    "avaliacoes_ia": "etapa",
+    "progresso_etapas": "nome_etapa",
+    "logs_erros_ia": "etapa",
+}
+
+# Esquema fixo por tabela: inferido a cada lote, uma coluna toda NULL vira tipo null
+# e o dataset passa a ter arquivos com esquemas incompatíveis
+_DATA = pa.timestamp("us")
+_PARTICOES = [("trimestre", pa.string()), ("mes", pa.string())]
+ESQUEMAS = {
+    "avaliacoes_ia": pa.schema([
+        ("id", pa.int64()), ("usuario_id", pa.int64()), ("etapa", pa.string()),
+        ("caminho_arquivo_aluno", pa.string()), ("nome_arquivo_original", pa.string()),
+        ("porcentagem", pa.int64()), ("zona", pa.string()), ("feedback_ludico", pa.string()),
+        ("cor", pa.string()), ("perguntas_faltantes", pa.string()), ("dicas", pa.string()),
+        ("data_avaliacao", _DATA),
+    ] + _PARTICOES),
+    "progresso_etapas": pa.schema([
+        ("id", pa.int64()), ("usuario_id", pa.int64()), ("nome_etapa", pa.string()),
+        ("data_conclusao", _DATA),
+    ] + _PARTICOES),
+    "logs_erros_ia": pa.schema([
+        ("id", pa.int64()), ("usuario_id", pa.int64()), ("etapa", pa.string()),
+        ("tipo_erro", pa.string()), ("mensagem_erro", pa.string()), ("data_erro", _DATA),
+    ] + _PARTICOES),
+}
+
+def _ler_watermark():
+    if os.path.exists(ARQUIVO_WATERMARK):
+        with open(ARQUIVO_WATERMARK, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+def _gravar_watermark(watermark):
+    # Grava em arquivo temporário e renomeia para não corromper o watermark numa interrupção
+    temporario = ARQUIVO_WATERMARK + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(watermark, f)
+    os.replace(temporario, ARQUIVO_WATERMARK)
+
+def _converter_datas(df, esquema):
+    """Colunas de data do esquema como datetime (o SQLite devolve texto; inválidas viram NaT)."""
+    for campo in esquema:
+        if pa.types.is_timestamp(campo.type) and campo.name in df.columns:
+            df[campo.name] = pd.to_datetime(df[campo.name], errors="coerce")
+    return df
+
+def _adicionar_particoes(df):
+    """Cria as colunas de partição trimestre/mes a partir do trimestre da etapa e da primeira coluna de data."""
+    df["trimestre"] = df["trimestre"].fillna("sem_trimestre")
+    colunas_data = [c for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c])]
+    if colunas_data:
+        df["mes"] = df[colunas_data[0]].dt.strftime("%Y-%m").fillna("sem_data")
+    else:
+        df["mes"] = "sem_data"
+    return df
+
+# ==========================================================
+# 2. EXPORTAÇÃO INCREMENTAL (WATERMARK POR ID)
+# ==========================================================
+def exportar_tabela_parquet(tabela, coluna_etapa):
+    """Exporta as linhas com id acima do watermark, em lotes, para Parquet particionado."""
+    conn = conectar()
+    if not conn: return 0
+    watermark = _ler_watermark()
+    ultimo_id = int(watermark.get(tabela, 0))
+    total = 0
+    try:
+        while True:
+            query = f"""
+                SELECT x.*,
+                       (SELECT MIN(t.template) FROM arquivos_templates t
+                         WHERE TRIM(t.nome_formulario) = TRIM(x.{coluna_etapa})) AS trimestre
+                FROM {tabela} x
+                WHERE x.id > %s
+                ORDER BY x.id ASC
+                LIMIT %s
+            """
+            df = pd.read_sql(query, conn, params=(ultimo_id, TAMANHO_LOTE))
+            if df.empty:
+                break
+
+            esquema = ESQUEMAS[tabela]
+            df = _adicionar_particoes(_converter_datas(df, esquema))
+            pq.write_to_dataset(
+                pa.Table.from_pandas(df, schema=esquema, preserve_index=False),
+                root_path=os.path.join(EXPORT_DIR, tabela),
+                partition_cols=["trimestre", "mes"],
+                basename_template=f"lote_{ultimo_id + 1}_{{i}}.parquet",
+            )
+
+            # O watermark só avança depois que o lote foi gravado
+            ultimo_id = int(df["id"].max())
+            watermark[tabela] = ultimo_id
+            _gravar_watermark(watermark)
+            total += len(df)
+
+            if len(df) < TAMANHO_LOTE:
+                break
+        return total
+    except Exception as e:
+        print(f"❌ Erro ao exportar {tabela} para Parquet: {e}")
+        return total
+    finally:
+        conn.close()
+
+def exportar_parquet():
+    """Exporta todas as tabelas analíticas. Retorna {tabela: linhas_exportadas}."""
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    return {tabela: exportar_tabela_parquet(tabela, coluna) for tabela, coluna in TABELAS_EXPORTADAS.items()}
+
+# ==========================================================
+# 3. LEITURA E ANÁLISE COLUNAR
+# ==========================================================
+@st.cache_data(ttl=300, show_spinner=False)
+def carregar_parquet(tabela, colunas=None):
+    """Lê o dataset particionado de uma tabela (vazio se ainda não foi exportado)."""
+    caminho = os.path.join(EXPORT_DIR, tabela)
+    if not os.path.isdir(caminho):
+        return pd.DataFrame()
+    return pd.read_parquet(caminho, columns=colunas, engine="pyarrow")
+
+def comparar_coortes():
+    """
+    Média da última nota por etapa, agrupada por coorte (mês do primeiro envio) e trimestre.
+    Retorna (tabela_notas, tabela_tentativas).
+    """
+    df = carregar_parquet("avaliacoes_ia", ["id", "usuario_id", "etapa", "porcentagem", "data_avaliacao", "trimestre"])
+    if df.empty:
+        return pd.DataFrame(), pd.DataFrame()
+
+    df["trimestre"] = df["trimestre"].astype(str)
+    df["coorte"] = df.groupby("usuario_id")["data_avaliacao"].transform("min").dt.strftime("%Y-%m")
+
+    ultimas = df.sort_values(["data_avaliacao", "id"]).drop_duplicates(["usuario_id", "etapa"], keep="last")
+    notas = ultimas.pivot_table(index="coorte", columns="trimestre", values="porcentagem", aggfunc="mean").round(1)
+    tentativas = (
+        df.groupby(["coorte", "trimestre"]).size()
+        / ultimas.groupby(["coorte", "trimestre"]).size()
+    ).unstack("trimestre").round(2)
+    return notas, tentativas
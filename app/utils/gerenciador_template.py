@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
-import mysql.connector
+from utils.db import conectar, subir_versao_cache
+from utils.cache_referencia import cache_referencia
 import os
 from datetime import datetime
 
@@ -12,19 +13,8 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 # CONEXÃO COM MYSQL (Usando Secrets)
 # --------------------------------
 def get_connection():
-    try:
-        # Puxando diretamente do bloco [mysql] do secrets.toml
-        return mysql.connector.connect(
-            host=st.secrets["mysql"]["host"],
-            port=int(st.secrets["mysql"]["port"]),
-            user=st.secrets["mysql"]["user"],
-            password=st.secrets["mysql"]["password"],
-            database=st.secrets["mysql"]["database"],
-            ssl_verify_cert=True # Crucial para TiDB Cloud
-        )
-    except Exception as e:
-        st.error(f"Erro de conexão com o Banco: {e}")
-        return None
+    # Mesma conexão do db.py (bloco [mysql] do secrets.toml ou SQLite local)
+    return conectar()
 
 # --------------------------------
 # PÁGINA PRINCIPAL
@@ -74,9 +64,11 @@ def gerenciador_page():
                     nome_formulario, template, arquivo.name, 
                     caminho_arquivo, arquivo.type, "ativo"
                 ))
+                subir_versao_cache(cursor, "templates")
                 conn.commit()
                 cursor.close()
                 conn.close()
+                cache_referencia.invalidar("templates")
                 
                 st.success(f"✅ Arquivo '{arquivo.name}' salvo com sucesso!")
                 st.rerun()
@@ -129,7 +121,9 @@ def excluir_arquivo(id_arquivo):
             
             # 1. Deletar do banco primeiro (se falhar aqui, não deleta o arquivo)
             cursor.execute("DELETE FROM arquivos_templates WHERE id = %s", (id_arquivo,))
+            subir_versao_cache(cursor, "templates")
             conn.commit()
+            cache_referencia.invalidar("templates")
 
             # 2. Deletar o arquivo físico depois
             if resultado and resultado[0] and os.path.exists(resultado[0]):
@@ -0,0 +1,175 @@
+import os
+import time
+import queue
+import atexit
+import threading
+
+# ==========================================================
+# 1. CONFIGURAÇÃO
+# ==========================================================
+TAMANHO_LOTE = int(os.environ.get("FCJ_LOTE_TAMANHO", 50))
+INTERVALO_FLUSH_S = float(os.environ.get("FCJ_LOTE_INTERVALO_S", 2))
+CAPACIDADE_FILA = int(os.environ.get("FCJ_LOTE_CAPACIDADE", 2000))
+# Back-pressure: com a fila cheia o produtor espera no máximo isso antes de descartar o registro
+ESPERA_MAXIMA_S = 0.05
+
+_FIM = object()
+
+# Todos os gravadores do processo (para o painel e para o flush no encerramento)
+gravadores = []
+
+# ==========================================================
+# 2. GRAVADOR EM LOTE (THREAD DE FUNDO)
+# ==========================================================
+class GravadorEmLote:
+    """
+    Fila em memória (limitada) + thread de fundo que grava em lote com executemany.
+    O lote é gravado quando atinge `tamanho_lote` registros ou após `intervalo_s`,
+    o que vier primeiro. Quem enfileira nunca faz round trip ao banco.
+    fabrica_conexao roda na thread de fundo: não pode usar st.* (ex: db.conectar_em_segundo_plano).
+    """
+
+    def __init__(self, tabela, colunas, fabrica_conexao, tamanho_lote=TAMANHO_LOTE,
+                 intervalo_s=INTERVALO_FLUSH_S, capacidade=CAPACIDADE_FILA):
+        self.tabela = tabela
+        self.colunas = tuple(colunas)
+        self.sql = (
+            f"INSERT INTO {tabela} ({', '.join(self.colunas)}) "
+            f"VALUES ({', '.join(['%s'] * len(self.colunas))})"
+        )
+        self._fabrica_conexao = fabrica_conexao
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_s = intervalo_s
+        self._fila = queue.Queue(maxsize=capacidade)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._encerrado = False
+        # Contadores alterados por várias sessões e pela thread de fundo: sempre sob esta trava
+        self._trava_contadores = threading.Lock()
+        self.enfileirados = 0
+        self.gravados = 0
+        self.descartados = 0
+        self.lotes = 0
+        self.falhas = 0
+        gravadores.append(self)
+
+    def enfileirar(self, registro):
+        """Recebe um dicionário (ou tupla na ordem de `colunas`). Retorna False se o registro foi descartado."""
+        if isinstance(registro, dict):
+            registro = tuple(registro.get(c) for c in self.colunas)
+        if self._encerrado:
+            # Depois do encerramento não há thread: grava direto
+            return self._gravar([registro])
+        self._garantir_thread()
+        try:
+            self._fila.put(registro, timeout=ESPERA_MAXIMA_S)
+        except queue.Full:
+            with self._trava_contadores:
+                self.descartados += 1
+                descartados = self.descartados
+            if descartados == 1 or descartados % 100 == 0:
+                print(f"⚠️ Fila de {self.tabela} cheia: {descartados} registros descartados até agora.")
+            return False
+        with self._trava_contadores:
+            self.enfileirados += 1
+        return True
+
+    def _contar(self, **incrementos):
+        with self._trava_contadores:
+            for contador, valor in incrementos.items():
+                setattr(self, contador, getattr(self, contador) + valor)
+
+    def _garantir_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._laco, name=f"gravador-{self.tabela}", daemon=True)
+                self._thread.start()
+
+    def _laco(self):
+        while True:
+            primeiro = self._fila.get()
+            if primeiro is _FIM:
+                return
+            lote = [primeiro]
+            limite = time.monotonic() + self.intervalo_s
+            while len(lote) < self.tamanho_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    item = self._fila.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if item is _FIM:
+                    self._gravar(lote)
+                    return
+                lote.append(item)
+            self._gravar(lote)
+
+    def _gravar(self, lote):
+        if not lote:
+            return True
+        conn = self._fabrica_conexao()
+        if not conn:
+            self._contar(falhas=1)
+            return False
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            cursor.executemany(self.sql, lote)
+            conn.commit()
+            self._contar(gravados=len(lote), lotes=1)
+            return True
+        except Exception as e:
+            # Sem st.error aqui: estamos fora do script do usuário
+            self._contar(falhas=1)
+            print(f"❌ Falha ao gravar lote em {self.tabela} ({len(lote)} registros): {e}")
+            return False
+        finally:
+            if cursor: cursor.close()
+            conn.close()
+
+    def _drenar(self):
+        restantes = []
+        while True:
+            try:
+                item = self._fila.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _FIM:
+                restantes.append(item)
+        for i in range(0, len(restantes), self.tamanho_lote):
+            self._gravar(restantes[i:i + self.tamanho_lote])
+
+    def encerrar(self, timeout=10):
+        """Para a thread e grava tudo o que ainda está na fila."""
+        self._encerrado = True
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self._fila.put(_FIM, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+        self._drenar()
+
+    def estatisticas(self):
+        with self._trava_contadores:
+            return {
+                "tabela": self.tabela,
+                "na_fila": self._fila.qsize(),
+                "enfileirados": self.enfileirados,
+                "gravados": self.gravados,
+                "lotes": self.lotes,
+                "descartados": self.descartados,
+                "falhas": self.falhas,
+            }
+
+@atexit.register
+def _encerrar_gravadores():
+    for gravador in gravadores:
+        try:
+            gravador.encerrar()
+        except Exception as e:
+            print(f"⚠️ Falha no flush final de {gravador.tabela}: {e}")
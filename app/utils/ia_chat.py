@@ -6,6 +6,11 @@ import os
 import json
 import time
 from utils.db import registrar_erro_ia, buscar_conhecimento_ia
+from utils.pacotes_contexto import pacote_contexto_etapa
+from utils.perfilador import span, perfilar
+from utils.telemetria_ia import (
+    medir_chamada_ia, marcar_primeiro_token, preencher_uso_gemini, preencher_uso_openai, trimestre_atual
+)
 
 # ==========================================================
 # 1. CONFIGURAÇÃO GLOBAL (ST.SECRETS)
@@ -78,30 +83,35 @@ def mentoria_ia_sidebar():
             full_response = ""
             
             try:
-                # 1. Busca Conhecimento (RAG)
-                conhecimento = buscar_conhecimento_ia(prompt)
+                # 1. Busca Conhecimento (RAG): primeiro nos materiais do trimestre da página
+                conhecimento = buscar_conhecimento_ia(prompt, trimestre=trimestre_atual())
                 
                 # 2. Chamada Meta AI (Groq)
-                response = client_meta.chat.completions.create(
-                    model=MODELO_META,
-                    messages=[
-                        {"role": "system", "content": (
-                            f"Você é o agente IA da FCJ. O usuário está na fase: {tema_atual}. "
-                            "Sua missão é impulsionar o usuário com uma energia contagiante, lúdica e objetiva, sem perder o foco. "
-                            "DIRETRIZES: 1. Use metáforas de foguetes, ignição ou órbita. "
-                            "2. Seja motivador: use exclamações e incentive a ação. "
-                            "3. Seja direto: responda em no máximo 2 frases curtas, unindo o conceito ao lúdico."
-                            f"Base de Conhecimento: {conhecimento}"
-                        )},
-                        {"role": "user", "content": prompt}
-                    ],
-                    stream=True
-                )
+                with span("Meta AI (mentoria)", "ia"), \
+                        medir_chamada_ia("groq", MODELO_META, "mentoria_sidebar", etapa="Mentoria") as telemetria:
+                    response = client_meta.chat.completions.create(
+                        model=MODELO_META,
+                        messages=[
+                            {"role": "system", "content": (
+                                f"Você é o agente IA da FCJ. O usuário está na fase: {tema_atual}. "
+                                "Sua missão é impulsionar o usuário com uma energia contagiante, lúdica e objetiva, sem perder o foco. "
+                                "DIRETRIZES: 1. Use metáforas de foguetes, ignição ou órbita. "
+                                "2. Seja motivador: use exclamações e incentive a ação. "
+                                "3. Seja direto: responda em no máximo 2 frases curtas, unindo o conceito ao lúdico."
+                                f"Base de Conhecimento: {conhecimento}"
+                            )},
+                            {"role": "user", "content": prompt}
+                        ],
+                        stream=True
+                    )
                 
-                for chunk in response:
-                    if chunk.choices[0].delta.content:
-                        full_response += chunk.choices[0].delta.content
-                        placeholder.markdown(full_response + "▌")
+                    for chunk in response:
+                        # O último chunk traz o uso de tokens e pode vir sem choices
+                        preencher_uso_openai(telemetria, chunk)
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            marcar_primeiro_token(telemetria)
+                            full_response += chunk.choices[0].delta.content
+                            placeholder.markdown(full_response + "▌")
                 
                 placeholder.markdown(full_response)
                 st.session_state.messages.append({"role": "assistant", "content": full_response})
@@ -113,12 +123,26 @@ def mentoria_ia_sidebar():
 # ==========================================================
 # 3. ANALISADOR DE DOCUMENTOS (USANDO GEMINI)
 # ==========================================================
+def planilha_para_texto(upload_arquivo):
+    """Serializa a planilha enviada em CSV para o prompt."""
+    df = pd.read_excel(upload_arquivo)
+    return df.to_csv(index=False)
+
+@perfilar("ia")
 def analisar_documento_ia(upload_arquivo, nome_etapa):
     """Análise técnica de arquivos usando Gemini - Flash"""
     try:
-        # 1. Definição do Prompt
+        # 1. Definição do Prompt: o pacote da etapa (campos do template + trechos da aula) é o mesmo
+        # para todos os alunos e vem antes do documento, formando um prefixo estável do prompt
+        with span("pacote de contexto", "app"):
+            pacote = pacote_contexto_etapa(nome_etapa)
+        criterios = f"""
+        Use como critério o pacote de contexto abaixo; 'perguntas_faltantes' deve citar os campos dele.
+        {pacote}
+        """ if pacote else ""
         prompt_instrucao = f"""
         Analise a completude do documento para a etapa: {nome_etapa}.
+        {criterios}
         Retorne APENAS um JSON:
         {{
             "porcentagem": (int de 0 a 100),
@@ -126,23 +150,26 @@ def analisar_documento_ia(upload_arquivo, nome_etapa):
             "cor": "#hexadecimal",
             "feedback_ludico": "Frase de incentivo",
             "perguntas_faltantes": ["Campo 1", "Campo 2"],
-            "dicas": "Sugestão técnica"
+            "dicas": "Sugestão técnica (no máximo 3 frases)"
         }}
         """
         model = genai.GenerativeModel(MODELO_DOCS)
         
         if upload_arquivo.name.endswith('.xlsx'):
-            df = pd.read_excel(upload_arquivo)
-            conteudo_texto = df.to_csv(index=False)
+            conteudo_texto = planilha_para_texto(upload_arquivo)
             # Envio de texto para Excel (mais estável)
-            response = model.generate_content([prompt_instrucao, f"Conteúdo Excel: {conteudo_texto}"])
+            conteudo = [prompt_instrucao, f"Conteúdo Excel: {conteudo_texto}"]
         else:
             # Envio de binários (PDF/Imagens)
             documento = {
                 "mime_type": upload_arquivo.type,
                 "data": upload_arquivo.getvalue()
             }
-            response = model.generate_content([prompt_instrucao, documento])
+            conteudo = [prompt_instrucao, documento]
+
+        with medir_chamada_ia("gemini", MODELO_DOCS, "analise_documento", etapa=nome_etapa) as telemetria:
+            response = model.generate_content(conteudo)
+            preencher_uso_gemini(telemetria, response)
 
         # Limpeza robusta do JSON
         texto_limpo = response.text.replace("```json", "").replace("```", "").strip()
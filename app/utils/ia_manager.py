@@ -4,14 +4,35 @@ import time
 import pandas as pd
 from datetime import datetime
 # Importando as funções centralizadas do db.py
-from utils.db import registrar_no_banco, consultar_base_ativa, deletar_material_db
-from utils.agente_ia_mysql import processar_conteudo_ia 
+from utils.db import (
+    registrar_no_banco, consultar_base_ativa, deletar_material_db, classificar_material_db, listar_templates_trimestre
+)
+from utils.agente_ia_mysql import processar_conteudo_ia, processar_video_youtube
+from utils.passagens import juntar_segmentos
+from utils.ingestao_conhecimento import (
+    pastas_de_aulas, planejar_ingestao, ingerir_pasta, descricao_padrao, trimestre_da_pasta
+)
 
 # Configuração de caminhos
 KNOWLEDGE_DIR = "knowledge_base"
 if not os.path.exists(KNOWLEDGE_DIR):
     os.makedirs(KNOWLEDGE_DIR, exist_ok=True)
 
+# Partições da busca do mentor; "Geral" (None) é consultado por todos os trimestres
+OPCOES_TRIMESTRE = ["Geral", "Q1", "Q2", "Q3", "Q4"]
+
+def selecionar_classificacao(prefixo, trimestre_atual=None, etapa_atual=None):
+    """Selectboxes de trimestre e etapa (templates do trimestre). Retorna (trimestre, etapa) com None para 'Geral'/'—'."""
+    col_t, col_e = st.columns(2)
+    indice = OPCOES_TRIMESTRE.index(trimestre_atual) if trimestre_atual in OPCOES_TRIMESTRE else 0
+    trimestre = col_t.selectbox("Trimestre", OPCOES_TRIMESTRE, index=indice, key=f"{prefixo}_trimestre")
+    if trimestre == "Geral":
+        return None, None
+    etapas = ["—"] + [t["nome_formulario"] for t in (listar_templates_trimestre(trimestre) or [])]
+    indice = etapas.index(etapa_atual) if etapa_atual in etapas else 0
+    etapa = col_e.selectbox("Etapa (opcional)", etapas, index=indice, key=f"{prefixo}_etapa")
+    return trimestre, (None if etapa == "—" else etapa)
+
 def limpar_formulario():
     # Esta função agora é chamada via callback ou após st.rerun
     # Para evitar o erro de 'instantiated', limpamos apenas quando explicitamente clicado no botão Limpar
@@ -47,6 +68,7 @@ def ia_manager_page():
         
         # Widget de texto - A descrição curta
         st.text_input("Descrição curta do material", placeholder="Ex: Manual de Metas Q3", key="form_descricao")
+        trimestre, etapa = selecionar_classificacao("form")
         
         if tipo == "Arquivo (PDF)":
             upload = st.file_uploader("Selecione o PDF", type=["pdf"], key=f"file_up_{st.session_state.uploader_id}")
@@ -74,7 +96,8 @@ def ia_manager_page():
                             sucesso, resultado, _ = processar_conteudo_ia(final_path, nome_para_db=upload.name)
                             
                             if sucesso:
-                                if registrar_no_banco(upload.name, 'arquivo', final_path, st.session_state.form_descricao, resultado):
+                                if registrar_no_banco(upload.name, 'arquivo', final_path, st.session_state.form_descricao, resultado,
+                                                      trimestre=trimestre, etapa=etapa):
                                     st.success("✅ Documento indexado com sucesso!")
                                     time.sleep(1)
                                     # CORREÇÃO DEFINITIVA: Incrementamos o ID do uploader e forçamos rerun. 
@@ -98,11 +121,17 @@ def ia_manager_page():
             if btn_yt:
                 url = st.session_state.form_url_yt
                 if "youtube.com" in url or "youtu.be" in url:
-                    with st.spinner("🤖 Analisando vídeo e gerando base de conhecimento..."):
-                        sucesso, resultado, _ = processar_conteudo_ia(url)
+                    with st.spinner("🤖 Estruturando a transcrição do vídeo por trechos..."):
+                        sucesso, resultado = processar_video_youtube(url)
                         if sucesso:
-                            if registrar_no_banco("Vídeo YouTube", 'youtube', url, st.session_state.form_descricao, resultado):
-                                st.success("✅ Conhecimento do vídeo extraído!")
+                            falhas = sum(1 for s in resultado if s["falhou"])
+                            if registrar_no_banco("Vídeo YouTube", 'youtube', url, st.session_state.form_descricao,
+                                                  juntar_segmentos(resultado), segmentos=resultado,
+                                                  trimestre=trimestre, etapa=etapa):
+                                if falhas:
+                                    # Trechos sem resposta da IA ficam com a legenda bruta; reenviar o link tenta de novo (legenda já em cache)
+                                    st.warning(f"⚠️ {falhas} de {len(resultado)} trechos indexados com a legenda bruta.")
+                                st.success(f"✅ Conhecimento do vídeo extraído ({len(resultado)} trechos)!")
                                 time.sleep(1)
                                 st.rerun()
                         else:
@@ -110,9 +139,71 @@ def ia_manager_page():
                 else:
                     st.warning("⚠️ Insira uma URL válida do YouTube.")
 
+    with st.expander("📦 Ingestão em Lote (pastas de aulas)"):
+        ingestao_em_lote()
+
+    with st.expander("🏷️ Classificar Material"):
+        classificar_material()
+
     st.divider()
     exibir_listagem()
 
+def ingestao_em_lote():
+    pastas = pastas_de_aulas()
+    if not pastas:
+        st.info("Nenhuma pasta de aulas encontrada em app/data.")
+        return
+    pasta = st.selectbox("Pasta", pastas, format_func=os.path.basename, key="ingestao_pasta")
+    plano = planejar_ingestao(pasta)
+    if plano is None:
+        st.error("❌ Falha ao consultar o manifesto de ingestão.")
+        return
+    pendentes, ja_ingeridos = plano
+    st.caption(f"{len(pendentes)} pendentes • {len(ja_ingeridos)} já na base (mesmo conteúdo) • "
+               f"descrição: {descricao_padrao(pasta)} • trimestre: {trimestre_da_pasta(pasta) or 'Geral'}")
+    if not pendentes:
+        st.success("✅ Todos os arquivos desta pasta já estão na base.")
+        return
+    if st.button(f"🚀 Ingerir {len(pendentes)} arquivos", type="primary", key="btn_ingestao_lote"):
+        barra = st.progress(0.0, text="Iniciando...")
+        linhas = []
+        tabela = st.empty()
+
+        def progresso(resultado, feitos, total):
+            linhas.append({
+                "Arquivo": resultado["nome"],
+                "Status": "✅" if resultado["status"] == "concluido" else "❌",
+                "Tempo (s)": resultado["segundos"],
+                "Mensagem": resultado["mensagem"],
+            })
+            barra.progress(feitos / total, text=f"{feitos}/{total} arquivos")
+            tabela.dataframe(pd.DataFrame(linhas), hide_index=True, width="stretch")
+
+        relatorio = ingerir_pasta(pasta, progresso=progresso)
+        if relatorio["erro"]:
+            st.error(relatorio["erro"])
+        elif relatorio["falhas"]:
+            st.warning(f"⚠️ {relatorio['ingeridos']} ingeridos e {relatorio['falhas']} falhas em "
+                       f"{relatorio['segundos']}s. Clique de novo para tentar só os que falharam.")
+        else:
+            st.success(f"✅ {relatorio['ingeridos']} arquivos ingeridos em {relatorio['segundos']}s.")
+
+def classificar_material():
+    df = consultar_base_ativa()
+    if df.empty:
+        st.info("A base de conhecimento está vazia.")
+        return
+    materiais = {row["id"]: row for _, row in df.iterrows()}
+    id_db = st.selectbox("Material", list(materiais), key="classificar_id",
+                         format_func=lambda i: f"{materiais[i]['nome']} ({materiais[i]['descricao'] or '---'})")
+    atual = materiais[id_db]
+    trimestre, etapa = selecionar_classificacao(f"classificar_{id_db}", atual["trimestre"], atual["etapa"])
+    if st.button("💾 Salvar classificação", key="btn_classificar"):
+        if classificar_material_db(int(id_db), trimestre, etapa):
+            st.toast("Classificação atualizada!")
+            time.sleep(0.5)
+            st.rerun()
+
 def exibir_listagem():
     st.subheader("📚 Base Ativa")
     df = consultar_base_ativa()
@@ -127,6 +218,8 @@ def exibir_listagem():
         for _, row in df.iterrows():
             c1, c2, c3, c4 = st.columns([0.5, 0.5, 0.3, 0.3])
             c1.write(row['descricao'] or "---")
+            if pd.notna(row['trimestre']):
+                c1.caption(f"🏷️ {row['trimestre']}" + (f" • {row['etapa']}" if pd.notna(row['etapa']) else ""))
             icone = "📄" if row['tipo_conteudo'] == 'arquivo' else "🎥"
             c2.write(f"{icone} {row['nome']}")
             
@@ -0,0 +1,155 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from utils.autenticacao import gerar_hashes, CUSTO_BCRYPT
+from utils.db import usernames_existentes, inserir_usuarios_em_lote
+
+# ==========================================================
+# 1. CONFIGURAÇÃO
+# ==========================================================
+ROLES_VALIDOS = ("aluno", "admin")
+TAMANHO_MAX_USERNAME = 100
+TAMANHO_MIN_SENHA = 6
+TAMANHO_MAX_SENHA_BYTES = 72 # O bcrypt ignora o que passar de 72 bytes
+# O bcrypt é CPU puro: um processo por núcleo; abaixo de MIN_LINHAS_POOL não compensa subir o pool
+PROCESSOS_HASH = int(os.environ.get("FCJ_IMPORT_PROCESSOS", os.cpu_count() or 1))
+MIN_LINHAS_POOL = 8
+SENHAS_POR_TAREFA = 16
+
+# Nomes aceitos no cabeçalho da planilha -> coluna interna
+SINONIMOS_COLUNAS = {
+    "username": "username", "usuario": "username", "usuário": "username", "login": "username",
+    "senha": "senha", "password": "senha",
+    "role": "role", "perfil": "role",
+    "ativo": "ativo", "status": "ativo",
+}
+VALORES_INATIVO = {"0", "false", "falso", "nao", "não", "n", "inativo"}
+
+# ==========================================================
+# 2. LEITURA E VALIDAÇÃO
+# ==========================================================
+def ler_planilha_usuarios(arquivo, nome_arquivo=None):
+    """CSV ou XLSX (caminho ou arquivo enviado) -> DataFrame com colunas normalizadas, tudo como texto."""
+    nome = (nome_arquivo or getattr(arquivo, "name", None) or str(arquivo)).lower()
+    if nome.endswith((".xlsx", ".xls")):
+        df = pd.read_excel(arquivo, dtype=str)
+    else:
+        df = pd.read_csv(arquivo, dtype=str, sep=None, engine="python") # Detecta , ou ;
+    df.columns = [SINONIMOS_COLUNAS.get(str(c).strip().lower(), str(c).strip().lower()) for c in df.columns]
+    return df.fillna("")
+
+def validar_usuarios(df):
+    """
+    Retorna (validos, problemas).
+    validos: [{linha, username, senha, role, ativo}]; problemas: [{linha, username, motivo}].
+    A linha segue a numeração da planilha (cabeçalho = linha 1).
+    """
+    faltando = {"username", "senha"} - set(df.columns)
+    if faltando:
+        return [], [{"linha": 1, "username": "", "motivo": f"Colunas obrigatórias ausentes: {', '.join(sorted(faltando))}"}]
+
+    validos, problemas, vistos = [], [], {}
+    for indice, registro in enumerate(df.to_dict("records"), start=2):
+        username = registro["username"].strip()
+        senha = registro["senha"]
+        role = (registro.get("role") or "aluno").strip().lower()
+        ativo = (registro.get("ativo") or "").strip().lower() not in VALORES_INATIVO
+
+        motivo = None
+        if not username:
+            motivo = "Username vazio"
+        elif len(username) > TAMANHO_MAX_USERNAME or " " in username:
+            motivo = f"Username inválido (sem espaços, até {TAMANHO_MAX_USERNAME} caracteres)"
+        elif username.lower() == "master":
+            motivo = "O usuário 'master' é reservado"
+        elif len(senha) < TAMANHO_MIN_SENHA:
+            motivo = f"Senha com menos de {TAMANHO_MIN_SENHA} caracteres"
+        elif len(senha.encode("utf-8")) > TAMANHO_MAX_SENHA_BYTES:
+            motivo = f"Senha com mais de {TAMANHO_MAX_SENHA_BYTES} bytes"
+        elif role not in ROLES_VALIDOS:
+            motivo = f"Perfil '{role}' inválido (use {' ou '.join(ROLES_VALIDOS)})"
+        elif username.lower() in vistos:
+            motivo = f"Duplicado na planilha (linha {vistos[username.lower()]})"
+
+        if motivo:
+            problemas.append({"linha": indice, "username": username, "motivo": motivo})
+            continue
+        vistos[username.lower()] = indice
+        validos.append({"linha": indice, "username": username, "senha": senha, "role": role, "ativo": ativo})
+    return validos, problemas
+
+# ==========================================================
+# 3. HASH EM PARALELO (POOL DE PROCESSOS)
+# ==========================================================
+def gerar_hashes_em_paralelo(senhas, custo=CUSTO_BCRYPT, processos=PROCESSOS_HASH, progresso=None):
+    """Hashes na mesma ordem das senhas; progresso(feitos, total) é chamado a cada bloco concluído."""
+    total = len(senhas)
+    blocos = [senhas[i:i + SENHAS_POR_TAREFA] for i in range(0, total, SENHAS_POR_TAREFA)]
+    hashes = []
+    if processos <= 1 or total < MIN_LINHAS_POOL:
+        for bloco in blocos:
+            hashes.extend(gerar_hashes(bloco, custo))
+            if progresso: progresso(len(hashes), total)
+        return hashes
+
+    # spawn: o servidor do Streamlit é multi-thread, e fork de processo com threads é arriscado
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(processos, len(blocos)), mp_context=contexto) as pool:
+        for resultado in pool.map(gerar_hashes, blocos, [custo] * len(blocos)):
+            hashes.extend(resultado)
+            if progresso: progresso(len(hashes), total)
+    return hashes
+
+# ==========================================================
+# 4. PIPELINE COMPLETO
+# ==========================================================
+def importar_usuarios(df, custo=CUSTO_BCRYPT, processos=PROCESSOS_HASH, progresso=None):
+    """
+    Valida -> descarta quem já existe (uma consulta) -> hash em paralelo -> INSERT em lote numa transação.
+    Retorna o relatório: {importados, problemas, erro, tempos_s, usuarios_por_s}.
+    """
+    tempos = {}
+    inicio = time.perf_counter()
+    validos, problemas = validar_usuarios(df)
+
+    existentes = usernames_existentes([u["username"] for u in validos]) if validos else set()
+    if existentes is None:
+        return {"importados": 0, "problemas": problemas, "erro": "❌ Falha ao consultar usuários existentes.",
+                "tempos_s": tempos, "usuarios_por_s": 0.0}
+    existentes_lower = {e.lower() for e in existentes}
+    novos = []
+    for u in validos:
+        if u["username"].lower() in existentes_lower:
+            problemas.append({"linha": u["linha"], "username": u["username"], "motivo": "Já cadastrado no banco"})
+        else:
+            novos.append(u)
+    tempos["validacao"] = round(time.perf_counter() - inicio, 3)
+
+    marca = time.perf_counter()
+    hashes = gerar_hashes_em_paralelo([u["senha"] for u in novos], custo, processos, progresso)
+    tempos["hash"] = round(time.perf_counter() - marca, 3)
+
+    erro = None
+    importados = 0
+    if novos:
+        marca = time.perf_counter()
+        sucesso, resultado = inserir_usuarios_em_lote(
+            [(u["username"], h, u["role"], u["ativo"]) for u, h in zip(novos, hashes)]
+        )
+        tempos["insercao"] = round(time.perf_counter() - marca, 3)
+        if sucesso:
+            importados = resultado
+        else:
+            erro = resultado
+
+    tempos["total"] = round(time.perf_counter() - inicio, 3)
+    problemas.sort(key=lambda p: p["linha"])
+    return {
+        "importados": importados,
+        "problemas": problemas,
+        "erro": erro,
+        "tempos_s": tempos,
+        "usuarios_por_s": round(importados / tempos["total"], 1) if tempos["total"] else 0.0,
+    }
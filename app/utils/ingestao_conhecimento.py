@@ -0,0 +1,149 @@
+import os
+import re
+import time
+import shutil
+import hashlib
+from datetime import datetime
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.db import IA_KNOWLEDGE_DIR, hashes_ingeridos, marcar_ingestao, registrar_ingestao_arquivo
+from utils.agente_ia_mysql import processar_conteudo_ia
+from utils.telemetria_ia import capturar_contexto, no_contexto
+
+# ==========================================================
+# 1. CONFIGURAÇÃO
+# ==========================================================
+# Pastas de aulas versionadas com o app (app/data/aulas_q1, aulas_q2, ...)
+PASTA_DADOS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+EXTENSOES_ACEITAS = (".pdf",)
+# A extração espera a API do Gemini (rede), não CPU: threads bastam.
+# Poucos trabalhadores para não estourar a cota de requisições por minuto.
+TRABALHADORES_INGESTAO = int(os.environ.get("FCJ_INGESTAO_TRABALHADORES", 3))
+TAMANHO_BLOCO_HASH = 1024 * 1024
+
+def pastas_de_aulas():
+    """Subpastas aulas_* de app/data, em ordem."""
+    if not os.path.isdir(PASTA_DADOS):
+        return []
+    return sorted(
+        os.path.join(PASTA_DADOS, nome) for nome in os.listdir(PASTA_DADOS)
+        if nome.startswith("aulas_") and os.path.isdir(os.path.join(PASTA_DADOS, nome))
+    )
+
+def trimestre_da_pasta(pasta):
+    """'aulas_q1' -> 'Q1' (partição de busca dos materiais); None para outras pastas."""
+    encontrado = re.match(r"aulas_(q\d)$", os.path.basename(os.path.normpath(pasta)), re.I)
+    return encontrado.group(1).upper() if encontrado else None
+
+def descricao_padrao(pasta):
+    """'aulas_q1' -> 'Aulas Q1'; outras pastas usam o próprio nome."""
+    trimestre = trimestre_da_pasta(pasta)
+    return f"Aulas {trimestre}" if trimestre else os.path.basename(os.path.normpath(pasta))
+
+# ==========================================================
+# 2. PLANEJAMENTO (O QUE FALTA INGERIR)
+# ==========================================================
+def hash_arquivo(caminho):
+    """SHA-256 do conteúdo: renomear ou copiar um PDF não gera nova ingestão."""
+    info = os.stat(caminho)
+    return _hash_conteudo(caminho, info.st_mtime_ns, info.st_size)
+
+@lru_cache(maxsize=1024)
+def _hash_conteudo(caminho, mtime_ns, tamanho):
+    # mtime/tamanho na chave: a tela do admin replaneja a cada rerun sem reler PDFs inalterados
+    sha = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(TAMANHO_BLOCO_HASH), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+def planejar_ingestao(pasta):
+    """
+    Retorna (pendentes, ja_ingeridos): listas de {caminho, nome, hash}.
+    Cópias idênticas dentro da pasta entram uma vez só. None se o manifesto não puder ser lido.
+    """
+    concluidos = hashes_ingeridos()
+    if concluidos is None:
+        return None
+    pendentes, ja_ingeridos, vistos = [], [], set()
+    for nome in sorted(os.listdir(pasta)):
+        caminho = os.path.join(pasta, nome)
+        if not os.path.isfile(caminho) or not nome.lower().endswith(EXTENSOES_ACEITAS):
+            continue
+        item = {"caminho": caminho, "nome": nome, "hash": hash_arquivo(caminho)}
+        if item["hash"] in concluidos or item["hash"] in vistos:
+            ja_ingeridos.append(item)
+        else:
+            vistos.add(item["hash"])
+            pendentes.append(item)
+    return pendentes, ja_ingeridos
+
+# ==========================================================
+# 3. INGESTÃO DE UM ARQUIVO (RODA NO POOL)
+# ==========================================================
+def _ingerir_arquivo(item, descricao, trimestre):
+    """Copia para knowledge_base, extrai com a IA e indexa. Retorna o resultado do arquivo."""
+    inicio = time.perf_counter()
+    resultado = {"nome": item["nome"], "status": "erro", "mensagem": "", "segundos": 0.0}
+    marcar_ingestao(item["hash"], item["nome"], "processando")
+
+    # Cópia com carimbo, como no upload manual: a exclusão na tela do admin apaga a cópia, não a aula
+    carimbo = datetime.now().strftime("%Y%m%d_%H%M%S")
+    destino = os.path.join(IA_KNOWLEDGE_DIR, f"{carimbo}_{item['hash'][:8]}_{item['nome'].replace(' ', '_')}")
+    try:
+        shutil.copyfile(item["caminho"], destino)
+        sucesso, texto, _ = processar_conteudo_ia(destino, nome_para_db=item["nome"])
+        if not sucesso:
+            resultado["mensagem"] = texto
+        elif not (texto or "").strip():
+            resultado["mensagem"] = "A IA não retornou texto para o documento."
+        elif registrar_ingestao_arquivo(item["hash"], item["nome"], destino, descricao, texto, trimestre) is None:
+            resultado["mensagem"] = "Falha ao gravar no banco."
+        else:
+            resultado["status"] = "concluido"
+    except Exception as e:
+        resultado["mensagem"] = str(e)
+
+    if resultado["status"] != "concluido":
+        marcar_ingestao(item["hash"], item["nome"], "erro", resultado["mensagem"])
+        if os.path.exists(destino):
+            os.remove(destino)
+    resultado["segundos"] = round(time.perf_counter() - inicio, 1)
+    return resultado
+
+# ==========================================================
+# 4. PASTA INTEIRA
+# ==========================================================
+def ingerir_pasta(pasta, descricao=None, trimestre=None, trabalhadores=TRABALHADORES_INGESTAO, progresso=None):
+    """
+    Ingere os PDFs pendentes da pasta em paralelo. Retomável: o que já foi concluído
+    (pelo hash do conteúdo) é pulado; arquivos com erro ou interrompidos voltam na próxima execução.
+    Os materiais entram na partição `trimestre` (padrão: o da pasta, aulas_q1 -> Q1).
+    progresso(resultado, feitos, total) é chamado na thread de quem chamou, a cada arquivo concluído.
+    Retorna o relatório: {pasta, ingeridos, ignorados, falhas, resultados, segundos, erro}.
+    """
+    inicio = time.perf_counter()
+    relatorio = {"pasta": pasta, "ingeridos": 0, "ignorados": 0, "falhas": 0,
+                 "resultados": [], "segundos": 0.0, "erro": None}
+    plano = planejar_ingestao(pasta)
+    if plano is None:
+        relatorio["erro"] = "❌ Falha ao consultar o manifesto de ingestão."
+        return relatorio
+    pendentes, ja_ingeridos = plano
+    relatorio["ignorados"] = len(ja_ingeridos)
+    descricao = descricao or descricao_padrao(pasta)
+    trimestre = trimestre or trimestre_da_pasta(pasta)
+
+    if pendentes:
+        with ThreadPoolExecutor(max_workers=max(1, min(trabalhadores, len(pendentes))),
+                                thread_name_prefix="ingestao") as pool:
+            ingerir = no_contexto(capturar_contexto(), _ingerir_arquivo)
+            futuros = [pool.submit(ingerir, item, descricao, trimestre) for item in pendentes]
+            for feitos, futuro in enumerate(as_completed(futuros), start=1):
+                resultado = futuro.result()
+                relatorio["resultados"].append(resultado)
+                relatorio["ingeridos" if resultado["status"] == "concluido" else "falhas"] += 1
+                if progresso: progresso(resultado, feitos, len(pendentes))
+
+    relatorio["segundos"] = round(time.perf_counter() - inicio, 1)
+    return relatorio
@@ -0,0 +1,288 @@
+import os
+import re
+import json
+import time
+import threading
+from collections import defaultdict, deque
+from datetime import datetime
+import streamlit as st
+from utils.perfilador import iniciar_perfil, span
+
+# ==========================================================
+# 1. CONFIGURAÇÃO
+# ==========================================================
+LIMIAR_LENTO_MS = float(os.environ.get("FCJ_SLOW_QUERY_MS", 500))
+LOG_DIR = os.path.join(os.getcwd(), "logs")
+ARQUIVO_SLOW_LOG = os.path.join(LOG_DIR, "slow_queries.log")
+
+# Limites superiores (ms) dos baldes do histograma; o último balde é "acima de 5s"
+BALDES_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# ==========================================================
+# 2. HISTOGRAMA E COLETOR (PROCESSO INTEIRO)
+# ==========================================================
+class Histograma:
+    """Histograma de latência em baldes fixos, com contagem de linhas e erros."""
+
+    def __init__(self):
+        self.baldes = [0] * (len(BALDES_MS) + 1)
+        self.contagem = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.linhas = 0
+        self.erros = 0
+
+    def registrar(self, ms, linhas=0):
+        indice = len(BALDES_MS)
+        for i, limite in enumerate(BALDES_MS):
+            if ms <= limite:
+                indice = i
+                break
+        self.baldes[indice] += 1
+        self.contagem += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.linhas += max(linhas, 0)
+
+    def percentil(self, p):
+        """Estimativa do percentil pelo limite superior do balde (ms)."""
+        if not self.contagem:
+            return 0.0
+        alvo = self.contagem * p / 100
+        acumulado = 0
+        for i, qtd in enumerate(self.baldes):
+            acumulado += qtd
+            if acumulado >= alvo:
+                return min(float(BALDES_MS[i]), self.max_ms) if i < len(BALDES_MS) else self.max_ms
+        return self.max_ms
+
+    def como_dict(self):
+        return {
+            "chamadas": self.contagem,
+            "p50_ms": self.percentil(50),
+            "p95_ms": self.percentil(95),
+            "max_ms": round(self.max_ms, 1),
+            "total_ms": round(self.total_ms, 1),
+            "linhas": self.linhas,
+            "erros": self.erros,
+            "baldes": dict(zip([f"<={b}ms" for b in BALDES_MS] + [f">{BALDES_MS[-1]}ms"], self.baldes)),
+        }
+
+class ColetorMetricas:
+    """Agrega latências por função do db.py, por SQL normalizado e por render de página."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.zerar()
+
+    def zerar(self):
+        with self._lock:
+            self.por_funcao = defaultdict(Histograma)
+            self.por_sql = defaultdict(Histograma)
+            self.conexoes = defaultdict(Histograma)
+            self.renders = deque(maxlen=200)
+            self.desde = datetime.now()
+
+    def registrar_conexao(self, origem, ms):
+        with self._lock:
+            self.conexoes[origem].registrar(ms)
+        render = _render_atual()
+        if render is not None:
+            render["conexoes"] += 1
+            render["ms_banco"] += ms
+
+    def registrar_consulta(self, origem, sql, ms, linhas=0, erro=False):
+        impressao = impressao_sql(sql)
+        with self._lock:
+            for hist in (self.por_funcao[origem], self.por_sql[impressao]):
+                hist.registrar(ms, linhas)
+                if erro:
+                    hist.erros += 1
+        render = _render_atual()
+        if render is not None:
+            render["consultas"] += 1
+            render["ms_banco"] += ms
+        if ms >= LIMIAR_LENTO_MS:
+            _registrar_consulta_lenta(origem, impressao, sql, ms, render)
+
+    def registrar_leitura(self, origem, sql, ms, linhas):
+        # Leitura (fetch) conta latência e linhas, mas não é uma nova chamada
+        impressao = impressao_sql(sql)
+        with self._lock:
+            for hist in (self.por_funcao[origem], self.por_sql[impressao]):
+                hist.total_ms += ms
+                hist.linhas += linhas
+        render = _render_atual()
+        if render is not None:
+            render["ms_banco"] += ms
+
+    def registrar_render(self, render):
+        with self._lock:
+            self.renders.append(render)
+
+    def exportar(self):
+        """Retorna um dicionário serializável com todas as métricas."""
+        with self._lock:
+            return {
+                "desde": self.desde.isoformat(),
+                "gerado_em": datetime.now().isoformat(),
+                "limiar_lento_ms": LIMIAR_LENTO_MS,
+                "por_funcao": {k: v.como_dict() for k, v in self.por_funcao.items()},
+                "por_sql": {k: v.como_dict() for k, v in self.por_sql.items()},
+                "conexoes": {k: v.como_dict() for k, v in self.conexoes.items()},
+                "renders": list(self.renders),
+            }
+
+    def exportar_json(self):
+        return json.dumps(self.exportar(), ensure_ascii=False, indent=2, default=str)
+
+coletor = ColetorMetricas()
+_lock_arquivo = threading.Lock()
+
+def impressao_sql(sql):
+    """Normaliza o SQL (sem literais nem espaços extras) para agrupar consultas iguais."""
+    texto = sql.decode("utf-8", "ignore") if isinstance(sql, bytes) else str(sql)
+    texto = re.sub(r"'(?:[^'\\]|\\.)*'", "?", texto)
+    texto = re.sub(r"\b\d+\b", "?", texto)
+    texto = texto.replace("%s", "?")
+    return re.sub(r"\s+", " ", texto).strip()[:300]
+
+def _registrar_consulta_lenta(origem, impressao, sql, ms, render):
+    registro = {
+        "ts": datetime.now().isoformat(timespec="seconds"),
+        "funcao": origem,
+        "ms": round(ms, 1),
+        "pagina": render["pagina"] if render else None,
+        "sql": impressao,
+    }
+    try:
+        with _lock_arquivo:
+            os.makedirs(LOG_DIR, exist_ok=True)
+            with open(ARQUIVO_SLOW_LOG, "a", encoding="utf-8") as f:
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    except Exception as e:
+        print(f"⚠️ Falha ao gravar slow-query log: {e}")
+
+# ==========================================================
+# 3. CONTEXTO POR RENDER DE PÁGINA
+# ==========================================================
+_contexto = threading.local()
+
+def _render_atual():
+    return getattr(_contexto, "render", None)
+
+def iniciar_render(pagina):
+    """
+    Marca o início de um render de página. O render anterior da mesma sessão
+    é fechado e enviado ao histórico do coletor. Também abre o perfil do render (se ativo).
+    """
+    iniciar_perfil(pagina)
+    anterior = st.session_state.get("_render_db")
+    if anterior is not None:
+        coletor.registrar_render(anterior)
+    render = {
+        "pagina": pagina,
+        "inicio": datetime.now().isoformat(timespec="seconds"),
+        "consultas": 0,
+        "conexoes": 0,
+        "ms_banco": 0.0,
+    }
+    st.session_state["_render_db"] = render
+    _contexto.render = render
+    return render
+
+# ==========================================================
+# 4. PROXIES DE CONEXÃO E CURSOR
+# ==========================================================
+class CursorInstrumentado:
+    """Mede execute/fetch do cursor real e repassa todo o resto."""
+
+    def __init__(self, cursor, origem):
+        self._cursor = cursor
+        self._origem = origem
+        self._sql = ""
+
+    def execute(self, sql, params=None, *args, **kwargs):
+        self._sql = sql
+        inicio = time.perf_counter()
+        erro = False
+        try:
+            with span(impressao_sql(sql)[:80], "db"):
+                return self._cursor.execute(sql, params, *args, **kwargs)
+        except Exception:
+            erro = True
+            raise
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+            linhas = self._cursor.rowcount if not erro and self._cursor.rowcount else 0
+            coletor.registrar_consulta(self._origem, sql, ms, linhas=linhas, erro=erro)
+
+    def executemany(self, sql, seq_params, *args, **kwargs):
+        self._sql = sql
+        inicio = time.perf_counter()
+        erro = False
+        try:
+            with span(impressao_sql(sql)[:80], "db"):
+                return self._cursor.executemany(sql, seq_params, *args, **kwargs)
+        except Exception:
+            erro = True
+            raise
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+            linhas = self._cursor.rowcount if not erro and self._cursor.rowcount else 0
+            coletor.registrar_consulta(self._origem, sql, ms, linhas=linhas, erro=erro)
+
+    def _medir_leitura(self, metodo, *args):
+        inicio = time.perf_counter()
+        with span(metodo, "db"):
+            resultado = getattr(self._cursor, metodo)(*args)
+        if resultado is None:
+            linhas = 0
+        elif metodo == "fetchone":
+            linhas = 1
+        else:
+            linhas = len(resultado)
+        coletor.registrar_leitura(self._origem, self._sql, (time.perf_counter() - inicio) * 1000, linhas)
+        return resultado
+
+    def fetchone(self):
+        return self._medir_leitura("fetchone")
+
+    def fetchall(self):
+        return self._medir_leitura("fetchall")
+
+    def fetchmany(self, *args):
+        return self._medir_leitura("fetchmany", *args)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+        return False
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+class ConexaoInstrumentada:
+    """Envolve a conexão do mysql-connector para que todos os cursores sejam medidos."""
+
+    def __init__(self, conn, origem):
+        self._conn = conn
+        self._origem = origem
+
+    def cursor(self, *args, **kwargs):
+        return CursorInstrumentado(self._conn.cursor(*args, **kwargs), self._origem)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._conn.close()
+        return False
+
+    def __getattr__(self, nome):
+        return getattr(self._conn, nome)
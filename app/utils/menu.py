@@ -2,11 +2,16 @@ import streamlit as st
 import os
 from utils.ia_chat import mentoria_ia_sidebar
 from login import logout
+from utils.sessoes import fixar_token_na_url
+from utils.contexto_usuario import contexto_atual
 
 def renderizar_menu():
     # TRAVA DE SEGURANÇA: Se não houver usuário logado, não renderiza nada
     if 'usuario_id' not in st.session_state:
         return
+    contexto = contexto_atual()
+    # switch_page limpa a URL: recoloca o token para que um refresh nesta página não peça login
+    fixar_token_na_url(st.session_state.get("token_sessao"))
     
     with st.sidebar:
         # Caminho dinâmico para a logo (ajustado para funcionar de qualquer subpasta)
@@ -22,16 +27,15 @@ def renderizar_menu():
             st.image("https://fcjventurebuilder.com/wp-content/themes/fcj/assets/images/logo-fcj-white.png", width=200)
         
         st.title("📌 Navegação")
-        st.caption(f"👤 {st.session_state.get('user', 'Usuário')} | 🔐 {st.session_state.get('role', 'aluno')}")
+        st.caption(f"👤 {contexto.username} | 🔐 {contexto.role}")
         
-        # Menu de links
-        if st.session_state.get("role") != "admin":
+        # Menu de links (as travas vêm do progresso em cache no contexto da sessão)
+        if not contexto.is_admin:
             st.subheader("📖 Meus Trimestres")   
             st.page_link("Home.py", label="🏠 Home") 
-            st.page_link("pages/Trimestre Q1.py", label="1️⃣ Trimestre Q1")
-            st.page_link("pages/Trimestre Q2.py", label="2️⃣ Trimestre Q2")
-            st.page_link("pages/Trimestre Q3.py", label="3️⃣ Trimestre Q3")
-            st.page_link("pages/Trimestre Q4.py", label="4️⃣ Trimestre Q4")
+            for numero, trimestre in zip(("1️⃣", "2️⃣", "3️⃣", "4️⃣"), ("Q1", "Q2", "Q3", "Q4")):
+                cadeado = "" if contexto.trimestre_liberado(trimestre) else " 🔒"
+                st.page_link(f"pages/Trimestre {trimestre}.py", label=f"{numero} Trimestre {trimestre}{cadeado}")
             st.divider()
             
         # Chama a mentoria IA 
@@ -39,5 +43,5 @@ def renderizar_menu():
         
         st.divider()
         # Botão de Logout (o key deve ser único por página, ou use um valor dinâmico)
-        if st.button("Sair / Logout", width="stretch", key=f"logout_sidebar_{st.session_state.get('usuario_id')}"):
+        if st.button("Sair / Logout", width="stretch", key=f"logout_sidebar_{contexto.usuario_id}"):
             logout()
\ No newline at end of file
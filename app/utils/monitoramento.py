@@ -0,0 +1,193 @@
+import os
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+from utils.db import buscar_envios_startups, resumo_por_startup, resumo_por_etapa
+from utils.instrumentacao import coletor
+from utils.perfilador import perfis_recentes
+from utils.gravacao_lote import gravadores
+from utils.cache_referencia import cache_referencia
+from utils.exportacao_parquet import exportar_parquet, carregar_parquet, comparar_coortes
+from utils.telemetria_ia import buscar_telemetria_ia, resumir_telemetria
+
+LINHAS_POR_PAGINA = 50
+
+def aba_visao_geral_envios():
+    """Visão geral da coorte: agregados calculados no banco + tabela bruta paginada."""
+    st.markdown("#### 🚀 Por Startup")
+    df_startups = resumo_por_startup()
+    if df_startups.empty:
+        st.info("Nenhuma startup enviou respostas ainda.")
+        return
+    st.dataframe(df_startups, width="stretch", hide_index=True)
+
+    st.markdown("#### 🧩 Por Etapa")
+    st.dataframe(resumo_por_etapa(), width="stretch", hide_index=True)
+
+    st.caption("Resumos atualizados a cada 60 segundos.")
+    st.divider()
+
+    # --- TABELA BRUTA (PAGINADA) ---
+    st.markdown("#### 📄 Envios Recentes")
+    if "envios_pilha_chaves" not in st.session_state:
+        st.session_state.envios_pilha_chaves = [None]
+    pilha = st.session_state.envios_pilha_chaves
+
+    df_envios, proxima_chave = buscar_envios_startups(apos=pilha[-1], limite=LINHAS_POR_PAGINA)
+    st.dataframe(df_envios, width="stretch", hide_index=True)
+
+    c_ant, c_pag, c_prox = st.columns([1, 2, 1])
+    with c_ant:
+        if st.button("⬅️ Anterior", disabled=len(pilha) == 1, key="envios_pag_anterior", width="stretch"):
+            pilha.pop()
+            st.rerun()
+    with c_pag:
+        st.caption(f"Página {len(pilha)}")
+    with c_prox:
+        if st.button("Próxima ➡️", disabled=proxima_chave is None, key="envios_pag_proxima", width="stretch"):
+            pilha.append(proxima_chave)
+            st.rerun()
+
+def aba_analise_coortes():
+    """Comparação entre coortes lida dos arquivos Parquet (fora do caminho transacional do TiDB)."""
+    col_info, col_btn = st.columns([3, 1])
+    with col_info:
+        st.caption("Dados lidos da última exportação Parquet. Exporte para incluir os envios mais recentes.")
+    with col_btn:
+        if st.button("📦 Exportar novos dados", key="btn_exportar_parquet", width="stretch"):
+            with st.spinner("Exportando avaliações, progresso e logs..."):
+                exportados = exportar_parquet()
+            carregar_parquet.clear()
+            st.toast(" | ".join(f"{t}: {n}" for t, n in exportados.items()))
+
+    notas, tentativas = comparar_coortes()
+    if notas.empty:
+        st.info("Nenhuma exportação encontrada ainda.")
+        return
+
+    st.markdown("#### 🎯 Média da Última Nota (coorte x trimestre)")
+    st.dataframe(notas, width="stretch")
+    st.markdown("#### 🔁 Tentativas por Etapa (coorte x trimestre)")
+    st.dataframe(tentativas, width="stretch")
+
+def aba_desempenho_banco():
+    """Latência do banco por função, por SQL normalizado e por render de página (desde o início do processo)."""
+    metricas = coletor.exportar()
+    colunas = ["chamadas", "p50_ms", "p95_ms", "max_ms", "total_ms", "linhas", "erros"]
+
+    def _tabela(dados, indice):
+        if not dados:
+            return pd.DataFrame(columns=[indice] + colunas)
+        df = pd.DataFrame.from_dict(dados, orient="index")[colunas]
+        return df.rename_axis(indice).sort_values("total_ms", ascending=False)
+
+    st.caption(f"Coletado desde {metricas['desde'][:19]} | Consultas lentas (>= {metricas['limiar_lento_ms']:.0f} ms) vão para `logs/slow_queries.log`.")
+
+    st.markdown("#### 🧮 Por Função")
+    st.dataframe(_tabela(metricas["por_funcao"], "funcao"), width="stretch")
+
+    st.markdown("#### 🔎 Por SQL")
+    st.dataframe(_tabela(metricas["por_sql"], "sql"), width="stretch")
+
+    st.markdown("#### 🔌 Abertura de Conexões")
+    st.dataframe(_tabela(metricas["conexoes"], "origem"), width="stretch")
+
+    st.markdown("#### 🖥️ Renders Recentes")
+    if metricas["renders"]:
+        df_renders = pd.DataFrame(metricas["renders"])
+        st.dataframe(df_renders.iloc[::-1], width="stretch", hide_index=True)
+        st.dataframe(
+            df_renders.groupby("pagina")[["consultas", "conexoes", "ms_banco"]].mean().round(1),
+            width="stretch"
+        )
+
+    st.markdown("#### 📨 Gravação em Lote (logs e telemetria)")
+    st.dataframe(pd.DataFrame([g.estatisticas() for g in gravadores]), width="stretch", hide_index=True)
+
+    st.markdown("#### 🗂️ Cache de Referência (templates e base de conhecimento)")
+    st.dataframe(pd.DataFrame([cache_referencia.estatisticas()]), width="stretch", hide_index=True)
+
+    c1, c2 = st.columns(2)
+    with c1:
+        st.download_button(
+            "⬇️ Baixar métricas (JSON)", data=coletor.exportar_json(),
+            file_name="metricas_db.json", mime="application/json",
+            key="dl_metricas_db", width="stretch"
+        )
+    with c2:
+        if st.button("🧹 Zerar métricas", key="btn_zerar_metricas_db", width="stretch"):
+            coletor.zerar()
+            st.rerun()
+
+def aba_perfis_render():
+    """Waterfall dos últimos renders perfilados (admins sempre; alunos com FCJ_PROFILER=1)."""
+    perfis = list(perfis_recentes)
+    if not perfis:
+        st.info("Nenhum render perfilado ainda. Admins são perfilados automaticamente; para alunos use FCJ_PROFILER=1.")
+        return
+
+    perfis.reverse()
+    rotulos = [
+        f"{p['inicio']} | {p['pagina']} | {p.get('usuario') or '-'} | {p['total_ms']:.0f} ms"
+        + (" (interrompido)" if p["interrompido"] else "")
+        for p in perfis
+    ]
+    escolhido = st.selectbox("Render", range(len(perfis)), format_func=lambda i: rotulos[i], key="perfil_render_sel")
+    perfil = perfis[escolhido]
+
+    if not perfil["spans"]:
+        st.caption("Render sem trechos medidos.")
+        return
+
+    df = pd.DataFrame(perfil["spans"]).sort_values("inicio_ms")
+    df["rotulo"] = ["  " * d + n for d, n in zip(df["profundidade"], df["nome"])]
+    cores = {"db": "#00ADEF", "io": "#F5A623", "ia": "#9B59B6", "grafico": "#2ECC71", "app": "#95A5A6"}
+
+    fig = go.Figure()
+    for categoria, grupo in df.groupby("categoria"):
+        fig.add_trace(go.Bar(
+            y=grupo["rotulo"], x=grupo["duracao_ms"], base=grupo["inicio_ms"],
+            orientation="h", name=categoria, marker_color=cores.get(categoria, "#95A5A6"),
+            hovertemplate="%{y}<br>início %{base:.1f} ms<br>duração %{x:.1f} ms<extra></extra>",
+        ))
+    fig.update_layout(
+        barmode="overlay", height=max(250, 22 * len(df)), margin=dict(t=10, b=10, l=10, r=10),
+        xaxis_title="ms desde o início do render",
+        yaxis=dict(autorange="reversed", categoryorder="array", categoryarray=list(df["rotulo"])),
+    )
+    st.plotly_chart(fig, width="stretch", config={"displayModeBar": False})
+
+    resumo = df[df["profundidade"] == 0].groupby("categoria")["duracao_ms"].sum().round(1)
+    st.dataframe(resumo.rename("ms (nível superior)"), width="stretch")
+
+    if perfil.get("arquivo_pstats") and os.path.exists(perfil["arquivo_pstats"]):
+        with open(perfil["arquivo_pstats"], "rb") as f:
+            st.download_button(
+                "⬇️ Baixar .pstats", data=f.read(), file_name=os.path.basename(perfil["arquivo_pstats"]),
+                mime="application/octet-stream", key="dl_pstats_render"
+            )
+
+def aba_telemetria_ia():
+    """Latência (p50/p95), time-to-first-token e gasto de tokens das chamadas de IA por etapa e trimestre."""
+    dias = st.selectbox("Período", [1, 7, 30, 90], index=2, format_func=lambda d: f"Últimos {d} dias", key="telemetria_periodo")
+    df = buscar_telemetria_ia(dias)
+    if df.empty:
+        st.info("Nenhuma chamada de IA registrada no período.")
+        return
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Chamadas", len(df))
+    c2.metric("Latência p50", f"{df['latencia_ms'].quantile(0.50):.0f} ms")
+    c3.metric("Latência p95", f"{df['latencia_ms'].quantile(0.95):.0f} ms")
+    c4.metric("Taxa de erro", f"{100 * (df['resultado'] == 'erro').mean():.1f}%")
+
+    st.markdown("#### 🧩 Por Etapa")
+    st.dataframe(resumir_telemetria(df, "etapa"), width="stretch")
+
+    st.markdown("#### 🗓️ Por Trimestre")
+    st.dataframe(resumir_telemetria(df, "trimestre"), width="stretch")
+
+    st.markdown("#### 🤖 Por Operação")
+    st.dataframe(resumir_telemetria(df, "operacao"), width="stretch")
+
+    st.caption("Custo estimado a partir de PRECOS_MODELOS (telemetria_ia.py). Dados atualizados a cada 60 segundos.")
@@ -0,0 +1,202 @@
+import os
+import re
+import time
+import hashlib
+import unicodedata
+import openpyxl
+from utils.db import (
+    RAIZ_PROJETO, templates_para_pacotes, materiais_candidatos_pacote, passagens_dos_materiais,
+    buscar_pacote_contexto, salvar_pacote_contexto
+)
+from utils.cache_referencia import cache_referencia
+
+# ==========================================================
+# 1. CONFIGURAÇÃO
+# ==========================================================
+# Suba quando o formato do pacote mudar: todos são regerados na próxima leitura
+VERSAO_PACOTE = 1
+# O pacote vai em toda análise da etapa: limites para mantê-lo compacto
+MAX_PERGUNTAS_PACOTE = 60
+MAX_CARACTERES_CAMPO = 200
+PASSAGENS_POR_PACOTE = 4
+MAX_CARACTERES_TRECHOS = 4000
+ABAS_IGNORADAS = ("cronograma",)
+_PALAVRAS_VAZIAS = {"para", "com", "dos", "das", "que", "uma", "por", "sua", "seu", "como", "aula", "pdf"}
+
+def palavras(texto):
+    """Termos sem acento e em minúsculas (3+ letras) para comparar etapa, aulas e passagens."""
+    texto = unicodedata.normalize("NFKD", str(texto or "")).encode("ascii", "ignore").decode("ascii").lower()
+    return {p for p in re.findall(r"[a-z]{3,}", texto) if p not in _PALAVRAS_VAZIAS}
+
+# ==========================================================
+# 2. CAMPOS ESPERADOS (PLANILHA DO TEMPLATE)
+# ==========================================================
+def _aba_da_etapa(abas, nome_etapa):
+    """Aba com o nome da etapa (planilha com todas as etapas) ou com o mesmo número ('1.0'); senão a única útil."""
+    alvo = " ".join(nome_etapa.split()).lower()
+    for aba in abas:
+        if " ".join(aba.split()).lower() == alvo:
+            return aba
+    numero = re.match(r"\s*(\d+\.\d+)", nome_etapa)
+    if numero:
+        for aba in abas:
+            if re.match(rf"\s*{re.escape(numero.group(1))}\b", aba):
+                return aba
+    uteis = [aba for aba in abas if aba.strip().lower() not in ABAS_IGNORADAS]
+    # Planilha com várias etapas e nenhuma desta: melhor sem campos do que com os de outra etapa
+    return uteis[0] if len(uteis) == 1 else None
+
+def extrair_perguntas_template(caminho, nome_etapa):
+    """
+    Campos esperados na aba da etapa: o primeiro texto de cada linha (o rótulo) e os textos
+    terminados em '?' ou ':'. Os exemplos preenchidos ficam à direita dos rótulos e ficam de fora.
+    """
+    if not caminho or not caminho.lower().endswith(".xlsx") or not os.path.exists(caminho):
+        return []
+    livro = openpyxl.load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        aba = _aba_da_etapa(livro.sheetnames, nome_etapa)
+        if aba is None:
+            return []
+        perguntas, vistas = [], {" ".join(aba.split()).lower()}
+        for linha in livro[aba].iter_rows(values_only=True):
+            textos = [" ".join(v.split()) for v in linha if isinstance(v, str) and v.strip()]
+            for posicao, texto in enumerate(textos):
+                if posicao and not texto.endswith(("?", ":")):
+                    continue
+                if len(texto) > MAX_CARACTERES_CAMPO or texto.lower() in vistas:
+                    continue
+                vistas.add(texto.lower())
+                perguntas.append(texto)
+                if len(perguntas) >= MAX_PERGUNTAS_PACOTE:
+                    return perguntas
+        return perguntas
+    finally:
+        livro.close()
+
+# ==========================================================
+# 3. TRECHOS DA AULA
+# ==========================================================
+def escolher_materiais(nome_etapa, candidatos):
+    """Os materiais marcados com a etapa; sem marcação, o(s) do trimestre cujo nome mais lembra a etapa."""
+    marcados = [m for m in candidatos if (m["etapa"] or "").strip() == nome_etapa.strip()]
+    if marcados:
+        return marcados
+    termos = palavras(nome_etapa)
+    pontos = [(len(termos & palavras(m["nome"])), m) for m in candidatos]
+    melhor = max((p for p, _ in pontos), default=0)
+    return [m for p, m in pontos if melhor and p == melhor]
+
+def selecionar_trechos(passagens, termos, limite=PASSAGENS_POR_PACOTE, max_caracteres=MAX_CARACTERES_TRECHOS):
+    """As passagens com mais termos das perguntas, devolvidas na ordem da aula e cortadas em max_caracteres."""
+    pontuadas = sorted(
+        ((len(termos & palavras(texto)), posicao) for posicao, (_, _, texto) in enumerate(passagens)),
+        key=lambda item: (-item[0], item[1])
+    )
+    escolhidas = sorted(posicao for pontos, posicao in pontuadas[:limite] if pontos)
+    if not escolhidas: # Nenhum termo em comum: o começo da aula
+        escolhidas = list(range(min(limite, len(passagens))))
+    trechos, total = [], 0
+    for posicao in escolhidas:
+        texto = passagens[posicao][2][:max_caracteres - total]
+        if not texto:
+            break
+        trechos.append(texto)
+        total += len(texto)
+    return trechos
+
+# ==========================================================
+# 4. PACOTE (GRAVADO E VERSIONADO POR TEMPLATE)
+# ==========================================================
+def assinatura_fontes(template, materiais):
+    """Muda quando o arquivo ou o nome do template mudam, ou quando as passagens das aulas escolhidas mudam."""
+    partes = [VERSAO_PACOTE, template["id"], template["nome_formulario"], template["caminho_arquivo"],
+              str(template["data_upload"])]
+    partes += [(m["id"], m["passagens"], m["ultima_passagem"]) for m in materiais]
+    return hashlib.sha256(repr(partes).encode("utf-8")).hexdigest()
+
+def montar_pacote(nome_etapa, perguntas, trechos, materiais):
+    if not perguntas and not trechos:
+        return ""
+    linhas = [f"PACOTE DE CONTEXTO DA ETAPA {nome_etapa}"]
+    if perguntas:
+        linhas.append("Rótulos do template (campos e perguntas esperados; podem incluir textos de exemplo):")
+        linhas += [f"- {p}" for p in perguntas]
+    if trechos:
+        linhas.append(f"Trechos da aula ({', '.join(m['nome'] for m in materiais)}):")
+        linhas += [f"[{i}] {t}" for i, t in enumerate(trechos, start=1)]
+    return "\n".join(linhas)
+
+def preparar_pacote(template, forcar=False):
+    """
+    Pacote de um template: reaproveita o gravado se a assinatura das fontes não mudou,
+    senão extrai de novo e grava. Retorna (conteudo, 'reaproveitado' | 'gerado', perguntas ou None).
+    """
+    nome_etapa = template["nome_formulario"].strip()
+    candidatos = materiais_candidatos_pacote(nome_etapa, template["template"])
+    if candidatos is None:
+        raise ConnectionError("falha ao consultar a base de conhecimento")
+    materiais = escolher_materiais(nome_etapa, candidatos)
+    assinatura = assinatura_fontes(template, materiais)
+    if not forcar:
+        gravado = buscar_pacote_contexto(template["id"])
+        if gravado and gravado["versao_fonte"] == assinatura:
+            return gravado["conteudo"], "reaproveitado", None
+
+    perguntas = extrair_perguntas_template(os.path.join(RAIZ_PROJETO, template["caminho_arquivo"] or ""), nome_etapa)
+    passagens = passagens_dos_materiais([m["id"] for m in materiais])
+    if passagens is None:
+        raise ConnectionError("falha ao ler as passagens das aulas")
+    termos = palavras(nome_etapa).union(*(palavras(p) for p in perguntas))
+    conteudo = montar_pacote(nome_etapa, perguntas, selecionar_trechos(passagens, termos), materiais)
+    # Pacote vazio também é gravado: a etapa sem template legível não é reprocessada a cada análise
+    salvar_pacote_contexto(template["id"], nome_etapa, template["template"], assinatura, perguntas, conteudo)
+    return conteudo, "gerado", perguntas
+
+def gerar_pacotes_contexto(trimestre=None, forcar=False):
+    """
+    Pré-computa os pacotes dos templates ativos (de um trimestre, se informado).
+    Retorna o relatório: {gerados, reaproveitados, falhas, resultados, segundos, erro}.
+    """
+    inicio = time.perf_counter()
+    relatorio = {"gerados": 0, "reaproveitados": 0, "falhas": 0, "resultados": [], "segundos": 0.0, "erro": None}
+    templates = templates_para_pacotes(trimestre)
+    if templates is None:
+        relatorio["erro"] = "❌ Falha ao listar os templates."
+        return relatorio
+    for template in templates:
+        resultado = {"etapa": template["nome_formulario"], "trimestre": template["template"],
+                     "situacao": "erro", "perguntas": None, "caracteres": 0, "mensagem": ""}
+        try:
+            conteudo, situacao, perguntas = preparar_pacote(template, forcar)
+            resultado.update(situacao=situacao, caracteres=len(conteudo),
+                             perguntas=len(perguntas) if perguntas is not None else None)
+            relatorio["gerados" if situacao == "gerado" else "reaproveitados"] += 1
+        except Exception as e:
+            resultado["mensagem"] = str(e)
+            relatorio["falhas"] += 1
+        relatorio["resultados"].append(resultado)
+    relatorio["segundos"] = round(time.perf_counter() - inicio, 2)
+    return relatorio
+
+# ==========================================================
+# 5. LEITURA NA ANÁLISE (MESMO PACOTE PARA TODOS OS ALUNOS)
+# ==========================================================
+def _carregar_pacote(nome_etapa):
+    templates = templates_para_pacotes(nome_etapa=nome_etapa)
+    if templates is None:
+        raise ConnectionError("sem conexão com o banco")
+    return preparar_pacote(templates[0])[0] if templates else ""
+
+def pacote_contexto_etapa(nome_etapa):
+    """
+    Pacote da etapa para o analisador. Fica em memória até uma escrita em templates ou na
+    base de conhecimento (daqui ou de outra réplica); aí a assinatura é reconferida no banco
+    e o pacote só é regerado se as fontes mudaram. "" se a etapa não tiver pacote ou o banco falhar.
+    """
+    # "pacotes" sobe de versão junto com "templates" e "conhecimento" (DEPENDENTES no cache)
+    try:
+        return cache_referencia.obter("pacotes", nome_etapa.strip(), lambda: _carregar_pacote(nome_etapa))
+    except Exception as e:
+        print(f"⚠️ Pacote de contexto indisponível para {nome_etapa}: {e}")
+        return ""
@@ -0,0 +1,163 @@
+import os
+import re
+import hashlib
+import unicodedata
+
+# ==========================================================
+# 1. CONFIGURAÇÃO
+# ==========================================================
+# Uma passagem fecha num fim de parágrafo entre MIN e MAX caracteres
+TAMANHO_MIN_PASSAGEM = 400
+TAMANHO_MAX_PASSAGEM = 1500
+# Entre MIN e MAX, o corte depende do conteúdo do parágrafo (não da posição):
+# editar um trecho só muda as passagens vizinhas, e o resto do documento
+# volta a cortar nos mesmos lugares. Em média ~DIVISOR_CORTE parágrafos após o mínimo.
+DIVISOR_CORTE = 2
+
+_CARIMBO_UPLOAD = re.compile(r"^\d{8}(_?\d{4,6})?_")
+_ID_YOUTUBE = re.compile(r"(?:v=|youtu\.be/|/shorts/|/embed/)([0-9A-Za-z_-]{11})")
+_CABECALHO_SEGMENTO = re.compile(r"^### \[([\d:]+) – ([\d:]+)\]\n", re.M)
+
+# ==========================================================
+# 2. ORIGEM DO MATERIAL
+# ==========================================================
+def chave_origem(nome, tipo, caminho):
+    """
+    Identifica a mesma fonte entre reenvios: 'Aula_01.Diagnostico.pdf' enviado de novo
+    (com outro carimbo de data no caminho) ou o mesmo vídeo com outra URL.
+    """
+    if tipo == "youtube" or str(caminho or "").startswith("http"):
+        encontrado = _ID_YOUTUBE.search(caminho or "")
+        return f"youtube:{encontrado.group(1) if encontrado else (caminho or '').strip()}"
+    base = os.path.basename(nome or caminho or "")
+    base = _CARIMBO_UPLOAD.sub("", base)
+    base = unicodedata.normalize("NFKD", base).encode("ascii", "ignore").decode("ascii").lower()
+    return "arquivo:" + re.sub(r"[^a-z0-9]", "", base)[:240]
+
+# ==========================================================
+# 3. DIVISÃO EM PASSAGENS
+# ==========================================================
+def normalizar(texto):
+    return re.sub(r"\s+", " ", texto).strip()
+
+def hash_passagem(texto):
+    """Igual para passagens que só diferem em espaços/maiúsculas."""
+    return hashlib.sha256(normalizar(texto).lower().encode("utf-8")).hexdigest()
+
+def _fatiar_paragrafo(paragrafo):
+    """Parágrafo maior que o máximo: fatias por frase (ou por palavra, em último caso)."""
+    pedacos, atual = [], ""
+    for frase in re.split(r"(?<=[.!?;:])\s+", paragrafo):
+        while len(frase) > TAMANHO_MAX_PASSAGEM:
+            corte = frase.rfind(" ", 0, TAMANHO_MAX_PASSAGEM)
+            corte = corte if corte > 0 else TAMANHO_MAX_PASSAGEM
+            if atual:
+                pedacos.append(atual)
+                atual = ""
+            pedacos.append(frase[:corte].strip())
+            frase = frase[corte:].strip()
+        if atual and len(atual) + len(frase) + 1 > TAMANHO_MAX_PASSAGEM:
+            pedacos.append(atual)
+            atual = ""
+        atual = f"{atual} {frase}".strip()
+    if atual:
+        pedacos.append(atual)
+    return pedacos
+
+def _fecha_passagem(paragrafo, tamanho):
+    if tamanho >= TAMANHO_MAX_PASSAGEM:
+        return True
+    if tamanho < TAMANHO_MIN_PASSAGEM:
+        return False
+    return hashlib.md5(paragrafo.encode("utf-8")).digest()[0] % DIVISOR_CORTE == 0
+
+def dividir_em_passagens(texto):
+    """Texto extraído -> [(hash, passagem)] em ordem, sem passagens repetidas."""
+    paragrafos = []
+    for bloco in re.split(r"\n\s*\n", texto or ""):
+        bloco = normalizar(bloco)
+        if bloco:
+            paragrafos.extend(_fatiar_paragrafo(bloco) if len(bloco) > TAMANHO_MAX_PASSAGEM else [bloco])
+
+    passagens, atual = [], []
+    tamanho = 0
+    for paragrafo in paragrafos:
+        if atual and tamanho + len(paragrafo) > TAMANHO_MAX_PASSAGEM:
+            passagens.append("\n\n".join(atual))
+            atual, tamanho = [], 0
+        atual.append(paragrafo)
+        tamanho += len(paragrafo)
+        if _fecha_passagem(paragrafo, tamanho):
+            passagens.append("\n\n".join(atual))
+            atual, tamanho = [], 0
+    if atual:
+        passagens.append("\n\n".join(atual))
+
+    resultado, vistos = [], set()
+    for passagem in passagens:
+        h = hash_passagem(passagem)
+        if h not in vistos:
+            vistos.add(h)
+            resultado.append((h, passagem))
+    return resultado
+
+def formatar_tempo(segundos):
+    """125 -> '02:05'; 3725 -> '1:02:05'."""
+    segundos = int(segundos or 0)
+    horas, resto = divmod(segundos, 3600)
+    minutos, seg = divmod(resto, 60)
+    return f"{horas}:{minutos:02d}:{seg:02d}" if horas else f"{minutos:02d}:{seg:02d}"
+
+def _segundos(tempo):
+    total = 0
+    for parte in tempo.split(":"):
+        total = total * 60 + int(parte)
+    return total
+
+def juntar_segmentos(segmentos):
+    """Material único (campo conteudo), com o intervalo de cada segmento no cabeçalho."""
+    return "\n\n".join(
+        f"### [{formatar_tempo(s['inicio_s'])} – {formatar_tempo(s['fim_s'])}]\n{s['conteudo']}" for s in segmentos
+    )
+
+def segmentos_do_texto(texto):
+    """Inverso de juntar_segmentos: recupera os segmentos de um vídeo já gravado (para reindexar)."""
+    partes = _CABECALHO_SEGMENTO.split(texto or "")
+    # split com 2 grupos: [antes, inicio, fim, conteudo, inicio, fim, conteudo, ...]
+    return [
+        {"inicio_s": _segundos(partes[i]), "fim_s": _segundos(partes[i + 1]), "conteudo": partes[i + 2].strip()}
+        for i in range(1, len(partes) - 2, 3)
+    ]
+
+def passagens_de_segmentos(segmentos):
+    """Segmentos de vídeo já estruturados -> [(hash, texto, inicio_s, fim_s)]; um segmento = uma passagem."""
+    resultado, vistos = [], set()
+    for s in segmentos:
+        texto = (s.get("conteudo") or s.get("texto") or "").strip()
+        if not texto:
+            continue
+        # O intervalo entra no hash: o mesmo texto em outro trecho do vídeo é outra passagem
+        h = hash_passagem(f"{s['inicio_s']}-{s['fim_s']} {texto}")
+        if h not in vistos:
+            vistos.add(h)
+            resultado.append((h, texto, s["inicio_s"], s["fim_s"]))
+    return resultado
+
+# ==========================================================
+# 4. DIFERENÇA ENTRE VERSÕES
+# ==========================================================
+def diferenca_passagens(existentes, novas):
+    """
+    existentes: {hash: (id, ordem)} já no índice; novas: [(hash, texto, *extras)] da versão atual.
+    Retorna (inserir [(ordem, hash, texto, *extras)], remover [id], reordenar [(ordem, id)]).
+    """
+    inserir, reordenar = [], []
+    hashes_novos = set()
+    for ordem, (h, texto, *extras) in enumerate(novas):
+        hashes_novos.add(h)
+        if h not in existentes:
+            inserir.append((ordem, h, texto, *extras))
+        elif existentes[h][1] != ordem:
+            reordenar.append((ordem, existentes[h][0]))
+    remover = [id_ for h, (id_, _) in existentes.items() if h not in hashes_novos]
+    return inserir, remover, reordenar
@@ -0,0 +1,127 @@
+import os
+import time
+import cProfile
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+import streamlit as st
+
+# ==========================================================
+# 1. CONFIGURAÇÃO (OPT-IN)
+# ==========================================================
+# FCJ_PROFILER=1 liga o perfil para todas as sessões; admins sempre são perfilados.
+# FCJ_PROFILER_PSTATS=1 também grava um .pstats (cProfile) por render em logs/perfis.
+PERFIL_GLOBAL = os.environ.get("FCJ_PROFILER") == "1"
+GRAVAR_PSTATS = os.environ.get("FCJ_PROFILER_PSTATS") == "1"
+PERFIS_DIR = os.path.join(os.getcwd(), "logs", "perfis")
+
+# Últimos renders perfilados (processo inteiro) para o painel do admin
+perfis_recentes = deque(maxlen=50)
+_lock = threading.Lock()
+_contexto = threading.local()
+
+def perfilador_ativo():
+    return PERFIL_GLOBAL or st.session_state.get("role") == "admin"
+
+# ==========================================================
+# 2. CICLO DO RENDER
+# ==========================================================
+def iniciar_perfil(pagina):
+    """Abre o perfil de um render. Um perfil anterior que não foi fechado (st.stop, switch_page) é descartado como interrompido."""
+    # O perfil fica na sessão: cada rerun pode rodar numa thread nova do Streamlit
+    anterior = st.session_state.pop("_perfil_render", None)
+    if anterior is not None:
+        _fechar(anterior, interrompido=True)
+    _contexto.perfil = None
+    if not perfilador_ativo():
+        return
+
+    perfil = {
+        "pagina": pagina,
+        "usuario": st.session_state.get("user"),
+        "inicio": datetime.now().isoformat(timespec="seconds"),
+        "t0": time.perf_counter(),
+        "spans": [],
+        "pilha": [],
+        "cprofile": None,
+        "arquivo_pstats": None,
+    }
+    if GRAVAR_PSTATS:
+        try:
+            perfil["cprofile"] = cProfile.Profile()
+            perfil["cprofile"].enable()
+        except ValueError:
+            # Outra sessão já está com o cProfile ativo (Python 3.12+ permite um por processo)
+            perfil["cprofile"] = None
+    st.session_state["_perfil_render"] = perfil
+    _contexto.perfil = perfil
+
+def finalizar_perfil():
+    """Fecha o perfil do render atual e o publica no painel."""
+    perfil = st.session_state.pop("_perfil_render", None)
+    _contexto.perfil = None
+    if perfil is not None:
+        _fechar(perfil, interrompido=False)
+
+def _fechar(perfil, interrompido):
+    if interrompido:
+        # Fechado só no rerun seguinte: o fim real é o fim do último span registrado
+        perfil["total_ms"] = max((s["inicio_ms"] + s["duracao_ms"] for s in perfil["spans"]), default=0.0)
+    else:
+        perfil["total_ms"] = round((time.perf_counter() - perfil["t0"]) * 1000, 1)
+    perfil["interrompido"] = interrompido
+    prof = perfil.pop("cprofile")
+    if prof is not None:
+        prof.disable()
+        try:
+            os.makedirs(PERFIS_DIR, exist_ok=True)
+            nome = f"{perfil['pagina']}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.pstats"
+            caminho = os.path.join(PERFIS_DIR, nome)
+            prof.dump_stats(caminho)
+            perfil["arquivo_pstats"] = caminho
+        except Exception as e:
+            print(f"⚠️ Falha ao gravar pstats: {e}")
+    perfil.pop("pilha", None)
+    perfil.pop("t0", None)
+    with _lock:
+        perfis_recentes.append(perfil)
+
+# ==========================================================
+# 3. SPANS (DB, ARQUIVOS, IA, GRÁFICOS)
+# ==========================================================
+@contextmanager
+def _span_ativo(perfil, nome, categoria):
+    inicio = time.perf_counter()
+    registro = {
+        "nome": nome,
+        "categoria": categoria,
+        "inicio_ms": round((inicio - perfil["t0"]) * 1000, 2),
+        "profundidade": len(perfil["pilha"]),
+    }
+    perfil["pilha"].append(registro)
+    try:
+        yield registro
+    finally:
+        perfil["pilha"].pop()
+        registro["duracao_ms"] = round((time.perf_counter() - inicio) * 1000, 2)
+        perfil["spans"].append(registro)
+
+def span(nome, categoria="app"):
+    """Context manager de um trecho medido. Sem perfil ativo, não custa nada além de um getattr."""
+    perfil = getattr(_contexto, "perfil", None)
+    if perfil is None:
+        return nullcontext()
+    return _span_ativo(perfil, nome, categoria)
+
+def perfilar(categoria, nome=None):
+    """Decorator que registra a chamada inteira da função como um span."""
+    def decorador(func):
+        rotulo = nome or func.__name__
+        @functools.wraps(func)
+        def envoltorio(*args, **kwargs):
+            with span(rotulo, categoria):
+                return func(*args, **kwargs)
+        return envoltorio
+    return decorador
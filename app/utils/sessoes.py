@@ -0,0 +1,106 @@
+import os
+import hmac
+import hashlib
+import time
+import secrets
+import threading
+from functools import lru_cache
+import streamlit as st
+from utils.db import registrar_sessao_db, buscar_sessao_db, remover_sessao_db, remover_sessoes_expiradas
+
+# ==========================================================
+# 1. CONFIGURAÇÃO
+# ==========================================================
+DURACAO_SESSAO_H = float(os.environ.get("FCJ_SESSAO_HORAS", 12))
+PARAMETRO_URL = "sessao"
+NOME_COOKIE = "fcj_sessao"
+# Sessões vencidas são apagadas no login, no máximo uma vez por intervalo (por processo)
+INTERVALO_LIMPEZA_S = float(os.environ.get("FCJ_SESSAO_LIMPEZA_S", 3600))
+_trava_limpeza = threading.Lock()
+_ultima_limpeza = None
+
+@lru_cache(maxsize=1)
+def _chave_assinatura():
+    """FCJ_SESSION_SECRET ou SESSION_SECRET do secrets; sem chave, tokens valem só neste processo."""
+    chave = os.environ.get("FCJ_SESSION_SECRET")
+    if not chave:
+        try:
+            chave = st.secrets.get("SESSION_SECRET")
+        except Exception:
+            chave = None
+    if not chave:
+        print("⚠️ [Sessões] SESSION_SECRET não configurado: sessões não sobrevivem a reinícios nem entre réplicas.")
+        chave = secrets.token_hex(32)
+    return chave.encode("utf-8")
+
+# ==========================================================
+# 2. TOKENS ASSINADOS
+# ==========================================================
+# Formato: <id aleatório>.<HMAC-SHA256 do id>. A assinatura é conferida antes de
+# qualquer consulta (token forjado não chega ao banco) e no banco fica só o
+# SHA-256 do id, então um vazamento da tabela não entrega sessões válidas.
+def _assinar(identificador):
+    return hmac.new(_chave_assinatura(), identificador.encode("utf-8"), hashlib.sha256).hexdigest()
+
+def _hash_token(identificador):
+    return hashlib.sha256(identificador.encode("utf-8")).hexdigest()
+
+def _identificador_valido(token):
+    identificador, _, assinatura = (token or "").partition(".")
+    if not identificador or not hmac.compare_digest(assinatura, _assinar(identificador)):
+        return None
+    return identificador
+
+def criar_sessao(usuario_id):
+    """Gera o token, grava a sessão com validade e devolve o token (ou None se o banco falhar)."""
+    identificador = secrets.token_urlsafe(32)
+    if not registrar_sessao_db(_hash_token(identificador), usuario_id, DURACAO_SESSAO_H * 3600):
+        return None
+    _limpar_expiradas_se_vencido()
+    return f"{identificador}.{_assinar(identificador)}"
+
+def _limpar_expiradas_se_vencido():
+    """Apaga as sessões vencidas se o intervalo passou; logins simultâneos não repetem a limpeza."""
+    global _ultima_limpeza
+    vencido = _ultima_limpeza is None or time.monotonic() - _ultima_limpeza >= INTERVALO_LIMPEZA_S
+    if not vencido or not _trava_limpeza.acquire(blocking=False):
+        return
+    try:
+        _ultima_limpeza = time.monotonic()
+        remover_sessoes_expiradas()
+    finally:
+        _trava_limpeza.release()
+
+def validar_sessao(token):
+    """Usuário (id, username, role) da sessão, sem bcrypt: uma leitura pela chave primária."""
+    identificador = _identificador_valido(token)
+    if not identificador:
+        return None
+    return buscar_sessao_db(_hash_token(identificador))
+
+def encerrar_sessao(token):
+    identificador = _identificador_valido(token)
+    if identificador:
+        remover_sessao_db(_hash_token(identificador))
+
+# ==========================================================
+# 3. TRANSPORTE (URL / COOKIE)
+# ==========================================================
+def token_do_navegador():
+    """Token do parâmetro ?sessao= (gravado pelo app) ou de um cookie fcj_sessao (se um proxy o definir)."""
+    token = st.query_params.get(PARAMETRO_URL)
+    if not token:
+        try:
+            token = st.context.cookies.get(NOME_COOKIE)
+        except Exception:
+            token = None
+    return token
+
+def fixar_token_na_url(token):
+    """Mantém o token na URL: um refresh ou reconexão retoma a sessão sem novo login."""
+    if token and st.query_params.get(PARAMETRO_URL) != token:
+        st.query_params[PARAMETRO_URL] = token
+
+def remover_token_da_url():
+    if PARAMETRO_URL in st.query_params:
+        del st.query_params[PARAMETRO_URL]
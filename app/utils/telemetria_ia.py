@@ -0,0 +1,161 @@
+import time
+import threading
+from contextlib import contextmanager
+import pandas as pd
+import streamlit as st
+from utils.db import conectar, conectar_em_segundo_plano
+from utils.gravacao_lote import GravadorEmLote
+
+# ==========================================================
+# 1. CONFIGURAÇÃO
+# ==========================================================
+# Preço estimado em USD por 1 milhão de tokens (entrada, saída) — ajuste conforme a tabela do provedor
+PRECOS_MODELOS = {
+    "models/gemini-2.5-flash": (0.30, 2.50),
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+}
+
+MAPA_TRIMESTRES = {"q1_page": "Q1", "q2_page": "Q2", "q3_page": "Q3", "q4_page": "Q4"}
+
+COLUNAS_TELEMETRIA = (
+    "usuario_id", "etapa", "trimestre", "provedor", "modelo", "operacao",
+    "tokens_prompt", "tokens_resposta", "tokens_cache", "ttft_ms", "latencia_ms",
+    "cache", "resultado", "mensagem_erro",
+)
+
+# Gravação em lote numa thread de fundo (utils/gravacao_lote.py)
+gravador_telemetria = GravadorEmLote("telemetria_ia", COLUNAS_TELEMETRIA, conectar_em_segundo_plano)
+
+def registrar_telemetria_ia(registro):
+    """Enfileira um registro de telemetria; a gravação acontece em lote fora do caminho do usuário."""
+    gravador_telemetria.enfileirar(registro)
+
+# ==========================================================
+# 2. MEDIÇÃO DAS CHAMADAS
+# ==========================================================
+def trimestre_atual():
+    return MAPA_TRIMESTRES.get(st.session_state.get("current_page"))
+
+# Threads de um pool não têm a sessão do Streamlit: o contexto é lido na thread do script
+# (capturar_contexto) e entregue a elas por no_contexto
+_contexto_thread = threading.local()
+
+def capturar_contexto():
+    return {"usuario_id": st.session_state.get("usuario_id"), "trimestre": trimestre_atual()}
+
+def no_contexto(contexto, funcao):
+    """funcao envolvida para rodar em outra thread: as chamadas medidas nela usam `contexto`."""
+    def executar(*args, **kwargs):
+        _contexto_thread.valor = contexto
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            _contexto_thread.valor = None
+    return executar
+
+@contextmanager
+def medir_chamada_ia(provedor, modelo, operacao, etapa=None):
+    """
+    Mede uma chamada ao provedor de IA. O chamador preenche tokens/ttft no dicionário
+    retornado (ex: via preencher_uso_gemini); latência e resultado são calculados aqui.
+    """
+    contexto = getattr(_contexto_thread, "valor", None) or capturar_contexto()
+    registro = {
+        "usuario_id": contexto["usuario_id"],
+        "etapa": etapa,
+        "trimestre": contexto["trimestre"],
+        "provedor": provedor,
+        "modelo": modelo,
+        "operacao": operacao,
+        "resultado": "ok",
+    }
+    inicio = time.perf_counter()
+    registro["_inicio"] = inicio
+    try:
+        yield registro
+    except Exception as e:
+        registro["resultado"] = "erro"
+        registro["mensagem_erro"] = str(e)[:1000]
+        raise
+    finally:
+        registro.pop("_inicio", None)
+        registro["latencia_ms"] = int((time.perf_counter() - inicio) * 1000)
+        registrar_telemetria_ia(registro)
+
+def marcar_primeiro_token(registro):
+    """Registra o time-to-first-token (apenas na primeira chamada)."""
+    if registro.get("ttft_ms") is None and "_inicio" in registro:
+        registro["ttft_ms"] = int((time.perf_counter() - registro["_inicio"]) * 1000)
+
+def preencher_uso_gemini(registro, response):
+    uso = getattr(response, "usage_metadata", None)
+    if not uso:
+        return
+    registro["tokens_prompt"] = getattr(uso, "prompt_token_count", None)
+    registro["tokens_resposta"] = getattr(uso, "candidates_token_count", None)
+    # Cache implícito do Gemini: parte do prompt já estava em cache no provedor
+    cache = getattr(uso, "cached_content_token_count", 0) or 0
+    registro["tokens_cache"] = cache
+    registro["cache"] = "hit" if cache > 0 else "miss"
+
+def preencher_uso_openai(registro, chunk):
+    """Lê o uso de tokens do último chunk do streaming (OpenAI `usage` ou Groq `x_groq.usage`)."""
+    uso = getattr(chunk, "usage", None)
+    if uso is None and getattr(chunk, "x_groq", None) is not None:
+        uso = getattr(chunk.x_groq, "usage", None)
+    if uso is None:
+        return
+    registro["tokens_prompt"] = getattr(uso, "prompt_tokens", None)
+    registro["tokens_resposta"] = getattr(uso, "completion_tokens", None)
+    detalhes = getattr(uso, "prompt_tokens_details", None)
+    cache = (getattr(detalhes, "cached_tokens", 0) or 0) if detalhes else 0
+    registro["tokens_cache"] = cache
+    registro["cache"] = "hit" if cache > 0 else "miss"
+
+# ==========================================================
+# 3. CONSULTAS PARA O DASHBOARD
+# ==========================================================
+@st.cache_data(ttl=60, show_spinner=False)
+def buscar_telemetria_ia(dias=30):
+    """Linhas leves de telemetria dos últimos `dias` (sem mensagens de erro)."""
+    conn = conectar()
+    if not conn:
+        return pd.DataFrame()
+    try:
+        query = """
+            SELECT etapa, trimestre, provedor, modelo, operacao, tokens_prompt, tokens_resposta,
+                   ttft_ms, latencia_ms, cache, resultado, data_registro
+            FROM telemetria_ia
+            WHERE data_registro >= NOW() - INTERVAL %s DAY
+        """
+        return pd.read_sql(query, conn, params=(dias,))
+    except Exception as e:
+        st.error(f"Erro ao buscar telemetria de IA: {e}")
+        return pd.DataFrame()
+    finally:
+        conn.close()
+
+def resumir_telemetria(df, agrupamento):
+    """p50/p95 de latência, TTFT, tokens e custo estimado por grupo (ex: etapa ou trimestre)."""
+    if df.empty:
+        return pd.DataFrame()
+    df = df.copy()
+    df[agrupamento] = df[agrupamento].fillna("—")
+    precos = df["modelo"].map(PRECOS_MODELOS)
+    preco_in = precos.map(lambda p: p[0] if isinstance(p, tuple) else 0.0)
+    preco_out = precos.map(lambda p: p[1] if isinstance(p, tuple) else 0.0)
+    df["custo_usd"] = (df["tokens_prompt"].fillna(0) * preco_in + df["tokens_resposta"].fillna(0) * preco_out) / 1_000_000
+
+    grupos = df.groupby(agrupamento)
+    resumo = pd.DataFrame({
+        "chamadas": grupos.size(),
+        "erros": grupos["resultado"].apply(lambda s: (s == "erro").sum()),
+        "p50_ms": grupos["latencia_ms"].quantile(0.50),
+        "p95_ms": grupos["latencia_ms"].quantile(0.95),
+        "ttft_p50_ms": grupos["ttft_ms"].quantile(0.50),
+        "tokens_prompt": grupos["tokens_prompt"].sum(),
+        "tokens_resposta": grupos["tokens_resposta"].sum(),
+        "cache_hit_%": grupos["cache"].apply(lambda s: round(100 * (s == "hit").mean(), 1)),
+        "custo_usd": grupos["custo_usd"].sum().round(4),
+    })
+    return resumo.sort_values("custo_usd", ascending=False)
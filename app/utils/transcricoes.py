@@ -0,0 +1,96 @@
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from youtube_transcript_api import YouTubeTranscriptApi
+from utils.passagens import formatar_tempo
+
+# ==========================================================
+# 1. CONFIGURAÇÃO
+# ==========================================================
+# Transcrições gravadas por id do vídeo: reprocessar não vai ao YouTube de novo,
+# e as gravações servem para rodar o pipeline offline (benchmarks/transcricoes.py)
+TRANSCRICOES_DIR = os.environ.get("FCJ_TRANSCRICOES_DIR", os.path.join(os.getcwd(), "cache", "transcricoes"))
+IDIOMAS_LEGENDA = ("pt", "en")
+# Um segmento fecha ao atingir a duração ou o tamanho de texto, o que vier primeiro
+DURACAO_SEGMENTO_S = int(os.environ.get("FCJ_SEGMENTO_S", 300))
+MAX_CARACTERES_SEGMENTO = 6000
+# Segmentos estruturados ao mesmo tempo (chamadas ao Gemini em paralelo)
+TRABALHADORES_TRANSCRICAO = int(os.environ.get("FCJ_TRANSCRICAO_TRABALHADORES", 4))
+
+# ==========================================================
+# 2. TRANSCRIÇÃO (CACHE EM DISCO)
+# ==========================================================
+def _caminho_cache(video_id):
+    return os.path.join(TRANSCRICOES_DIR, f"{video_id}.json")
+
+def _buscar_no_youtube(video_id):
+    """Lista de {text, start, duration}; a API 1.x usa instância + fetch, a 0.x o método estático."""
+    api = YouTubeTranscriptApi()
+    if hasattr(api, "fetch"):
+        return api.fetch(video_id, languages=IDIOMAS_LEGENDA).to_raw_data()
+    return YouTubeTranscriptApi.get_transcript(video_id, languages=list(IDIOMAS_LEGENDA))
+
+def carregar_transcricao(video_id, buscar=_buscar_no_youtube):
+    """Transcrição do vídeo, do cache em disco quando existir. Erros da busca sobem para quem chamou."""
+    caminho = _caminho_cache(video_id)
+    if os.path.exists(caminho):
+        with open(caminho, "r", encoding="utf-8") as f:
+            return json.load(f)
+    trechos = [
+        {"text": t["text"], "start": float(t["start"]), "duration": float(t.get("duration", 0))}
+        for t in buscar(video_id)
+    ]
+    os.makedirs(TRANSCRICOES_DIR, exist_ok=True)
+    # Arquivo temporário + rename: uma interrupção não deixa JSON pela metade no cache
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(trechos, f, ensure_ascii=False)
+    os.replace(temporario, caminho)
+    return trechos
+
+# ==========================================================
+# 3. SEGMENTOS COM MARCAÇÃO DE TEMPO
+# ==========================================================
+def segmentar(trechos, duracao_s=DURACAO_SEGMENTO_S, max_caracteres=MAX_CARACTERES_SEGMENTO):
+    """Agrupa as linhas da legenda em [{inicio_s, fim_s, texto}] por janela de tempo."""
+    segmentos, atual = [], None
+    for trecho in trechos:
+        texto = " ".join(trecho["text"].split())
+        if not texto:
+            continue
+        inicio = trecho["start"]
+        fim = inicio + trecho.get("duration", 0)
+        if atual and (inicio - atual["inicio_s"] >= duracao_s or len(atual["texto"]) + len(texto) > max_caracteres):
+            segmentos.append(atual)
+            atual = None
+        if atual is None:
+            atual = {"inicio_s": int(inicio), "fim_s": int(fim), "texto": texto}
+        else:
+            atual["texto"] += " " + texto
+            atual["fim_s"] = max(atual["fim_s"], int(fim))
+    if atual:
+        segmentos.append(atual)
+    return segmentos
+
+def estruturar_segmentos(segmentos, estruturar, trabalhadores=TRABALHADORES_TRANSCRICAO):
+    """
+    estruturar(segmento) -> texto organizado, chamado em paralelo (no máximo `trabalhadores` por vez).
+    Retorna os segmentos na ordem original com 'conteudo'; se a IA falhar num segmento,
+    ele fica com o texto bruto da legenda (marcado com 'falhou') em vez de sumir da base.
+    """
+    def tarefa(segmento):
+        inicio = time.perf_counter()
+        try:
+            conteudo, falhou = (estruturar(segmento) or "").strip(), False
+        except Exception as e:
+            print(f"⚠️ Falha ao estruturar o segmento {formatar_tempo(segmento['inicio_s'])}: {e}")
+            conteudo, falhou = "", True
+        return {**segmento, "conteudo": conteudo or segmento["texto"], "falhou": falhou or not conteudo,
+                "segundos": round(time.perf_counter() - inicio, 2)}
+
+    if not segmentos:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(trabalhadores, len(segmentos))),
+                            thread_name_prefix="transcricao") as pool:
+        return list(pool.map(tarefa, segmentos))
@@ -1,6 +1,8 @@
 import streamlit as st
 import os
-import plotly.graph_objects as go
+import math
+from functools import lru_cache
+from utils.perfilador import span
 
 def aplicar_estilo_fcj():
     """Lê o arquivo CSS e aplica ao markdown do Streamlit"""
@@ -13,37 +15,46 @@ def aplicar_estilo_fcj():
     
     for caminho in caminhos_possiveis:
         if os.path.exists(caminho):
-            with open(caminho, "r", encoding="utf-8") as f:
+            with span("ler style.css", "io"), open(caminho, "r", encoding="utf-8") as f:
                 st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
             return True
     return False
 
-def criar_grafico_circular(porcentagem):
+def _normalizar_porcentagem(porcentagem):
+    """Converte o valor vindo da IA/banco para um inteiro entre 0 e 100."""
+    try:
+        valor = int(round(float(porcentagem or 0)))
+    except (TypeError, ValueError):
+        valor = 0
+    return max(0, min(100, valor))
+
+@lru_cache(maxsize=128)
+def _anel_svg(porcentagem):
+    """Monta o anel de progresso em SVG. Só existem 101 variações, então o cache cobre todas."""
     cor_azul_fcj = "#00ADEF"
     cor_fundo_grafico = "#113140"
-    
-    fig = go.Figure(go.Pie(
-        values=[porcentagem, 100 - porcentagem],
-        marker_colors=[cor_azul_fcj, cor_fundo_grafico],
-        textinfo='none',
-        hoverinfo='none',
-        sort=False,
-        hole=0.75
-    ))
-    
-    fig.update_layout(
-            showlegend=False,
-            margin=dict(t=0, b=0, l=0, r=0), 
-            height=200,
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)',
-            # Adiciona o texto centralizado
-            annotations=[dict(
-                text=f'{porcentagem}%', 
-                x=0.5, y=0.5, 
-                font_size=24, 
-                font_color=cor_azul_fcj,
-                showarrow=False
-            )]
-    )
-    return fig
\ No newline at end of file
+    raio = 80
+    circunferencia = 2 * math.pi * raio
+    preenchido = circunferencia * porcentagem / 100
+
+    return f"""
+        <div style="display: flex; justify-content: center; align-items: center; height: 200px;">
+            <svg viewBox="0 0 200 200" width="200" height="200" role="img" aria-label="{porcentagem}%">
+                <circle cx="100" cy="100" r="{raio}" fill="none" stroke="{cor_fundo_grafico}" stroke-width="20"/>
+                <circle cx="100" cy="100" r="{raio}" fill="none" stroke="{cor_azul_fcj}" stroke-width="20"
+                        stroke-dasharray="{preenchido:.2f} {circunferencia:.2f}"
+                        transform="rotate(-90 100 100)"/>
+                <text x="100" y="100" text-anchor="middle" dominant-baseline="central"
+                      font-size="24" fill="{cor_azul_fcj}">{porcentagem}%</text>
+            </svg>
+        </div>
+    """
+
+def criar_grafico_circular(porcentagem):
+    """Retorna o HTML do anel de progresso (substitui o antigo go.Pie do Plotly)."""
+    return _anel_svg(_normalizar_porcentagem(porcentagem))
+
+def exibir_grafico_circular(porcentagem):
+    """Renderiza o anel de progresso sem enviar um payload Plotly por linha."""
+    with span("anel de progresso", "grafico"):
+        st.markdown(criar_grafico_circular(porcentagem), unsafe_allow_html=True)
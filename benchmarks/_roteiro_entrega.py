@@ -0,0 +1,30 @@
+"""
+Roteiro da entrega de planilha, executado pelo AppTest em jornada_aluno.py.
+
+Fica num arquivo próprio: depois que o app multipágina rodou no mesmo processo,
+um script criado com AppTest.from_function ganha um nome temporário sem .py e
+o Streamlit recusa o título da página.
+O AppTest não simula st.file_uploader, então o arquivo é entregue direto às funções da página.
+"""
+import io
+import streamlit as st
+from utils.instrumentacao import iniciar_render
+from utils.ia_chat import analisar_documento_ia
+from utils.db import salvar_entrega_e_feedback, salvar_conclusao_etapa
+
+class ArquivoEnviado(io.BytesIO):
+    def __init__(self, dados, name, type):
+        super().__init__(dados)
+        self.name = name
+        self.type = type
+
+iniciar_render("entrega")
+etapa = st.session_state["bench_etapa"]
+arquivo = ArquivoEnviado(
+    st.session_state["bench_planilha"], "entrega_bench.xlsx",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+)
+resultado = analisar_documento_ia(arquivo, etapa)
+arquivo.seek(0)
+if salvar_entrega_e_feedback(st.session_state["usuario_id"], etapa, arquivo, resultado):
+    salvar_conclusao_etapa(st.session_state["usuario_id"], etapa)
@@ -0,0 +1,97 @@
+"""
+Benchmark da importação de usuários em lote (utils/importacao_usuarios.py).
+
+Compara, em usuários/s, o cadastro um a um (cadastrar_usuario_db: SELECT +
+bcrypt + INSERT por conexão) com a importação em lote com 1 processo e com o
+pool de processos completo (hash em paralelo + executemany numa transação).
+
+Uso (a partir da raiz do projeto, mesmo banco local de jornada_aluno.py):
+    FCJ_DB_BACKEND=sqlite python benchmarks/importacao_usuarios.py --usuarios 200
+    python benchmarks/importacao_usuarios.py --usuarios 500 --custo 12 --amostra-individual 20
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from jornada_aluno import RAIZ_PROJETO, APP_DIR, config_mysql, segredos, abrir_banco_bench
+
+PREFIXO_USUARIO = "bench_import_"
+
+def config_importacao():
+    cfg = config_mysql()
+    cfg["database"] = cfg["database"] + "_import"
+    return cfg
+
+def preparar_ambiente():
+    os.chdir(RAIZ_PROJETO)
+    if APP_DIR not in sys.path:
+        sys.path.insert(0, APP_DIR)
+    import streamlit as st
+    from streamlit.runtime.secrets import Secrets
+    st.secrets = Secrets()
+    st.secrets._secrets = segredos(config_importacao())
+
+def limpar_usuarios():
+    conn = abrir_banco_bench(config_importacao())
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM usuarios WHERE username LIKE %s", (PREFIXO_USUARIO + "%",))
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+def planilha(qtd, rodada):
+    import pandas as pd
+    return pd.DataFrame({
+        "username": [f"{PREFIXO_USUARIO}{rodada}_{i}" for i in range(qtd)],
+        "senha": [f"senha-inicial-{i:04d}" for i in range(qtd)],
+        "role": ["aluno"] * qtd,
+    }).astype(str)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da importação de usuários em lote.")
+    parser.add_argument("--usuarios", type=int, default=200, help="Linhas da planilha")
+    parser.add_argument("--custo", type=int, help="Custo do bcrypt (padrão: FCJ_BCRYPT_CUSTO)")
+    parser.add_argument("--amostra-individual", type=int, default=20, help="Usuários no cenário um a um")
+    args = parser.parse_args()
+
+    if args.custo:
+        os.environ["FCJ_BCRYPT_CUSTO"] = str(args.custo) # Lido no import de utils.autenticacao
+    preparar_ambiente()
+    from utils.autenticacao import CUSTO_BCRYPT
+    from utils.db import cadastrar_usuario_db
+    from utils.importacao_usuarios import importar_usuarios, PROCESSOS_HASH
+    custo = CUSTO_BCRYPT
+
+    limpar_usuarios()
+    resultados = []
+
+    # --- Cadastro um a um (caminho atual do formulário) ---
+    df = planilha(args.amostra_individual, "individual")
+    inicio = time.perf_counter()
+    for username, senha in zip(df["username"], df["senha"]):
+        cadastrar_usuario_db(username, senha, "aluno")
+    duracao = time.perf_counter() - inicio
+    resultados.append(("um a um", args.amostra_individual, duracao, {}))
+
+    # --- Importação em lote: 1 processo e pool completo ---
+    for processos in sorted({1, PROCESSOS_HASH}):
+        df = planilha(args.usuarios, f"p{processos}")
+        relatorio = importar_usuarios(df, custo=custo, processos=processos)
+        if relatorio["erro"]:
+            print(relatorio["erro"])
+            return 1
+        resultados.append((f"lote ({processos} proc.)", relatorio["importados"], relatorio["tempos_s"]["total"],
+                           relatorio["tempos_s"]))
+
+    print(f"\nbcrypt custo {custo} | {os.cpu_count()} CPUs")
+    print(f"{'cenário':<20}{'usuários':>10}{'total':>10}{'usuários/s':>12}{'hash':>9}{'gravação':>10}")
+    for nome, qtd, duracao, tempos in resultados:
+        print(f"{nome:<20}{qtd:>10}{duracao:>9.2f}s{qtd / duracao:>12.1f}"
+              f"{tempos.get('hash', 0):>8.2f}s{tempos.get('insercao', 0):>9.2f}s")
+    limpar_usuarios()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,389 @@
+"""
+Benchmark de carga sintética da jornada do aluno.
+
+Simula N alunos simultâneos (um processo por aluno) percorrendo o app com o
+AppTest do Streamlit: tela de login -> login (login.authenticate) -> Home ->
+páginas Q1..Q4 -> entrega de planilha (análise + gravação) -> chat de mentoria.
+O banco é um MySQL/TiDB local e os provedores de IA são falsos (llm_falso.py).
+
+Uso (a partir da raiz do projeto):
+    FCJ_DB_BACKEND=sqlite python benchmarks/jornada_aluno.py --alunos 10   # sem servidor de banco
+    docker run -d -p 3306:3306 -e MYSQL_ROOT_PASSWORD=bench mysql:8
+    # ou TiDB, como em produção: docker run -d -p 4000:4000 pingcap/tidb + FCJ_BENCH_MYSQL_PORT=4000
+    FCJ_BENCH_MYSQL_PASSWORD=bench python benchmarks/jornada_aluno.py --alunos 10 --rodadas 3
+    python benchmarks/jornada_aluno.py --alunos 10 --salvar-baseline
+    python benchmarks/jornada_aluno.py --alunos 10 --baseline benchmarks/baselines/jornada_aluno.json
+
+Relata vazão, p50/p95/p99 do tempo de render e consultas ao banco por cenário.
+Com --baseline, sai com código 1 se algum cenário regrediu além da tolerância.
+"""
+import os
+import sys
+import io
+import json
+import math
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(RAIZ_PROJETO, "app")
+HOME = os.path.join(APP_DIR, "Home.py")
+ROTEIRO_ENTREGA = os.path.join(RAIZ_PROJETO, "benchmarks", "_roteiro_entrega.py")
+RESULTADOS_DIR = os.path.join(RAIZ_PROJETO, "logs", "benchmarks")
+BASELINE_PADRAO = os.path.join(RAIZ_PROJETO, "benchmarks", "baselines", "jornada_aluno.json")
+sys.path.insert(0, APP_DIR)
+
+SENHA_BENCH = "bench@123"
+PREFIXO_USUARIO = "bench_aluno_"
+PREFIXO_TEMPLATE = "Bench"
+TRIMESTRES = ["Q1", "Q2", "Q3", "Q4"]
+ETAPAS_POR_TRIMESTRE = 3
+ARQUIVO_ENTREGA = "entrega_bench.xlsx"  # nome enviado por _roteiro_entrega.py
+
+def config_mysql():
+    """Banco local (stand-in do TiDB) configurado por variáveis de ambiente."""
+    return {
+        "host": os.environ.get("FCJ_BENCH_MYSQL_HOST", "127.0.0.1"),
+        "port": int(os.environ.get("FCJ_BENCH_MYSQL_PORT", 3306)),
+        "user": os.environ.get("FCJ_BENCH_MYSQL_USER", "root"),
+        "password": os.environ.get("FCJ_BENCH_MYSQL_PASSWORD", ""),
+        "database": os.environ.get("FCJ_BENCH_MYSQL_DATABASE", "fcj_bench"),
+    }
+
+def usa_sqlite():
+    """FCJ_DB_BACKEND=sqlite roda tudo num arquivo SQLite local (logs/benchmarks/<banco>.sqlite3)."""
+    return os.environ.get("FCJ_DB_BACKEND", "").lower() == "sqlite"
+
+def caminho_sqlite_bench(banco):
+    return os.path.join(RESULTADOS_DIR, f"{banco}.sqlite3")
+
+def segredos(cfg=None):
+    cfg = cfg or config_mysql()
+    return {
+        "mysql": cfg,
+        "db": {"backend": "sqlite" if usa_sqlite() else "mysql", "sqlite_path": caminho_sqlite_bench(cfg["database"])},
+        "GEMINI_API_KEY": "chave-falsa",
+        "META_AI_API_KEY": "chave-falsa",
+        "MASTER_PASSWORD": "master-bench",
+    }
+
+# ==========================================================
+# 1. PREPARAÇÃO DO BANCO LOCAL
+# ==========================================================
+def _planilha_exemplo():
+    import pandas as pd
+    buffer = io.BytesIO()
+    pd.DataFrame({
+        "Pergunta": [f"Pergunta {i}" for i in range(1, 31)],
+        "Resposta": [f"Resposta detalhada da startup para o item {i}." for i in range(1, 31)],
+    }).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+def abrir_banco_bench(cfg):
+    """Conecta no MySQL local (ou no SQLite do benchmark), cria o banco se preciso e aplica o esquema."""
+    if usa_sqlite():
+        from utils.banco_sqlite import conectar_sqlite, criar_esquema_sqlite
+        conn = conectar_sqlite(caminho_sqlite_bench(cfg["database"]))
+        criar_esquema_sqlite(conn)
+        return conn
+
+    import mysql.connector
+
+    cfg = dict(cfg)
+    banco = cfg.pop("database")
+    conn = mysql.connector.connect(**cfg)
+    cursor = conn.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{banco}`")
+    cursor.execute(f"USE `{banco}`")
+    with open(os.path.join(RAIZ_PROJETO, "benchmarks", "schema.sql"), encoding="utf-8") as f:
+        esquema = "".join(linha for linha in f if not linha.lstrip().startswith("--"))
+    for comando in esquema.split(";"):
+        if comando.strip():
+            cursor.execute(comando)
+    cursor.close()
+    return conn
+
+def preparar_banco(qtd_alunos):
+    """Cria o esquema, remove dados de rodadas anteriores e semeia alunos, templates e conhecimento."""
+    import bcrypt
+
+    conn = abrir_banco_bench(config_mysql())
+    cursor = conn.cursor()
+
+    # --- Limpeza da rodada anterior ---
+    cursor.execute("SELECT id FROM usuarios WHERE username LIKE %s", (PREFIXO_USUARIO + "%",))
+    ids_antigos = [r[0] for r in cursor.fetchall()]
+    if ids_antigos:
+        marcadores = ", ".join(["%s"] * len(ids_antigos))
+        for tabela in ("progresso_etapas", "avaliacoes_ia", "logs_erros_ia"):
+            cursor.execute(f"DELETE FROM {tabela} WHERE usuario_id IN ({marcadores})", ids_antigos)
+        cursor.execute(f"DELETE FROM usuarios WHERE id IN ({marcadores})", ids_antigos)
+        # Só as entregas do benchmark: os ids do banco de bench coincidem com os de alunos reais
+        pasta_entregas = os.path.join(RAIZ_PROJETO, "uploads", "entregas_alunos")
+        prefixos = tuple(f"user_{i}_" for i in ids_antigos)
+        for nome in os.listdir(pasta_entregas) if os.path.isdir(pasta_entregas) else []:
+            if nome.startswith(prefixos) and nome.endswith(ARQUIVO_ENTREGA):
+                os.remove(os.path.join(pasta_entregas, nome))
+    cursor.execute("DELETE FROM arquivos_templates WHERE nome_formulario LIKE %s", (PREFIXO_TEMPLATE + " %",))
+    cursor.execute("DELETE FROM ia_conhecimento WHERE nome LIKE %s", (PREFIXO_TEMPLATE + " %",))
+
+    # --- Alunos (mesma senha: um único hash) ---
+    senha_hash = bcrypt.hashpw(SENHA_BENCH.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    cursor.executemany(
+        "INSERT INTO usuarios (username, senha_hash, role, ativo) VALUES (%s, %s, 'aluno', TRUE)",
+        [(f"{PREFIXO_USUARIO}{i}", senha_hash) for i in range(qtd_alunos)]
+    )
+
+    # --- Templates (arquivo físico em assets_global/templates) ---
+    pasta_templates = os.path.join(RAIZ_PROJETO, "assets_global", "templates")
+    os.makedirs(pasta_templates, exist_ok=True)
+    planilha = _planilha_exemplo()
+    templates = []
+    for trimestre in TRIMESTRES:
+        for n in range(1, ETAPAS_POR_TRIMESTRE + 1):
+            nome_arquivo = f"bench_{trimestre.lower()}_{n}.xlsx"
+            with open(os.path.join(pasta_templates, nome_arquivo), "wb") as f:
+                f.write(planilha)
+            templates.append((f"{PREFIXO_TEMPLATE} {trimestre} Etapa {n}", trimestre, nome_arquivo,
+                              f"assets_global/templates/{nome_arquivo}", "xlsx"))
+    cursor.executemany(
+        """INSERT INTO arquivos_templates
+           (nome_formulario, template, nome_arquivo_original, caminho_arquivo, tipo_arquivo, status, data_upload)
+           VALUES (%s, %s, %s, %s, %s, 'ativo', NOW())""",
+        templates
+    )
+
+    # --- Base de conhecimento ---
+    cursor.executemany(
+        """INSERT INTO ia_conhecimento (nome, tipo_conteudo, caminho_ou_url, conteudo, descricao, status)
+           VALUES (%s, 'PDF', %s, %s, 'benchmark', 'ativo')""",
+        [(f"{PREFIXO_TEMPLATE} Material {i}", f"knowledge_base/bench_{i}.pdf",
+          "Como validar o MVP com clientes reais e medir tração. " * 200) for i in range(20)]
+    )
+    conn.commit()
+    cursor.close()
+    conn.close()
+    return planilha
+
+# ==========================================================
+# 2. JORNADA DE UM ALUNO (PROCESSO SEPARADO)
+# ==========================================================
+def _inicializar_processo(latencias):
+    """Roda em cada processo antes de qualquer import do app."""
+    os.chdir(RAIZ_PROJETO)
+    if APP_DIR not in sys.path:
+        sys.path.insert(0, APP_DIR)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import llm_falso
+    llm_falso.configurar(**latencias)
+    llm_falso.instalar()
+
+    # Segredos do processo inteiro: também valem para as threads de gravação em lote
+    import streamlit as st
+    from streamlit.runtime.secrets import Secrets
+    st.secrets = Secrets()
+    st.secrets._secrets = segredos()
+
+def _medir(amostras, cenario, at, acao):
+    inicio = time.perf_counter()
+    erro = None
+    try:
+        acao()
+        if at.exception:
+            erro = at.exception[0].value
+    except Exception as e:
+        erro = str(e)
+    ms = (time.perf_counter() - inicio) * 1000
+    render = at.session_state["_render_db"] if "_render_db" in at.session_state else {}
+    amostras.append({
+        "cenario": cenario,
+        "ms": round(ms, 1),
+        "consultas": render.get("consultas", 0),
+        "conexoes": render.get("conexoes", 0),
+        "ms_banco": round(render.get("ms_banco", 0.0), 1),
+        "erro": erro,
+    })
+
+def jornada_aluno(indice, rodadas, planilha, timeout):
+    """Percorre a jornada `rodadas` vezes; devolve as amostras de cada passo."""
+    from streamlit.testing.v1 import AppTest
+
+    usuario = f"{PREFIXO_USUARIO}{indice}"
+    amostras = []
+    for rodada in range(rodadas):
+        medidas = []
+        at = AppTest.from_file(HOME, default_timeout=timeout)
+        at.secrets.update(segredos())
+
+        _medir(medidas, "tela_login", at, at.run)
+        if not at.text_input:
+            amostras.extend(dict(m, rodada=rodada) for m in medidas)
+            continue
+
+        def entrar():
+            at.text_input[0].input(usuario)
+            at.text_input[1].input(SENHA_BENCH)
+            next(b for b in at.button if b.label == "Entrar").click()
+            at.run()
+        _medir(medidas, "login", at, entrar)
+        _medir(medidas, "home", at, at.run)
+
+        for trimestre in TRIMESTRES:
+            pagina = f"pages/Trimestre {trimestre}.py"
+            _medir(medidas, f"pagina_{trimestre.lower()}", at, lambda p=pagina: at.switch_page(p).run())
+
+        # Entrega: em um AppTest próprio, reaproveitando a sessão do aluno
+        entrega = AppTest.from_file(ROTEIRO_ENTREGA, default_timeout=timeout)
+        entrega.secrets.update(segredos())
+        entrega.session_state["usuario_id"] = at.session_state["usuario_id"]
+        entrega.session_state["user"] = usuario
+        entrega.session_state["current_page"] = "q1_page"
+        entrega.session_state["bench_etapa"] = f"{PREFIXO_TEMPLATE} Q1 Etapa {rodada % ETAPAS_POR_TRIMESTRE + 1}"
+        entrega.session_state["bench_planilha"] = planilha
+        _medir(medidas, "entrega", entrega, entrega.run)
+
+        def conversar():
+            at.switch_page("Home.py").run()
+            at.chat_input[0].set_value("Como valido meu MVP?").run()
+        _medir(medidas, "chat", at, conversar)
+
+        amostras.extend(dict(m, rodada=rodada) for m in medidas)
+
+    # Grava o que ainda estiver na fila de logs/telemetria antes do processo sair
+    from utils.gravacao_lote import gravadores
+    for gravador in gravadores:
+        gravador.encerrar()
+    return amostras
+
+# ==========================================================
+# 3. RELATÓRIO E COMPARAÇÃO COM O BASELINE
+# ==========================================================
+def percentil(valores, p):
+    """Percentil por posto mais próximo (nearest-rank)."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+def resumir(amostras, duracao_s, qtd_alunos, jornadas, renders):
+    """Percentis por cenário (sem o aquecimento); vazão sobre o tempo total de parede."""
+    cenarios = {}
+    for cenario in dict.fromkeys(a["cenario"] for a in amostras):
+        grupo = [a for a in amostras if a["cenario"] == cenario]
+        tempos = [a["ms"] for a in grupo]
+        cenarios[cenario] = {
+            "n": len(grupo),
+            "erros": sum(1 for a in grupo if a["erro"]),
+            "p50_ms": percentil(tempos, 50),
+            "p95_ms": percentil(tempos, 95),
+            "p99_ms": percentil(tempos, 99),
+            "media_consultas": round(sum(a["consultas"] for a in grupo) / len(grupo), 1),
+            "media_conexoes": round(sum(a["conexoes"] for a in grupo) / len(grupo), 1),
+            "media_ms_banco": round(sum(a["ms_banco"] for a in grupo) / len(grupo), 1),
+        }
+    return {
+        "alunos": qtd_alunos,
+        "duracao_s": round(duracao_s, 2),
+        "jornadas_por_s": round(jornadas / duracao_s, 3) if duracao_s else 0.0,
+        "renders_por_s": round(renders / duracao_s, 2) if duracao_s else 0.0,
+        "cenarios": cenarios,
+    }
+
+def comparar_baseline(resumo, baseline, tolerancia):
+    """Lista de regressões: p95 acima da tolerância ou mais consultas por render."""
+    regressoes = []
+    for cenario, atual in resumo["cenarios"].items():
+        base = baseline["cenarios"].get(cenario)
+        if not base:
+            continue
+        if base["p95_ms"] and atual["p95_ms"] > base["p95_ms"] * (1 + tolerancia):
+            regressoes.append(f"{cenario}: p95 {base['p95_ms']:.0f} -> {atual['p95_ms']:.0f} ms")
+        if atual["media_consultas"] > base["media_consultas"] + 0.5:
+            regressoes.append(f"{cenario}: consultas {base['media_consultas']} -> {atual['media_consultas']}")
+        if atual["erros"] > base["erros"]:
+            regressoes.append(f"{cenario}: erros {base['erros']} -> {atual['erros']}")
+    return regressoes
+
+def imprimir(resumo, baseline=None):
+    print(f"\nAlunos: {resumo['alunos']} | Duração: {resumo['duracao_s']} s | "
+          f"Jornadas/s: {resumo['jornadas_por_s']} | Renders/s: {resumo['renders_por_s']}")
+    print(f"{'cenário':<12}{'n':>5}{'erros':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'consultas':>11}{'conexões':>10}{'Δp95':>9}")
+    for cenario, m in resumo["cenarios"].items():
+        delta = ""
+        base = (baseline or {}).get("cenarios", {}).get(cenario)
+        if base and base["p95_ms"]:
+            delta = f"{100 * (m['p95_ms'] / base['p95_ms'] - 1):+.0f}%"
+        print(f"{cenario:<12}{m['n']:>5}{m['erros']:>7}{m['p50_ms']:>9.0f}{m['p95_ms']:>9.0f}"
+              f"{m['p99_ms']:>9.0f}{m['media_consultas']:>11}{m['media_conexoes']:>10}{delta:>9}")
+
+# ==========================================================
+# 4. CLI
+# ==========================================================
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga sintética da jornada do aluno.")
+    parser.add_argument("--alunos", type=int, default=5, help="Alunos simultâneos (um processo cada)")
+    parser.add_argument("--rodadas", type=int, default=3, help="Jornadas por aluno")
+    parser.add_argument("--aquecimento", type=int, default=1, help="Rodadas iniciais descartadas (imports, caches frios)")
+    parser.add_argument("--timeout", type=float, default=60, help="Timeout de cada render no AppTest (s)")
+    parser.add_argument("--gemini-ms", type=int, default=800, help="Latência simulada do Gemini")
+    parser.add_argument("--ttft-ms", type=int, default=300, help="Time-to-first-token simulado da mentoria")
+    parser.add_argument("--token-ms", type=int, default=15, help="Intervalo simulado entre tokens do streaming")
+    parser.add_argument("--baseline", help="JSON de baseline para comparação")
+    parser.add_argument("--salvar-baseline", nargs="?", const=BASELINE_PADRAO, help="Grava o resultado como baseline")
+    parser.add_argument("--tolerancia", type=float, default=0.20, help="Aumento de p95 tolerado (fração)")
+    args = parser.parse_args()
+
+    destino = caminho_sqlite_bench(config_mysql()["database"]) if usa_sqlite() else f"{config_mysql()['host']}:{config_mysql()['port']}"
+    print(f"🌱 Preparando banco local ({destino})...")
+    planilha = preparar_banco(args.alunos)
+
+    latencias = {"gemini_ms": args.gemini_ms, "ttft_ms": args.ttft_ms, "token_ms": args.token_ms}
+    contexto = multiprocessing.get_context("spawn")
+    print(f"🚀 {args.alunos} alunos x {args.rodadas} rodadas...")
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.alunos, mp_context=contexto,
+                             initializer=_inicializar_processo, initargs=(latencias,)) as executor:
+        futuros = [executor.submit(jornada_aluno, i, args.rodadas, planilha, args.timeout) for i in range(args.alunos)]
+        amostras = [a for f in futuros for a in f.result()]
+    duracao = time.perf_counter() - inicio
+
+    medidas = [a for a in amostras if a["rodada"] >= min(args.aquecimento, args.rodadas - 1)]
+    resumo = resumir(medidas, duracao, args.alunos, args.alunos * args.rodadas, len(amostras))
+    resumo["gerado_em"] = datetime.now().isoformat(timespec="seconds")
+    resumo["parametros"] = vars(args)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    imprimir(resumo, baseline)
+
+    for erro in dict.fromkeys(a["erro"] for a in medidas if a["erro"]):
+        print(f"⚠️ {erro}")
+
+    os.makedirs(RESULTADOS_DIR, exist_ok=True)
+    caminho = os.path.join(RESULTADOS_DIR, f"jornada_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(dict(resumo, amostras=amostras), f, ensure_ascii=False, indent=2, default=str)
+    print(f"\n📄 Resultado completo: {caminho}")
+
+    if args.salvar_baseline:
+        os.makedirs(os.path.dirname(args.salvar_baseline), exist_ok=True)
+        with open(args.salvar_baseline, "w", encoding="utf-8") as f:
+            json.dump(resumo, f, ensure_ascii=False, indent=2, default=str)
+        print(f"📌 Baseline gravado em {args.salvar_baseline}")
+
+    if baseline:
+        regressoes = comparar_baseline(resumo, baseline, args.tolerancia)
+        if regressoes:
+            print("\n❌ Regressões em relação ao baseline:")
+            for r in regressoes:
+                print(f"   - {r}")
+            sys.exit(1)
+        print("\n✅ Sem regressões em relação ao baseline.")
+
+if __name__ == "__main__":
+    main()
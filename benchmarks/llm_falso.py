@@ -0,0 +1,97 @@
+"""
+Provedores de IA falsos para os benchmarks: substituem o Gemini (google.generativeai)
+e o cliente OpenAI/Groq por respostas fixas com latência configurável.
+Devem ser instalados ANTES de qualquer import de utils.ia_chat / utils.agente_ia_mysql.
+"""
+import json
+import time
+from types import SimpleNamespace
+
+# Latências simuladas (ms); ajustadas pelo harness via configurar()
+LATENCIA = {"gemini_ms": 800, "ttft_ms": 300, "token_ms": 15}
+
+RESPOSTA_ANALISE = {
+    "porcentagem": 72,
+    "zona": "Parcial",
+    "cor": "#F5A623",
+    "feedback_ludico": "Seu foguete já saiu da plataforma, falta calibrar a rota!",
+    "perguntas_faltantes": ["Canais de aquisição", "Projeção de receita"],
+    "dicas": "Detalhe o funil de vendas com números dos últimos 3 meses.",
+}
+
+RESPOSTA_MENTORIA = "Ignição confirmada! Valide o problema com 10 clientes antes de acelerar a construção."
+
+def configurar(gemini_ms=None, ttft_ms=None, token_ms=None):
+    if gemini_ms is not None: LATENCIA["gemini_ms"] = gemini_ms
+    if ttft_ms is not None: LATENCIA["ttft_ms"] = ttft_ms
+    if token_ms is not None: LATENCIA["token_ms"] = token_ms
+
+# ==========================================================
+# GEMINI
+# ==========================================================
+class ModeloGeminiFalso:
+    def __init__(self, nome_modelo, *args, **kwargs):
+        self.nome_modelo = nome_modelo
+
+    def generate_content(self, conteudo, *args, **kwargs):
+        time.sleep(LATENCIA["gemini_ms"] / 1000)
+        tamanho_prompt = sum(len(str(c)) for c in conteudo) if isinstance(conteudo, list) else len(str(conteudo))
+        return SimpleNamespace(
+            text=json.dumps(RESPOSTA_ANALISE, ensure_ascii=False),
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=tamanho_prompt // 4,
+                candidates_token_count=120,
+                cached_content_token_count=0,
+            ),
+        )
+
+# ==========================================================
+# OPENAI / GROQ (STREAMING)
+# ==========================================================
+def _chunk(conteudo=None, uso=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=conteudo))]
+    return SimpleNamespace(choices=choices, usage=None, x_groq=SimpleNamespace(usage=uso) if uso else None)
+
+def _stream_mentoria(mensagens):
+    time.sleep(LATENCIA["ttft_ms"] / 1000)
+    palavras = RESPOSTA_MENTORIA.split(" ")
+    for palavra in palavras:
+        yield _chunk(palavra + " ")
+        time.sleep(LATENCIA["token_ms"] / 1000)
+    tamanho_prompt = sum(len(m["content"]) for m in mensagens)
+    yield _chunk(uso=SimpleNamespace(
+        prompt_tokens=tamanho_prompt // 4, completion_tokens=len(palavras), prompt_tokens_details=None
+    ))
+
+class ClienteOpenAIFalso:
+    def __init__(self, *args, **kwargs):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._criar))
+
+    def _criar(self, model, messages, stream=False, **kwargs):
+        if stream:
+            return _stream_mentoria(messages)
+        time.sleep((LATENCIA["ttft_ms"] + LATENCIA["token_ms"] * 20) / 1000)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=RESPOSTA_MENTORIA))],
+            usage=SimpleNamespace(prompt_tokens=0, completion_tokens=0, prompt_tokens_details=None),
+        )
+
+# ==========================================================
+# FILE API DO GEMINI (UPLOAD DE PDF)
+# ==========================================================
+def _upload_falso(path=None, *args, **kwargs):
+    return SimpleNamespace(name=f"files/{abs(hash(path))}", state=SimpleNamespace(name="ACTIVE"))
+
+def _get_file_falso(nome):
+    return SimpleNamespace(name=nome, state=SimpleNamespace(name="ACTIVE"))
+
+def instalar():
+    """Troca os SDKs reais pelos falsos neste processo."""
+    import google.generativeai as genai
+    import openai
+    genai.configure = lambda *args, **kwargs: None
+    genai.GenerativeModel = ModeloGeminiFalso
+    genai.upload_file = _upload_falso
+    genai.get_file = _get_file_falso
+    genai.delete_file = lambda *args, **kwargs: None
+    openai.OpenAI = ClienteOpenAIFalso
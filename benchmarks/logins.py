@@ -0,0 +1,150 @@
+"""
+Benchmark de logins por segundo (login.authenticate).
+
+Simula uma turma inteira entrando ao mesmo tempo: N threads (uma por sessão do
+Streamlit) chamam authenticate() em laço. O bcrypt roda no pool de
+utils/autenticacao.py; uma fração das tentativas usa senha errada para exercitar
+o limitador (tentativas bloqueadas não chegam ao bcrypt).
+
+Uso (a partir da raiz do projeto, mesmo banco local de jornada_aluno.py):
+    FCJ_DB_BACKEND=sqlite python benchmarks/logins.py --sessoes 40 --duracao 20
+    FCJ_AUTH_TRABALHADORES=8 python benchmarks/logins.py --custo 12
+    python benchmarks/logins.py --custo-antigo 10   # semeia hashes antigos: mede o rehash no login
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from jornada_aluno import RAIZ_PROJETO, APP_DIR, config_mysql, segredos, abrir_banco_bench, percentil
+
+SENHA = "bench@123"
+PREFIXO_USUARIO = "bench_login_"
+
+# ==========================================================
+# 1. AMBIENTE
+# ==========================================================
+def config_logins():
+    cfg = config_mysql()
+    cfg["database"] = cfg["database"] + "_login"
+    return cfg
+
+def preparar_ambiente():
+    os.chdir(RAIZ_PROJETO)
+    if APP_DIR not in sys.path:
+        sys.path.insert(0, APP_DIR)
+    import streamlit as st
+    from streamlit.runtime.secrets import Secrets
+    st.secrets = Secrets()
+    st.secrets._secrets = segredos(config_logins())
+
+def semear(qtd_usuarios, custo):
+    """Recria os usuários do benchmark; todos com a mesma senha (um único hash com o custo pedido)."""
+    from utils.autenticacao import gerar_hash
+    conn = abrir_banco_bench(config_logins())
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM usuarios WHERE username LIKE %s", (PREFIXO_USUARIO + "%",))
+    senha_hash = gerar_hash(SENHA, custo=custo)
+    cursor.executemany(
+        "INSERT INTO usuarios (username, senha_hash, role, ativo) VALUES (%s, %s, 'aluno', TRUE)",
+        [(f"{PREFIXO_USUARIO}{i}", senha_hash) for i in range(qtd_usuarios)]
+    )
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+# ==========================================================
+# 2. CARGA
+# ==========================================================
+def sessao(indice, qtd_usuarios, fracao_erradas, fim, amostras, contagem, trava):
+    from login import authenticate
+    from utils.autenticacao import ServidorOcupado, limitador_login
+
+    aleatorio = random.Random(indice)
+    ip = f"10.0.{indice // 250}.{indice % 250}"
+    while time.perf_counter() < fim:
+        username = f"{PREFIXO_USUARIO}{aleatorio.randrange(qtd_usuarios)}"
+        errada = aleatorio.random() < fracao_erradas
+        inicio = time.perf_counter()
+        if limitador_login.espera_restante(username, ip):
+            resultado = "bloqueado"
+        else:
+            try:
+                user = authenticate(username, "senha-errada" if errada else SENHA, ip)
+                resultado = "ok" if user else "recusado"
+            except ServidorOcupado:
+                resultado = "ocupado"
+        ms = (time.perf_counter() - inicio) * 1000
+        with trava:
+            contagem[resultado] += 1
+            amostras.setdefault(resultado, []).append(ms)
+
+def executar(qtd_sessoes, qtd_usuarios, duracao_s, fracao_erradas):
+    amostras, contagem, trava = {}, Counter(), threading.Lock()
+    fim = time.perf_counter() + duracao_s
+    threads = [
+        threading.Thread(target=sessao, args=(i, qtd_usuarios, fracao_erradas, fim, amostras, contagem, trava))
+        for i in range(qtd_sessoes)
+    ]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return amostras, contagem, time.perf_counter() - inicio
+
+def custos_gravados():
+    from utils.autenticacao import custo_do_hash
+    conn = abrir_banco_bench(config_logins())
+    cursor = conn.cursor()
+    cursor.execute("SELECT senha_hash FROM usuarios WHERE username LIKE %s", (PREFIXO_USUARIO + "%",))
+    custos = Counter(custo_do_hash(h) for (h,) in cursor.fetchall())
+    cursor.close()
+    conn.close()
+    return dict(custos)
+
+# ==========================================================
+# 3. CLI
+# ==========================================================
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de logins por segundo.")
+    parser.add_argument("--sessoes", type=int, default=40, help="Sessões logando ao mesmo tempo (threads)")
+    parser.add_argument("--usuarios", type=int, default=200, help="Usuários semeados")
+    parser.add_argument("--duracao", type=float, default=15, help="Duração da carga (s)")
+    parser.add_argument("--erradas", type=float, default=0.1, help="Fração de tentativas com senha errada")
+    parser.add_argument("--custo", type=int, help="Custo bcrypt do app (FCJ_BCRYPT_CUSTO)")
+    parser.add_argument("--custo-antigo", type=int, help="Custo dos hashes semeados (padrão: o do app)")
+    args = parser.parse_args()
+
+    if args.custo:
+        os.environ["FCJ_BCRYPT_CUSTO"] = str(args.custo)
+    preparar_ambiente()
+    from utils import autenticacao
+
+    custo_semeado = args.custo_antigo or autenticacao.CUSTO_BCRYPT
+    print(f"🌱 Semeando {args.usuarios} usuários (bcrypt custo {custo_semeado})...")
+    semear(args.usuarios, custo_semeado)
+
+    print(f"🚀 {args.sessoes} sessões por {args.duracao:.0f}s | pool de {autenticacao.TRABALHADORES_HASH} "
+          f"trabalhadores | custo do app {autenticacao.CUSTO_BCRYPT}")
+    amostras, contagem, duracao = executar(args.sessoes, args.usuarios, args.duracao, args.erradas)
+
+    total = sum(contagem.values())
+    print(f"\n{'resultado':<12}{'qtd':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for resultado in ("ok", "recusado", "bloqueado", "ocupado"):
+        tempos = amostras.get(resultado, [])
+        if tempos:
+            print(f"{resultado:<12}{len(tempos):>8}{percentil(tempos, 50):>8.1f}ms"
+                  f"{percentil(tempos, 95):>8.1f}ms{percentil(tempos, 99):>8.1f}ms")
+    print(f"\nLogins aceitos/s: {contagem['ok'] / duracao:.1f} | tentativas/s: {total / duracao:.1f}")
+    if args.custo_antigo:
+        # O rehash roda no pool depois da resposta: espera a fila esvaziar antes de contar
+        time.sleep(1)
+        print(f"Custos gravados após a carga (custo: usuários): {custos_gravados()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Micro-benchmarks das funções de acesso a dados e ingestão (estilo pytest-benchmark).
+
+Mede, com tabelas geradas de 10 / 1k / 100k linhas num MySQL local:
+    verificar_etapa_concluida, buscar_ultimo_feedback_ia, buscar_conhecimento_ia,
+    salvar_entrega_e_feedback, serialização da planilha (analisar_documento_ia)
+    e o caminho local de processar_conteudo_ia para PDFs (File API do Gemini falsa).
+
+Uso (a partir da raiz do projeto, mesmo MySQL local de jornada_aluno.py):
+    python benchmarks/micro.py
+    FCJ_DB_BACKEND=sqlite python benchmarks/micro.py   # SQLite local, sem servidor
+    python benchmarks/micro.py --tamanhos 10 1000 --filtro conhecimento
+
+Cada execução é acrescentada a benchmarks/historico/micro.jsonl (com o commit e o backend)
+e comparada com a execução anterior no mesmo backend. O histórico é versionado: a primeira
+linha é a linha de base (SQLite); versione as novas execuções junto com a mudança.
+"""
+import os
+import sys
+import io
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import subprocess
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from jornada_aluno import RAIZ_PROJETO, APP_DIR, config_mysql, segredos, abrir_banco_bench
+
+HISTORICO = os.path.join(RAIZ_PROJETO, "benchmarks", "historico", "micro.jsonl")
+DADOS_DIR = os.path.join(RAIZ_PROJETO, "logs", "benchmarks", "dados_micro")
+TAMANHOS_PADRAO = (10, 1_000, 100_000)
+LOTE_INSERT = 5_000
+ETAPA_ALVO = "Etapa 3"
+TERMO_BUSCA = "pitch"
+
+# ==========================================================
+# 1. AMBIENTE (BANCO DEDICADO + IA FALSA)
+# ==========================================================
+def config_micro():
+    cfg = config_mysql()
+    cfg["database"] = cfg["database"] + "_micro"
+    return cfg
+
+def preparar_ambiente():
+    os.chdir(RAIZ_PROJETO)
+    if APP_DIR not in sys.path:
+        sys.path.insert(0, APP_DIR)
+    import llm_falso
+    llm_falso.configurar(gemini_ms=0, ttft_ms=0, token_ms=0)
+    llm_falso.instalar()
+
+    import streamlit as st
+    from streamlit.runtime.secrets import Secrets
+    st.secrets = Secrets()
+    st.secrets._secrets = segredos(config_micro())
+
+def _inserir_em_lotes(cursor, sql, linhas):
+    for i in range(0, len(linhas), LOTE_INSERT):
+        cursor.executemany(sql, linhas[i:i + LOTE_INSERT])
+
+def semear(tamanho):
+    """Recria as tabelas do banco de micro-benchmark com `tamanho` linhas cada."""
+    conn = abrir_banco_bench(config_micro())
+    cursor = conn.cursor()
+    for tabela in ("usuarios", "progresso_etapas", "avaliacoes_ia", "ia_conhecimento", "arquivos_templates"):
+        cursor.execute(f"TRUNCATE TABLE {tabela}")
+
+    aleatorio = random.Random(tamanho)
+    qtd_usuarios = max(10, tamanho // 100)
+    _inserir_em_lotes(
+        cursor, "INSERT INTO usuarios (username, senha_hash, role, ativo) VALUES (%s, 'x', 'aluno', TRUE)",
+        [(f"micro_{i}",) for i in range(qtd_usuarios)]
+    )
+    cursor.executemany(
+        """INSERT INTO arquivos_templates (nome_formulario, template, nome_arquivo_original, caminho_arquivo, tipo_arquivo, status)
+           VALUES (%s, %s, 'x.xlsx', 'assets_global/templates/x.xlsx', 'xlsx', 'ativo')""",
+        [(f"Etapa {n}", f"Q{(n - 1) // 3 + 1}") for n in range(1, 13)]
+    )
+
+    inicio = datetime.now() - timedelta(days=365)
+    # O usuário 1 (alvo) nunca concluiu a ETAPA_ALVO: força a busca completa no índice
+    _inserir_em_lotes(
+        cursor, "INSERT IGNORE INTO progresso_etapas (usuario_id, nome_etapa) VALUES (%s, %s)",
+        [(aleatorio.randint(2, qtd_usuarios) if i % 2 else 1, f"Etapa {aleatorio.randint(4, 12)}") for i in range(tamanho)]
+    )
+    _inserir_em_lotes(
+        cursor,
+        """INSERT INTO avaliacoes_ia (usuario_id, etapa, caminho_arquivo_aluno, nome_arquivo_original, porcentagem,
+           zona, feedback_ludico, cor, perguntas_faltantes, dicas, data_avaliacao)
+           VALUES (%s, %s, 'uploads/entregas_alunos/x.xlsx', 'x.xlsx', %s, 'Parcial', 'Bom trabalho!', '#F5A623', %s, 'Detalhe o funil.', %s)""",
+        [(aleatorio.randint(1, qtd_usuarios), f"Etapa {aleatorio.randint(1, 12)}", aleatorio.randint(0, 100),
+          json.dumps(["Campo 1", "Campo 2"]), inicio + timedelta(minutes=i)) for i in range(tamanho)]
+    )
+    texto_base = "Conteúdo de apoio sobre validação de mercado, métricas e tração. " * 8
+    _inserir_em_lotes(
+        cursor,
+        "INSERT INTO ia_conhecimento (nome, tipo_conteudo, caminho_ou_url, conteudo, descricao, status) VALUES (%s, 'PDF', %s, %s, '', 'ativo')",
+        [(f"Material {i}", f"knowledge_base/m{i}.pdf",
+          texto_base + (f" Como montar o {TERMO_BUSCA}." if i % 100 == 0 else "")) for i in range(tamanho)]
+    )
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+    # Índices e tabelas derivadas do app (idx_avaliacoes_usuario_data, progresso_resumo...)
+    from utils.db import init_db
+    init_db()
+
+# ==========================================================
+# 2. ARQUIVOS GERADOS
+# ==========================================================
+class ArquivoEnviado(io.BytesIO):
+    """Imita o UploadedFile do Streamlit (name, type, getvalue, getbuffer)."""
+    def __init__(self, dados, name, type):
+        super().__init__(dados)
+        self.name = name
+        self.type = type
+
+def gerar_planilha(linhas):
+    import pandas as pd
+    buffer = io.BytesIO()
+    pd.DataFrame({
+        "Pergunta": [f"Pergunta {i}" for i in range(linhas)],
+        "Resposta": [f"Resposta da startup para o item {i}." for i in range(linhas)],
+        "Nota": [i % 10 for i in range(linhas)],
+    }).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+def gerar_pdf(linhas, caminho, linhas_por_pagina=50):
+    """PDF mínimo (Helvetica, texto simples) com `linhas` linhas de texto."""
+    paginas = [range(i, min(i + linhas_por_pagina, linhas)) for i in range(0, max(linhas, 1), linhas_por_pagina)]
+    objetos = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for pagina in paginas:
+        texto = "".join(f"({'Linha %d do material de apoio da aceleradora.' % n}) Tj T* " for n in pagina)
+        fluxo = f"BT /F1 10 Tf 14 TL 40 800 Td {texto}ET".encode("latin-1")
+        objetos.append(b"<< /Length %d >>\nstream\n" % len(fluxo) + fluxo + b"\nendstream")
+        objetos.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % len(objetos)
+        )
+        kids.append(f"{len(objetos)} 0 R")
+    objetos[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    saida = bytearray(b"%PDF-1.4\n")
+    posicoes = []
+    for i, corpo in enumerate(objetos, start=1):
+        posicoes.append(len(saida))
+        saida += b"%d 0 obj\n" % i + corpo + b"\nendobj\n"
+    inicio_xref = len(saida)
+    saida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    saida += b"".join(b"%010d 00000 n \n" % p for p in posicoes)
+    saida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, inicio_xref)
+    with open(caminho, "wb") as f:
+        f.write(saida)
+    return caminho
+
+# ==========================================================
+# 3. MEDIÇÃO
+# ==========================================================
+def medir(funcao, tempo_minimo_s=1.0, rodadas_min=3, rodadas_max=50):
+    """Executa `funcao` até somar `tempo_minimo_s` (entre rodadas_min e rodadas_max) e devolve as estatísticas em ms."""
+    funcao()  # aquecimento
+    tempos = []
+    inicio = time.perf_counter()
+    while len(tempos) < rodadas_min or (len(tempos) < rodadas_max and time.perf_counter() - inicio < tempo_minimo_s):
+        t0 = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - t0) * 1000)
+    return {
+        "rodadas": len(tempos),
+        "min_ms": round(min(tempos), 3),
+        "max_ms": round(max(tempos), 3),
+        "media_ms": round(statistics.fmean(tempos), 3),
+        "mediana_ms": round(statistics.median(tempos), 3),
+        "desvio_ms": round(statistics.stdev(tempos), 3) if len(tempos) > 1 else 0.0,
+        "ops_s": round(1000 / statistics.fmean(tempos), 2),
+    }
+
+def casos(tamanho):
+    """(nome, função) de cada benchmark para o tamanho de dados atual."""
+    from utils.db import (
+        verificar_etapa_concluida, listar_etapas_concluidas, buscar_ultimo_feedback_ia,
+        buscar_conhecimento_ia, salvar_entrega_e_feedback, UPLOAD_DIR
+    )
+    from utils.ia_chat import planilha_para_texto
+    from utils.pacotes_contexto import pacote_contexto_etapa
+    from utils.agente_ia_mysql import processar_conteudo_ia
+
+    os.makedirs(DADOS_DIR, exist_ok=True)
+    planilha = gerar_planilha(tamanho)
+    caminho_pdf = gerar_pdf(tamanho, os.path.join(DADOS_DIR, f"material_{tamanho}.pdf"))
+    with open(caminho_pdf, "rb") as f:
+        pdf = f.read()
+    feedback = {"porcentagem": 70, "zona": "Parcial", "cor": "#F5A623", "feedback_ludico": "Quase lá!",
+                "perguntas_faltantes": ["Campo 1"], "dicas": "Detalhe o funil."}
+
+    def salvar_entrega():
+        salvar_entrega_e_feedback(1, ETAPA_ALVO, ArquivoEnviado(b"x" * 20_000, "micro_entrega.xlsx", "application/octet-stream"), feedback)
+
+    def extrair_pdf():
+        # Só o caminho local: gravação em knowledge_base + chamadas à File API (falsa, latência zero)
+        processar_conteudo_ia(ArquivoEnviado(pdf, f"micro_{tamanho}.pdf", "application/pdf"))
+
+    yield "verificar_etapa_concluida", lambda: verificar_etapa_concluida(1, ETAPA_ALVO)
+    yield "listar_etapas_concluidas", lambda: listar_etapas_concluidas(1)
+    yield "buscar_ultimo_feedback_ia", lambda: buscar_ultimo_feedback_ia(1, ETAPA_ALVO)
+    yield "buscar_conhecimento_ia", lambda: buscar_conhecimento_ia(TERMO_BUSCA)
+    yield "buscar_conhecimento_ia[Q1]", lambda: buscar_conhecimento_ia(TERMO_BUSCA, trimestre="Q1")
+    yield "pacote_contexto_etapa", lambda: pacote_contexto_etapa(ETAPA_ALVO)
+    yield "salvar_entrega_e_feedback", salvar_entrega
+    yield "serializar_planilha", lambda: planilha_para_texto(ArquivoEnviado(planilha, "p.xlsx", "application/vnd.ms-excel"))
+    yield "extrair_pdf", extrair_pdf
+
+    # Limpa o que os benchmarks de escrita deixaram no disco
+    for pasta, prefixo in ((UPLOAD_DIR, "user_1_"), (os.path.join(RAIZ_PROJETO, "knowledge_base"), "micro_")):
+        for nome in os.listdir(pasta):
+            if nome.startswith(prefixo) and "micro" in nome:
+                os.remove(os.path.join(pasta, nome))
+
+# ==========================================================
+# 4. HISTÓRICO
+# ==========================================================
+def commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ_PROJETO,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def ultima_execucao(backend):
+    """Última execução no mesmo backend: SQLite e MySQL não são comparáveis entre si."""
+    if not os.path.exists(HISTORICO):
+        return None
+    with open(HISTORICO, encoding="utf-8") as f:
+        execucoes = [json.loads(l) for l in f if l.strip()]
+    return next((e for e in reversed(execucoes) if e.get("backend", "mysql") == backend), None)
+
+def gravar_historico(execucao):
+    os.makedirs(os.path.dirname(HISTORICO), exist_ok=True)
+    with open(HISTORICO, "a", encoding="utf-8") as f:
+        f.write(json.dumps(execucao, ensure_ascii=False) + "\n")
+
+# ==========================================================
+# 5. CLI
+# ==========================================================
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de acesso a dados e ingestão.")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=list(TAMANHOS_PADRAO), help="Linhas por tabela/arquivo")
+    parser.add_argument("--filtro", help="Roda só os benchmarks cujo nome contém este texto")
+    parser.add_argument("--tempo-minimo", type=float, default=1.0, help="Tempo mínimo de medição por caso (s)")
+    parser.add_argument("--sem-historico", action="store_true", help="Não grava em benchmarks/historico/micro.jsonl")
+    args = parser.parse_args()
+
+    preparar_ambiente()
+    from utils.db import backend_configurado
+    backend = backend_configurado()
+    anterior = ultima_execucao(backend)
+    referencia = {(r["funcao"], r["tamanho"]): r for r in (anterior or {}).get("resultados", [])}
+
+    resultados = []
+    print(f"{'função':<28}{'linhas':>8}{'rodadas':>9}{'mediana':>11}{'min':>10}{'desvio':>10}{'Δ mediana':>11}")
+    for tamanho in args.tamanhos:
+        print(f"🌱 Gerando {tamanho} linhas...")
+        semear(tamanho)
+        for nome, funcao in casos(tamanho):
+            if args.filtro and args.filtro not in nome:
+                continue
+            estatisticas = medir(funcao, tempo_minimo_s=args.tempo_minimo)
+            resultado = {"funcao": nome, "tamanho": tamanho, **estatisticas}
+            resultados.append(resultado)
+
+            delta = ""
+            base = referencia.get((nome, tamanho))
+            if base and base["mediana_ms"]:
+                delta = f"{100 * (resultado['mediana_ms'] / base['mediana_ms'] - 1):+.0f}%"
+            print(f"{nome:<28}{tamanho:>8}{resultado['rodadas']:>9}{resultado['mediana_ms']:>9.2f}ms"
+                  f"{resultado['min_ms']:>8.2f}ms{resultado['desvio_ms']:>8.2f}ms{delta:>11}")
+
+    if anterior:
+        print(f"\nComparado com {anterior['data']} (commit {anterior.get('commit') or '?'}).")
+    if not args.sem_historico:
+        gravar_historico({
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "commit": commit_atual(),
+            "backend": backend,
+            "python": platform.python_version(),
+            "maquina": platform.node(),
+            "resultados": resultados,
+        })
+        print(f"📄 Histórico: {HISTORICO}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+-- Esquema base para rodar os benchmarks contra um MySQL/TiDB local.
+-- As tabelas derivadas (progresso_resumo, telemetria_ia, índices) são criadas por init_db().
+
+CREATE TABLE IF NOT EXISTS usuarios (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    username VARCHAR(100) NOT NULL UNIQUE,
+    senha_hash VARCHAR(255) NOT NULL,
+    role VARCHAR(20) NOT NULL DEFAULT 'aluno',
+    ativo BOOLEAN NOT NULL DEFAULT TRUE
+);
+
+CREATE TABLE IF NOT EXISTS progresso_etapas (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    usuario_id INT NOT NULL,
+    nome_etapa VARCHAR(255) NOT NULL,
+    data_conclusao DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uk_progresso_usuario_etapa (usuario_id, nome_etapa)
+);
+
+CREATE TABLE IF NOT EXISTS avaliacoes_ia (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    usuario_id INT NOT NULL,
+    etapa VARCHAR(255) NOT NULL,
+    caminho_arquivo_aluno VARCHAR(500),
+    nome_arquivo_original VARCHAR(255),
+    porcentagem INT,
+    zona VARCHAR(50),
+    feedback_ludico TEXT,
+    cor VARCHAR(20),
+    perguntas_faltantes TEXT,
+    dicas TEXT,
+    data_avaliacao DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS arquivos_templates (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    nome_formulario VARCHAR(255) NOT NULL,
+    template VARCHAR(10) NOT NULL,
+    nome_arquivo_original VARCHAR(255),
+    caminho_arquivo VARCHAR(500),
+    tipo_arquivo VARCHAR(20),
+    status VARCHAR(20) DEFAULT 'ativo',
+    data_upload DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS logs_erros_ia (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    usuario_id INT NULL,
+    etapa VARCHAR(255),
+    tipo_erro VARCHAR(100),
+    mensagem_erro TEXT,
+    data_erro DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS ia_conhecimento (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    nome VARCHAR(255),
+    tipo_conteudo VARCHAR(50),
+    caminho_ou_url VARCHAR(500),
+    conteudo LONGTEXT,
+    descricao TEXT,
+    status VARCHAR(20) DEFAULT 'ativo',
+    data_subida DATETIME DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,111 @@
+"""
+Benchmark do pipeline de transcrições do YouTube (utils/transcricoes.py), offline.
+
+Usa uma transcrição gravada (o mesmo JSON do cache em disco, <video_id>.json) e o
+Gemini falso de llm_falso.py com latência configurável. Compara a estruturação
+dos segmentos em sequência (1 trabalhador) com o paralelismo limitado do app.
+Sem gravação para o vídeo pedido, gera uma transcrição sintética e a grava.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/transcricoes.py --minutos 90 --latencia-ms 1500
+    python benchmarks/transcricoes.py --gravacoes cache/transcricoes --video-id dQw4w9WgXcQ
+    FCJ_DB_BACKEND=sqlite python benchmarks/transcricoes.py --indexar   # grava os segmentos como passagens
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from jornada_aluno import RAIZ_PROJETO, APP_DIR, RESULTADOS_DIR, config_mysql, segredos, abrir_banco_bench
+
+VIDEO_SINTETICO = "benchsint01" # 11 caracteres, como um id real
+PALAVRAS = ("cliente", "mercado", "proposta", "valor", "persona", "funil", "canal", "métrica",
+            "hipótese", "validação", "receita", "custo", "aquisição", "retenção", "pitch")
+
+def config_transcricoes():
+    cfg = config_mysql()
+    cfg["database"] = cfg["database"] + "_transcricoes"
+    return cfg
+
+def preparar_ambiente(gravacoes, latencia_ms):
+    os.environ["FCJ_TRANSCRICOES_DIR"] = gravacoes # Lido no import de utils.transcricoes
+    os.chdir(RAIZ_PROJETO)
+    if APP_DIR not in sys.path:
+        sys.path.insert(0, APP_DIR)
+    import llm_falso
+    llm_falso.configurar(gemini_ms=latencia_ms)
+    llm_falso.instalar()
+
+    import streamlit as st
+    from streamlit.runtime.secrets import Secrets
+    st.secrets = Secrets()
+    st.secrets._secrets = segredos(config_transcricoes())
+
+def gravar_transcricao_sintetica(gravacoes, video_id, minutos):
+    """Uma linha de legenda a cada ~3s, como as legendas automáticas do YouTube."""
+    aleatorio = random.Random(minutos)
+    trechos, instante = [], 0.0
+    while instante < minutos * 60:
+        duracao = round(aleatorio.uniform(2.0, 4.0), 2)
+        texto = " ".join(aleatorio.choice(PALAVRAS) for _ in range(aleatorio.randint(6, 12)))
+        trechos.append({"text": texto, "start": round(instante, 2), "duration": duracao})
+        instante += duracao
+    os.makedirs(gravacoes, exist_ok=True)
+    with open(os.path.join(gravacoes, f"{video_id}.json"), "w", encoding="utf-8") as f:
+        json.dump(trechos, f, ensure_ascii=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline do pipeline de transcrições.")
+    parser.add_argument("--gravacoes", default=os.path.join(RESULTADOS_DIR, "transcricoes"),
+                        help="Pasta com transcrições gravadas (<video_id>.json)")
+    parser.add_argument("--video-id", default=VIDEO_SINTETICO, help="Vídeo gravado a usar")
+    parser.add_argument("--minutos", type=int, default=60, help="Duração da transcrição sintética")
+    parser.add_argument("--latencia-ms", type=int, default=1200, help="Latência do Gemini falso por segmento")
+    parser.add_argument("--trabalhadores", type=int, nargs="+", help="Cenários (padrão: 1 e o do app)")
+    parser.add_argument("--indexar", action="store_true", help="Grava os segmentos como passagens (duas vezes)")
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(args.gravacoes, f"{args.video_id}.json")):
+        print(f"🎙️ Sem gravação para {args.video_id}: gerando {args.minutos} min sintéticos")
+        gravar_transcricao_sintetica(args.gravacoes, args.video_id, args.minutos)
+    preparar_ambiente(args.gravacoes, args.latencia_ms)
+
+    import google.generativeai as genai
+    from utils import agente_ia_mysql
+    from utils.transcricoes import carregar_transcricao, segmentar, estruturar_segmentos, TRABALHADORES_TRANSCRICAO
+
+    inicio = time.perf_counter()
+    trechos = carregar_transcricao(args.video_id, buscar=None) # Sem rede: só a gravação
+    segmentos = segmentar(trechos)
+    print(f"📼 {len(trechos)} linhas de legenda -> {len(segmentos)} segmentos "
+          f"(cache lido e segmentado em {(time.perf_counter() - inicio) * 1000:.1f} ms)")
+
+    model = genai.GenerativeModel(agente_ia_mysql.MODELO)
+    estruturar = lambda segmento: agente_ia_mysql._estruturar_segmento(model, segmento)
+    cenarios = args.trabalhadores or sorted({1, TRABALHADORES_TRANSCRICAO})
+    print(f"\n{'trabalhadores':<15}{'total':>10}{'segmentos/s':>14}{'ganho':>8}")
+    base, estruturados = None, []
+    for trabalhadores in cenarios:
+        inicio = time.perf_counter()
+        estruturados = estruturar_segmentos(segmentos, estruturar, trabalhadores=trabalhadores)
+        duracao = time.perf_counter() - inicio
+        base = base or duracao
+        print(f"{trabalhadores:<15}{duracao:>9.2f}s{len(segmentos) / duracao:>14.1f}{base / duracao:>7.1f}x")
+
+    if args.indexar:
+        from utils.db import registrar_no_banco
+        from utils.passagens import juntar_segmentos
+        abrir_banco_bench(config_transcricoes()).close()
+        url = f"https://www.youtube.com/watch?v={args.video_id}"
+        for rodada in ("primeira", "reenvio"):
+            inicio = time.perf_counter()
+            registrar_no_banco("Vídeo YouTube", "youtube", url, "bench", juntar_segmentos(estruturados),
+                               segmentos=estruturados)
+            print(f"🗂️ Indexação ({rodada}): {(time.perf_counter() - inicio) * 1000:.1f} ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())